@@ -0,0 +1,74 @@
+# The (slow to import) backend modules used by cpig
+#
+# None of these modules are imported when cpig is loaded. Each backend is
+# imported (once per process) when it is first used, so a run only pays
+# for the backends of the generators named in its cpigConfig.yaml.
+
+import importlib
+import threading
+
+# The backend module of each generator type (all other generators are
+# rendered from jinja2 templates)
+#
+generatorBackends = {
+  'pydantic' : 'datamodel_code_generator',
+}
+templateBackend = 'jinja2'
+
+# The backend used to validate interfaces and examples
+#
+validationBackend = 'jsonschema'
+
+# The generator sections of a cpigConfig.yaml
+#
+generatorSections = [
+  'genSchema',
+  'genExamples',
+  'genHttpRoutes',
+  'genNatsSubjects',
+]
+
+loadedBackends = {}
+backendsLock   = threading.Lock()
+
+def importBackend(moduleName) :
+  # (the generators may run concurrently, in threads)
+  #
+  with backendsLock :
+    if moduleName not in loadedBackends :
+      loadedBackends[moduleName] = importlib.import_module(moduleName)
+    return loadedBackends[moduleName]
+
+def getGeneratorBackend(generationType) :
+  return importBackend(
+    generatorBackends.get(generationType, templateBackend)
+  )
+
+def getValidationBackend() :
+  return importBackend(validationBackend)
+
+def configuredBackends(config) :
+  # The names of the backend modules needed by the generators named in
+  # the config (in the order in which they are first needed)
+  #
+  someBackends = [ validationBackend ]
+  for aSection in generatorSections :
+    if aSection not in config or not config[aSection] :
+      continue
+    for generationType in config[aSection] :
+      aBackend = generatorBackends.get(generationType, templateBackend)
+      if aBackend not in someBackends :
+        someBackends.append(aBackend)
+  return someBackends
+
+def importConfiguredBackends(config) :
+  # Import the backends of the configured generators up front, so that any
+  # (forked) worker processes inherit them rather than each importing them
+  # again.
+  #
+  for aBackend in configuredBackends(config) :
+    try :
+      importBackend(aBackend)
+    except ImportError as ex :
+      print("Could not import the {} backend".format(aBackend))
+      print(ex)
@@ -0,0 +1,928 @@
+# Benchmarks of the cpig generation pipeline
+#
+# The interfaces used by these benchmarks are synthesized (at any size)
+# so that the scaling of each stage can be tracked across releases. The
+# results are written as JSON.
+
+import asyncio
+import click
+import contextlib
+import cpig.backends
+import cpig.buildCache
+import cpig.generateCode
+import cpig.loadInterface
+import cpig.outputWriter
+import cpig.payloadSynthesizer
+import cpig.validateExamples
+import cpig.validatorCompiler
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import yaml
+
+# (the cpig.cli name is the click command re-exported by cpig/__init__.py)
+#
+from cpig.cli import loadConfig
+
+try :
+  import resource
+except ImportError :
+  resource = None
+
+def synthesizeInterface(interfaceDir, numDefs, numRoutes, numSubjects, numExamples, exampleSize) :
+  # Write a synthetic interface (bench.md, which includes benchTypes.md)
+  # into interfaceDir.
+  #
+  # - numDefs jsonSchemaDefs (each referencing an earlier definition)
+  # - numRoutes httpRoutes (each with its own entityType)
+  # - numSubjects natsSubjects
+  # - numExamples jsonExamples, each with exampleSize tags
+  #
+  numDefs = max(numDefs, 1)
+  jsonSchemaDefs = {
+    'entityType' : {
+      'type' : 'object',
+      'properties' : {
+        'entityType' : {
+          'enum' : [ 'entity{}'.format(j) for j in range(numRoutes) ]
+        }
+      }
+    }
+  }
+  for i in range(numDefs) :
+    aDef = {
+      'type' : 'object',
+      'properties' : {
+        'id'    : { 'type' : 'string' },
+        'count' : { 'type' : 'integer', 'minimum' : 0 },
+        'tags'  : { 'type' : 'array', 'items' : { 'type' : 'string' } },
+        'attributes' : {
+          'type'  : 'dictionary',
+          'items' : { 'type' : 'string' },
+        },
+      },
+      'required' : [ 'id' ],
+    }
+    if 0 < i :
+      aDef['properties']['parent'] = { '$ref' : '#/$defs/type{}'.format(i // 2) }
+    jsonSchemaDefs['type{}'.format(i)] = aDef
+
+  httpRoutes = {}
+  for j in range(numRoutes) :
+    httpRoutes['route{}'.format(j)] = {
+      'route'    : '/route{}/<name>/<id>'.format(j),
+      'actions'  : [ 'GET', 'PUT' ],
+      'response' : 'type{}'.format(j % numDefs),
+      'body'     : 'type{}'.format(j % numDefs),
+    }
+
+  natsSubjects = {}
+  for k in range(numSubjects) :
+    natsSubjects['subject{}'.format(k)] = {
+      'subject' : 'bench.subject{}.<project>.[rest]'.format(k),
+      'message' : 'type{}'.format(k % numDefs),
+    }
+
+  yamlBlocks = []
+  yamlBlocks.append(yaml.dump({ 'httpRoutes' : httpRoutes }))
+  if natsSubjects :
+    yamlBlocks.append(yaml.dump({ 'natsSubjects' : natsSubjects }))
+  yamlBlocks.append(
+    yaml.dump({ 'jsonExamples' : { 'entityInterfaceMapping' : {
+      'title'      : 'entity interface mapping',
+      'httpRoutes' : { 'route' : '/mapping', 'action' : 'GET' },
+    } } }) + "---\n" + yaml.dump(
+      dict(('entity{}'.format(j), 'route{}'.format(j)) for j in range(numRoutes))
+    )
+  )
+  for e in range(numExamples) :
+    j = e % max(numRoutes, 1)
+    exampleType = 'type{}'.format(j % numDefs)
+    yamlBlocks.append(
+      yaml.dump({ 'jsonExamples' : { exampleType : {
+        'title'      : 'example {}'.format(e),
+        'httpRoutes' : {
+          'route'  : { 'mountPoint' : '/route{}'.format(j), 'name' : 'n', 'id' : str(e) },
+          'action' : 'GET',
+        },
+      } } }) + "---\n" + yaml.dump({
+        'id'         : 'example{}'.format(e),
+        'count'      : e,
+        'tags'       : [ 'tag{}'.format(t) for t in range(exampleSize) ],
+        'attributes' : dict(('key{}'.format(t), 'value') for t in range(exampleSize)),
+      })
+    )
+
+  with open(os.path.join(interfaceDir, 'benchTypes.md'), 'w') as typesFile :
+    typesFile.write("# Synthetic benchmark types\n\n```yaml\n")
+    typesFile.write(yaml.dump({ 'jsonSchemaDefs' : jsonSchemaDefs }))
+    typesFile.write("```\n")
+
+  with open(os.path.join(interfaceDir, 'bench.md'), 'w') as interfaceFile :
+    interfaceFile.write("# Synthetic benchmark interface\n\n")
+    interfaceFile.write("Include.Interface: [types](benchTypes.md)\n\n")
+    for aBlock in yamlBlocks :
+      interfaceFile.write("```yaml\n"+aBlock+"```\n\n")
+
+  return 'bench.md'
+
+benchmarkConfigYaml = """
+genSchema:
+  pydantic: {}
+  ajv:
+    ajvOptions:
+      strict: true
+genExamples:
+  pythonExamples: {}
+  javaScriptExamples: {}
+  mockServerExamples: {}
+  mithrilExamples: {}
+  fastApiExamples: {}
+genHttpRoutes:
+  httpRouteUtils: {}
+  mithrilConnectors: {}
+  fastApiRoutes: {}
+genNatsSubjects:
+  natsSubjects: {}
+"""
+
+@contextlib.contextmanager
+def benchmarkInterface(interfacePath, *sizes) :
+  # Synthesize an interface (of the given sizes) in a temporary directory
+  # (unless interfacePath is an existing interface), and change to the
+  # interface's directory for the duration of the benchmark.
+  #
+  # Yields [ tempDir, interfaceName ]
+  #
+  startDir = os.getcwd()
+  with tempfile.TemporaryDirectory() as tempDir :
+    if interfacePath is None :
+      interfacePath = os.path.join(tempDir, synthesizeInterface(tempDir, *sizes))
+    interfacePath = os.path.abspath(interfacePath)
+    os.chdir(os.path.dirname(interfacePath))
+    try :
+      yield [ tempDir, os.path.basename(interfacePath) ]
+    finally :
+      os.chdir(startDir)
+
+def loadInterfaceQuietly(interfaceName) :
+  # (Re)load an interface (in the current directory) without reporting
+  # its progress
+  #
+  cpig.loadInterface.resetInterfaceDescription()
+  with contextlib.redirect_stdout(io.StringIO()) :
+    return cpig.loadInterface.loadInterfaceFile(interfaceName)
+
+def loadBenchmarkConfig(interfaceDir, skipPydantic, numJobs, numThreads) :
+  configPath = os.path.join(interfaceDir, 'cpigConfig.yaml')
+  with open(configPath, 'w') as configFile :
+    configFile.write(benchmarkConfigYaml)
+  config = loadConfig(configPath, 0)
+  config['options']['distDir'] = os.path.join(interfaceDir, 'dist')
+  config['options']['force']   = True
+  config['options']['jobs']    = numJobs
+  config['options']['threads'] = numThreads
+  if skipPydantic :
+    del config['genSchema']['pydantic']
+  config['outputFiles'] = {}
+  config['outputDirs']  = {}
+  return config
+
+def timeStage(stageResults, stageName, traceMemory, stageFunc, *args) :
+  if traceMemory :
+    tracemalloc.start()
+  startWall = time.perf_counter()
+  startCpu  = time.process_time()
+  with contextlib.redirect_stdout(io.StringIO()) :
+    stageFunc(*args)
+  stageResult = {
+    'wallTime' : time.perf_counter() - startWall,
+    'cpuTime'  : time.process_time() - startCpu,
+  }
+  if traceMemory :
+    stageResult['peakMemory'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+  stageResults[stageName] = stageResult
+
+def benchmarkPipeline(sizes, skipPydantic, numJobs, numThreads, traceMemory) :
+  numDefs, numRoutes, numSubjects, numExamples, exampleSize = sizes
+  with benchmarkInterface(None, *sizes) as [ interfaceDir, interfaceName ] :
+    config = loadBenchmarkConfig(interfaceDir, skipPydantic, numJobs, numThreads)
+    cpig.loadInterface.resetInterfaceDescription()
+
+    stageResults = {}
+    timeStage(stageResults, 'loadInterfaceFile', traceMemory,
+      cpig.loadInterface.loadInterfaceFile, interfaceName)
+    theModel = cpig.loadInterface.loadedModel
+    cpig.buildCache.loadBuildCache(config['options'], theModel.name)
+    timeStage(stageResults, 'validateJsonExamples', traceMemory,
+      cpig.validateExamples.validateJsonExamples, config['options'], theModel)
+    timeStage(stageResults, 'computeOutputFileNames', traceMemory,
+      cpig.generateCode.computeOutputFileNames, config, theModel)
+    for aStageName, addStageTasks in cpig.generateCode.generationStages :
+      timeStage(stageResults, aStageName, traceMemory,
+        cpig.generateCode.runGenerators, config, theModel, [ aStageName ])
+    # (all of the stages at once, as one task graph)
+    graphResults = {}
+    timeStage(graphResults, 'runGenerators', traceMemory,
+      cpig.generateCode.runGenerators, config, theModel)
+
+  return {
+    'sizes' : {
+      'jsonSchemaDefs' : numDefs,
+      'httpRoutes'     : numRoutes,
+      'natsSubjects'   : numSubjects,
+      'jsonExamples'   : numExamples,
+      'exampleSize'    : exampleSize,
+    },
+    'stages'    : stageResults,
+    'totalTime' : sum(aStage['wallTime'] for aStage in stageResults.values()),
+    'graph'     : graphResults['runGenerators'],
+  }
+
+def benchmarkEnvironment() :
+  return {
+    'cpigVersion' : cpig.buildCache.cpigVersion(),
+    'python'      : platform.python_version(),
+    'platform'    : platform.platform(),
+    'date'        : datetime.datetime.now(datetime.timezone.utc).isoformat(),
+  }
+
+def maxResidentMemory() :
+  if resource is None :
+    return None
+  maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if sys.platform == 'darwin' :
+    return maxRss        # bytes
+  return maxRss * 1024   # kilobytes
+
+def writeResults(results, outputPath) :
+  resultsJson = json.dumps(results, indent=2)
+  if outputPath == '-' :
+    print(resultsJson)
+  else :
+    with open(outputPath, 'w') as outputFile :
+      outputFile.write(resultsJson+"\n")
+    print("Wrote the benchmark results to {}".format(outputPath))
+
+@click.group()
+def benchmark() :
+  """
+  Benchmark the ComputePods interface generator.
+  """
+  pass
+
+@benchmark.command()
+@click.option("-d", "--defs", "numDefs", default=50, show_default=True,
+  help="Number of jsonSchemaDefs (at scale 1).")
+@click.option("-r", "--routes", "numRoutes", default=20, show_default=True,
+  help="Number of httpRoutes (at scale 1).")
+@click.option("-n", "--subjects", "numSubjects", default=20, show_default=True,
+  help="Number of natsSubjects (at scale 1).")
+@click.option("-e", "--examples", "numExamples", default=200, show_default=True,
+  help="Number of jsonExamples (at scale 1).")
+@click.option("--example-size", "exampleSize", default=50, show_default=True,
+  help="Number of tags/attributes in each example.")
+@click.option("-s", "--scale", "scales", type=float, multiple=True,
+  help="Scale factor(s) to apply to the sizes (may be repeated).")
+@click.option("-j", "--jobs", "numJobs", default=1, show_default=True,
+  help="Number of pydantic worker processes.")
+@click.option("-t", "--threads", "numThreads", default=1, show_default=True,
+  help="Number of threads running the generator tasks.")
+@click.option("--skip-pydantic", "skipPydantic", is_flag=True, default=False,
+  help="Do not run the pydantic stage.")
+@click.option("--memory/--no-memory", "traceMemory", default=True, show_default=True,
+  help="Record the peak (tracemalloc) memory of each stage.")
+@click.option("-o", "--output", "outputPath", default="-", show_default=True,
+  help="Path of the JSON results file ('-' for stdout).")
+def pipeline(numDefs, numRoutes, numSubjects, numExamples, exampleSize,
+  scales, numJobs, numThreads, skipPydantic, traceMemory, outputPath) :
+  """
+  Time each stage of the generation pipeline on synthetic interfaces.
+  """
+  if not scales :
+    scales = [ 1.0 ]
+
+  results = benchmarkEnvironment()
+  results['benchmark'] = 'pipeline'
+  results['runs'] = []
+  for aScale in scales :
+    sizes = [
+      int(numDefs * aScale),
+      int(numRoutes * aScale),
+      int(numSubjects * aScale),
+      int(numExamples * aScale),
+      exampleSize,
+    ]
+    print("Benchmarking the pipeline at scale {} ({})".format(aScale, sizes), file=sys.stderr)
+    aRun = benchmarkPipeline(sizes, skipPydantic, numJobs, numThreads, traceMemory)
+    aRun['scale'] = aScale
+    results['runs'].append(aRun)
+  results['maxResidentMemory'] = maxResidentMemory()
+
+  writeResults(results, outputPath)
+
+# The startup benchmark runs `cpig --help` in a fresh interpreter, and
+# reports which (slow to import) backends were imported.
+#
+startupScript = """
+import json, sys
+import cpig
+try :
+  cpig.cli([ '--help' ])
+except SystemExit :
+  pass
+print(json.dumps([
+  aModule for aModule in sys.argv[1:] if aModule in sys.modules
+]))
+"""
+
+def timeSubprocess(someArgs) :
+  startWall = time.perf_counter()
+  completed = subprocess.run(someArgs, capture_output=True, text=True, check=True)
+  return [ time.perf_counter() - startWall, completed.stdout ]
+
+@benchmark.command()
+@click.option("-r", "--repeat", "numRepeats", default=10, show_default=True,
+  help="Number of times to start cpig.")
+@click.option("-t", "--threshold", "threshold", type=float, default=None,
+  help="Fail if the median startup time (in seconds, over that of the bare interpreter) exceeds this.")
+@click.option("-o", "--output", "outputPath", default="-", show_default=True,
+  help="Path of the JSON results file ('-' for stdout).")
+def startup(numRepeats, threshold, outputPath) :
+  """
+  Time the startup of the cpig command (which should import no backends).
+  """
+  someBackends = sorted(set(
+    list(cpig.backends.generatorBackends.values()) +
+    [ cpig.backends.templateBackend, cpig.backends.validationBackend ]
+  ))
+
+  interpreterTimes = []
+  startupTimes     = []
+  importedBackends = []
+  for aRepeat in range(max(numRepeats, 1)) :
+    interpreterTimes.append(timeSubprocess([ sys.executable, '-c', 'pass' ])[0])
+    startupTime, startupOutput = timeSubprocess(
+      [ sys.executable, '-c', startupScript ] + someBackends
+    )
+    startupTimes.append(startupTime)
+    importedBackends = json.loads(startupOutput.splitlines()[-1])
+
+  cpigTime = statistics.median(startupTimes) - statistics.median(interpreterTimes)
+
+  results = benchmarkEnvironment()
+  results['benchmark']        = 'startup'
+  results['interpreterTimes'] = interpreterTimes
+  results['startupTimes']     = startupTimes
+  results['cpigStartupTime']  = cpigTime
+  results['importedBackends'] = importedBackends
+  results['threshold']        = threshold
+  writeResults(results, outputPath)
+
+  failed = False
+  if importedBackends :
+    print("The cpig command imported the backends: {}".format(
+      ", ".join(importedBackends)
+    ), file=sys.stderr)
+    failed = True
+  if threshold is not None and threshold < cpigTime :
+    print("The cpig startup time ({:.3f}s) exceeds the threshold ({:.3f}s)".format(
+      cpigTime, threshold
+    ), file=sys.stderr)
+    failed = True
+  if failed :
+    sys.exit(-1)
+
+# The validators benchmark compares the (generated) pythonValidators with
+# jsonschema's Draft7Validator, both for their verdicts and for their
+# throughput, on the jsonExamples of an interface together with mutated
+# (mostly invalid) variants of each example.
+#
+mutatedValues = [ None, True, -1, 1.5, "mutated", [], {} ]
+
+def mutateExample(anExample) :
+  someVariants = [ anExample ]
+  for aValue in mutatedValues :
+    someVariants.append(aValue)
+  if type(anExample) is dict :
+    for aKey in sorted(anExample.keys()) :
+      aVariant = dict(anExample)
+      del aVariant[aKey]
+      someVariants.append(aVariant)
+      for aValue in mutatedValues :
+        aVariant = dict(anExample)
+        aVariant[aKey] = aValue
+        someVariants.append(aVariant)
+      if type(anExample[aKey]) is list and anExample[aKey] :
+        for aValue in mutatedValues :
+          aVariant = dict(anExample)
+          aVariant[aKey] = [ aValue ] + anExample[aKey][1:]
+          someVariants.append(aVariant)
+  elif type(anExample) is list and anExample :
+    for aValue in mutatedValues :
+      someVariants.append([ aValue ] + anExample[1:])
+  return someVariants
+
+def timeValidator(isValid, someInstances, numRepeats) :
+  startWall = time.perf_counter()
+  for aRepeat in range(numRepeats) :
+    for anInstance in someInstances :
+      isValid(anInstance)
+  return time.perf_counter() - startWall
+
+def loadCompiledValidator(aJsonSchema, aJsonType) :
+  # Returns [ isValid, errors, compileTime ] of the generated validators
+  #
+  startCompile = time.perf_counter()
+  validatorCode = cpig.validatorCompiler.compileValidators(aJsonSchema, aJsonType)
+  validatorNamespace = {}
+  exec(compile(validatorCode, aJsonType+'Validators.py', 'exec'), validatorNamespace)
+  compileTime = time.perf_counter() - startCompile
+  aName = cpig.validatorCompiler.safeName(aJsonType)
+  return [
+    validatorNamespace[aName+'_is_valid'],
+    validatorNamespace[aName+'_errors'],
+    compileTime
+  ]
+
+def findMismatches(compiledIsValid, compiledErrors, draft7IsValid, someInstances) :
+  # Returns [ numValid, mismatches ]
+  #
+  numValid = 0
+  someMismatches = []
+  for anInstance in someInstances :
+    draft7Verdict = draft7IsValid(anInstance)
+    if draft7Verdict :
+      numValid += 1
+    if compiledIsValid(anInstance) != draft7Verdict :
+      someMismatches.append({
+        'instance'   : anInstance,
+        'jsonschema' : draft7Verdict,
+        'errors'     : compiledErrors(anInstance),
+      })
+  return [ numValid, someMismatches ]
+
+# Schemas (with their instances) which exercise the corners of the
+# validator compiler: keywords whose type is not stated, and keywords
+# whose subschemas accept everything.
+#
+edgeCaseSchemas = [
+  [ 'emptyProperties',  { 'properties' : { 'a' : {} } } ],
+  [ 'emptyItems',       { 'items' : {} } ],
+  [ 'emptyTupleItems',  { 'items' : [ {}, True ] } ],
+  [ 'trueAdditional',   { 'additionalProperties' : True } ],
+  [ 'emptyPatterns',    { 'patternProperties' : { '^a' : {} } } ],
+  [ 'emptyContains',    { 'contains' : {} } ],
+  [ 'emptyNames',       { 'propertyNames' : {} } ],
+  [ 'untypedMinimum',   { 'minimum' : 2 } ],
+  [ 'untypedMaxLength', { 'maxLength' : 2 } ],
+  [ 'untypedRequired',  { 'required' : [ 'a' ] } ],
+  [ 'emptyThen',        { 'if' : { 'type' : 'object' }, 'then' : {} } ],
+  [ 'emptyAllOf',       { 'allOf' : [ {}, { 'properties' : { 'a' : {} } } ] } ],
+]
+edgeCaseInstances = [
+  None, True, 0, 1, 2.5, "", "abc", [], [ 1 ], [ 1, "a", None ],
+  {}, { 'a' : 1 }, { 'b' : [] }, { 'a' : None, 'ab' : {} },
+]
+
+def benchmarkEdgeCases() :
+  jsonschema = cpig.backends.getValidationBackend()
+  caseResults = {}
+  for aCaseName, aJsonSchema in edgeCaseSchemas :
+    try :
+      compiledIsValid, compiledErrors, compileTime = loadCompiledValidator(
+        aJsonSchema, aCaseName
+      )
+    except Exception as ex :
+      caseResults[aCaseName] = {
+        'instances'  : len(edgeCaseInstances),
+        'mismatches' : [ { 'schema' : aJsonSchema, 'error' : str(ex) } ],
+      }
+      continue
+    numValid, someMismatches = findMismatches(
+      compiledIsValid, compiledErrors,
+      jsonschema.Draft7Validator(aJsonSchema).is_valid, edgeCaseInstances
+    )
+    caseResults[aCaseName] = {
+      'instances'  : len(edgeCaseInstances),
+      'valid'      : numValid,
+      'mismatches' : someMismatches,
+    }
+  return caseResults
+
+def benchmarkValidators(theModel, numRepeats) :
+  jsonschema = cpig.backends.getValidationBackend()
+  typeResults = {}
+  for aJsonType, someExamples in theModel.examplesByType.items() :
+    if aJsonType not in theModel.jsonSchemaDefs :
+      continue
+    aJsonSchema = cpig.validateExamples.buildDefinitionSchema(theModel, aJsonType)
+
+    compiledIsValid, compiledErrors, compileTime = loadCompiledValidator(
+      aJsonSchema, aJsonType
+    )
+    draft7IsValid = jsonschema.Draft7Validator(aJsonSchema).is_valid
+
+    someInstances = []
+    for anExample in someExamples :
+      if 'example' in anExample :
+        someInstances.extend(mutateExample(anExample['example']))
+
+    numValid, someMismatches = findMismatches(
+      compiledIsValid, compiledErrors, draft7IsValid, someInstances
+    )
+
+    compiledTime = timeValidator(compiledIsValid, someInstances, numRepeats)
+    draft7Time   = timeValidator(draft7IsValid,   someInstances, numRepeats)
+    numChecked = len(someInstances) * numRepeats
+    typeResults[aJsonType] = {
+      'instances'         : len(someInstances),
+      'valid'             : numValid,
+      'compileTime'       : compileTime,
+      'compiledPerSecond' : numChecked / compiledTime if compiledTime else None,
+      'draft7PerSecond'   : numChecked / draft7Time if draft7Time else None,
+      'speedup'           : draft7Time / compiledTime if compiledTime else None,
+      'mismatches'        : someMismatches,
+    }
+  return typeResults
+
+@benchmark.command()
+@click.option("-i", "--interface", "interfacePath", default=None,
+  help="The interface (markdown) file to use (default: a synthetic interface).")
+@click.option("-d", "--defs", "numDefs", default=20, show_default=True,
+  help="Number of (synthetic) jsonSchemaDefs.")
+@click.option("-e", "--examples", "numExamples", default=100, show_default=True,
+  help="Number of (synthetic) jsonExamples.")
+@click.option("--example-size", "exampleSize", default=20, show_default=True,
+  help="Number of tags/attributes in each (synthetic) example.")
+@click.option("-r", "--repeat", "numRepeats", default=20, show_default=True,
+  help="Number of times to validate each instance.")
+@click.option("-o", "--output", "outputPath", default="-", show_default=True,
+  help="Path of the JSON results file ('-' for stdout).")
+def validators(interfacePath, numDefs, numExamples, exampleSize, numRepeats, outputPath) :
+  """
+  Compare the generated Python validators with jsonschema.
+  """
+  someSizes = [ numDefs, numDefs, 0, numExamples, exampleSize ]
+  with benchmarkInterface(interfacePath, *someSizes) as [ tempDir, interfaceName ] :
+    theModel = loadInterfaceQuietly(interfaceName)
+
+  typeResults = benchmarkValidators(theModel, max(numRepeats, 1))
+  caseResults = benchmarkEdgeCases()
+
+  results = benchmarkEnvironment()
+  results['benchmark'] = 'validators'
+  results['interface'] = theModel.name
+  results['repeats']   = numRepeats
+  results['types']     = typeResults
+  results['edgeCases'] = caseResults
+  someResults = list(typeResults.values()) + list(caseResults.values())
+  numChecked  = sum(aResult['instances'] for aResult in someResults)
+  numMismatch = sum(len(aResult['mismatches']) for aResult in someResults)
+  results['instances']  = numChecked
+  results['mismatches'] = numMismatch
+  writeResults(results, outputPath)
+
+  if numMismatch :
+    print("The generated validators disagreed with jsonschema on {} of {} instances".format(
+      numMismatch, numChecked
+    ), file=sys.stderr)
+    sys.exit(-1)
+
+# The sseHub benchmark renders the fastApiRoutes template and load tests
+# its SseBroadcastHub with (thousands of) concurrent local subscribers to
+# ONE topic. Events are published in bursts, and a fraction of the
+# subscribers are slow (they sleep after each chunk) so that their
+# bounded queues overflow and drop events.
+#
+def loadSseBroadcastHub(queueSize) :
+  with tempfile.TemporaryDirectory() as distDir :
+    aTemplate = cpig.generateCode.getJinjaEnvironment({
+      'distDir' : distDir
+    }).get_template('cpig:fastApiRoutes.j2')
+    routesCode = aTemplate.render({
+      'options'          : {
+        'interfaceName'   : 'sseHubBenchmark',
+        'sseMaxQueueSize' : queueSize,
+      },
+      'httpRoutes'       : {},
+      'httpRoutesSorted' : [],
+    })
+  routesNamespace = {}
+  exec(compile(routesCode, 'sseHubBenchmarkFastApiRoutes.py', 'exec'), routesNamespace)
+  return routesNamespace['SseBroadcastHub']
+
+async def runSseHub(theHub, numSubscribers, numSlow, slowDelay, numEvents,
+  eventSize, burstSize) :
+  aTopic = '/sseHubBenchmark'
+  receivedEvents = [ 0 ] * numSubscribers
+
+  async def consumeEvents(subscriberIndex, isSlow) :
+    aStream = theHub.stream(aTopic)
+    try :
+      async for aChunk in aStream :
+        receivedEvents[subscriberIndex] += aChunk.count(b"\ndata: ")
+        if b"event: end\n" in aChunk :
+          break
+        if isSlow :
+          await asyncio.sleep(slowDelay)
+    finally :
+      await aStream.aclose()
+
+  startSubscribe = time.perf_counter()
+  someTasks = [
+    asyncio.ensure_future(consumeEvents(anIndex, anIndex < numSlow))
+    for anIndex in range(numSubscribers)
+  ]
+  while theHub.numSubscribers(aTopic) < numSubscribers :
+    await asyncio.sleep(0)
+  subscribeTime = time.perf_counter() - startSubscribe
+
+  anEvent = { 'field{}'.format(anIndex) : anIndex for anIndex in range(eventSize) }
+  startPublish = time.perf_counter()
+  for anEventId in range(numEvents) :
+    theHub.publish(aTopic, anEvent, eventId=anEventId)
+    if anEventId % burstSize == burstSize - 1 :
+      await asyncio.sleep(0)
+  theHub.publish(aTopic, {}, eventType='end', eventId=numEvents)
+  publishTime = time.perf_counter() - startPublish
+  await asyncio.gather(*someTasks)
+  deliverTime = time.perf_counter() - startPublish
+
+  # (each subscriber also receives the end event)
+  numLost = sum(
+    numEvents + 1 - receivedEvents[anIndex] for anIndex in range(numSlow, numSubscribers)
+  )
+  numDelivered = sum(receivedEvents)
+  return {
+    'subscribeTime'       : subscribeTime,
+    'publishTime'         : publishTime,
+    'deliverTime'         : deliverTime,
+    'eventsDelivered'     : numDelivered,
+    'deliveredPerSecond'  : numDelivered / deliverTime if deliverTime else None,
+    'eventsDropped'       : theHub.droppedEvents,
+    'lostByFastConsumers' : numLost,
+    'subscribersLeft'     : theHub.numSubscribers(),
+  }
+
+@benchmark.command(name="sseHub")
+@click.option("-s", "--subscribers", "numSubscribers", default=5000, show_default=True,
+  help="Number of concurrent (local) subscribers.")
+@click.option("--slow", "slowFraction", type=float, default=0.1, show_default=True,
+  help="Fraction of the subscribers which are slow consumers.")
+@click.option("--slow-delay", "slowDelay", type=float, default=0.5, show_default=True,
+  help="Seconds a slow consumer sleeps after each chunk.")
+@click.option("-e", "--events", "numEvents", default=200, show_default=True,
+  help="Number of events to publish.")
+@click.option("--event-size", "eventSize", default=10, show_default=True,
+  help="Number of fields in each event.")
+@click.option("-b", "--burst", "burstSize", default=10, show_default=True,
+  help="Number of events published between yields to the event loop.")
+@click.option("-q", "--queue-size", "queueSize", default=64, show_default=True,
+  help="Size of each subscriber's (bounded) queue.")
+@click.option("--memory/--no-memory", "traceMemory", default=True, show_default=True,
+  help="Trace the peak (Python) memory of the hub and its subscribers.")
+@click.option("-o", "--output", "outputPath", default="-", show_default=True,
+  help="Path of the JSON results file ('-' for stdout).")
+def sseHub(numSubscribers, slowFraction, slowDelay, numEvents, eventSize,
+  burstSize, queueSize, traceMemory, outputPath) :
+  """
+  Load test the SSE broadcast hub of the generated FastAPI routes.
+  """
+  SseBroadcastHub = loadSseBroadcastHub(queueSize)
+  theHub = SseBroadcastHub(maxQueueSize=queueSize)
+  numSlow = int(numSubscribers * min(max(slowFraction, 0), 1))
+
+  if traceMemory :
+    tracemalloc.start()
+  hubResults = asyncio.run(
+    runSseHub(theHub, numSubscribers, numSlow, slowDelay, numEvents,
+      eventSize, max(burstSize, 1))
+  )
+  if traceMemory :
+    hubResults['peakMemory'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+  hubResults['maxResidentMemory'] = maxResidentMemory()
+
+  results = benchmarkEnvironment()
+  results['benchmark']   = 'sseHub'
+  results['subscribers'] = numSubscribers
+  results['slow']        = numSlow
+  results['events']      = numEvents
+  results['eventSize']   = eventSize
+  results['burst']       = burstSize
+  results['queueSize']   = queueSize
+  results['hub']         = hubResults
+  writeResults(results, outputPath)
+
+  # (fast consumers only lose events when a burst overflows their queues)
+  if hubResults['subscribersLeft'] or \
+    (hubResults['lostByFastConsumers'] and burstSize <= queueSize) :
+    print("The SSE hub lost {} events of its fast consumers (and left {} subscribers)".format(
+      hubResults['lostByFastConsumers'], hubResults['subscribersLeft']
+    ), file=sys.stderr)
+    sys.exit(-1)
+
+# The payloads benchmark streams synthesized payloads, for each root type
+# of an interface, to (temporary) NDJSON files, and then checks every
+# payload with the root type's (compiled) Python validators. The peak
+# memory used while streaming should not grow with the target size.
+#
+def benchmarkPayloads(theModel, targetSize, seed, traceMemory) :
+  typeResults = {}
+  for aRootType, aJsonSchema in cpig.generateCode.jsonSchemaGenerator(
+    { 'verbose' : 0 }, theModel
+  ) :
+    validatorNamespace = {}
+    exec(compile(
+      cpig.validatorCompiler.compileValidators(aJsonSchema, aRootType),
+      aRootType+'Validators.py', 'exec'
+    ), validatorNamespace)
+    payloadErrors = validatorNamespace[
+      cpig.validatorCompiler.safeName(aRootType)+'_errors'
+    ]
+
+    with tempfile.TemporaryDirectory() as payloadsDir :
+      payloadsPath = os.path.join(payloadsDir, aRootType+'.ndjson')
+      if traceMemory :
+        tracemalloc.start()
+      startWall = time.perf_counter()
+      try :
+        wasWritten, numBytes = cpig.outputWriter.replaceFileWithStream(
+          payloadsPath, cpig.payloadSynthesizer.streamPayloadChunks(
+            aJsonSchema, seed=seed, targetSize=targetSize
+          )
+        )
+      except cpig.payloadSynthesizer.PayloadError as ex :
+        typeResults[aRootType] = { 'error' : str(ex) }
+        continue
+      finally :
+        writeTime = time.perf_counter() - startWall
+        peakMemory = None
+        if traceMemory :
+          peakMemory = tracemalloc.get_traced_memory()[1]
+          tracemalloc.stop()
+
+      numPayloads = 0
+      someInvalid = []
+      startWall = time.perf_counter()
+      with open(payloadsPath, 'rb') as payloadsFile :
+        for aLine in payloadsFile :
+          numPayloads += 1
+          anError = payloadErrors(json.loads(aLine))
+          if anError is not None and len(someInvalid) < 10 :
+            someInvalid.append({ 'line' : numPayloads, 'error' : anError })
+          elif anError is not None :
+            someInvalid.append(None)
+      checkTime = time.perf_counter() - startWall
+
+    typeResults[aRootType] = {
+      'bytes'          : numBytes,
+      'payloads'       : numPayloads,
+      'writeTime'      : writeTime,
+      'bytesPerSecond' : numBytes / writeTime if writeTime else None,
+      'checkTime'      : checkTime,
+      'peakMemory'     : peakMemory,
+      'invalid'        : len(someInvalid),
+      'invalidSamples' : [ anInvalid for anInvalid in someInvalid if anInvalid ],
+    }
+  return typeResults
+
+@benchmark.command()
+@click.option("-i", "--interface", "interfacePath", default=None,
+  help="The interface (markdown) file to use (default: a synthetic interface).")
+@click.option("-d", "--defs", "numDefs", default=10, show_default=True,
+  help="Number of (synthetic) jsonSchemaDefs.")
+@click.option("-t", "--target-size", "targetSize", default="10MB", show_default=True,
+  help="The size of the payloads of each root type (for example 64KB or 2GB).")
+@click.option("-s", "--seed", "seed", default=0, show_default=True,
+  help="The seed of the synthesized payloads.")
+@click.option("--memory/--no-memory", "traceMemory", default=True, show_default=True,
+  help="Trace the peak (Python) memory used while streaming.")
+@click.option("-o", "--output", "outputPath", default="-", show_default=True,
+  help="Path of the JSON results file ('-' for stdout).")
+def payloads(interfacePath, numDefs, targetSize, seed, traceMemory, outputPath) :
+  """
+  Stream, and then validate, synthesized payloads for each root type.
+  """
+  someSizes = [ numDefs, numDefs, 0, 0, 0 ]
+  with benchmarkInterface(interfacePath, *someSizes) as [ tempDir, interfaceName ] :
+    theModel = loadInterfaceQuietly(interfaceName)
+
+  typeResults = benchmarkPayloads(
+    theModel, cpig.payloadSynthesizer.parseSize(targetSize), seed, traceMemory
+  )
+
+  results = benchmarkEnvironment()
+  results['benchmark']  = 'payloads'
+  results['interface']  = theModel.name
+  results['targetSize'] = targetSize
+  results['seed']       = seed
+  results['types']      = typeResults
+  numInvalid = sum(aType.get('invalid', 0) for aType in typeResults.values())
+  numErrors  = sum(1 for aType in typeResults.values() if 'error' in aType)
+  results['invalid'] = numInvalid
+  results['errors']  = numErrors
+  writeResults(results, outputPath)
+
+  if numInvalid or numErrors :
+    print("{} synthesized payloads were invalid ({} root types could not be synthesized)".format(
+      numInvalid, numErrors
+    ), file=sys.stderr)
+    sys.exit(-1)
+
+# The snapshots benchmark times the loading of an interface: parsed with
+# the pure Python YAML loader, parsed with the libyaml loader (if PyYAML
+# has been built with libyaml), and loaded from its (normalised)
+# snapshots. Each load MUST produce the same interfaceDescription.
+#
+def timeInterfaceLoad(interfaceName, numRepeats, aLoader, aSnapshotDir) :
+  someTimes = []
+  theDescription = None
+  savedLoader = cpig.loadInterface.yamlSafeLoader
+  cpig.loadInterface.yamlSafeLoader = aLoader
+  cpig.loadInterface.snapshotDir    = aSnapshotDir
+  try :
+    for aRepeat in range(numRepeats) :
+      startWall = time.perf_counter()
+      loadInterfaceQuietly(interfaceName)
+      someTimes.append(time.perf_counter() - startWall)
+      theDescription = json.dumps(
+        cpig.loadInterface.interfaceDescription, sort_keys=True
+      )
+  finally :
+    cpig.loadInterface.yamlSafeLoader = savedLoader
+    cpig.loadInterface.snapshotDir    = None
+  return [ {
+    'minTime'    : min(someTimes),
+    'medianTime' : statistics.median(someTimes),
+  }, theDescription ]
+
+@benchmark.command()
+@click.option("-d", "--defs", "numDefs", default=200, show_default=True,
+  help="Number of jsonSchemaDefs.")
+@click.option("-r", "--routes", "numRoutes", default=80, show_default=True,
+  help="Number of httpRoutes.")
+@click.option("-e", "--examples", "numExamples", default=800, show_default=True,
+  help="Number of jsonExamples.")
+@click.option("--example-size", "exampleSize", default=50, show_default=True,
+  help="Number of tags/attributes in each example.")
+@click.option("-n", "--repeats", "numRepeats", default=5, show_default=True,
+  help="Number of times to load the interface in each mode.")
+@click.option("-o", "--output", "outputPath", default="-", show_default=True,
+  help="Path of the JSON results file ('-' for stdout).")
+def snapshots(numDefs, numRoutes, numExamples, exampleSize, numRepeats, outputPath) :
+  """
+  Compare parsing an interface with loading it from its snapshots.
+  """
+  loaders = [ [ 'pythonYaml', yaml.SafeLoader ] ]
+  if hasattr(yaml, 'CSafeLoader') :
+    loaders.append([ 'libyaml', yaml.CSafeLoader ])
+
+  modeResults  = {}
+  descriptions = {}
+  someSizes = [ numDefs, numRoutes, 0, numExamples, exampleSize ]
+  with benchmarkInterface(None, *someSizes) as [ interfaceDir, interfaceName ] :
+    snapshotDir = os.path.join(interfaceDir, 'snapshots')
+    for aMode, aLoader in loaders :
+      modeResults[aMode], descriptions[aMode] = timeInterfaceLoad(
+        interfaceName, numRepeats, aLoader, None
+      )
+    # (the first load writes the snapshots which the others then use)
+    timeInterfaceLoad(interfaceName, 1, loaders[-1][1], snapshotDir)
+    modeResults['snapshot'], descriptions['snapshot'] = timeInterfaceLoad(
+      interfaceName, numRepeats, loaders[-1][1], snapshotDir
+    )
+
+  for aMode, aResult in modeResults.items() :
+    aResult['speedup'] = modeResults['pythonYaml']['minTime'] / aResult['minTime']
+
+  results = benchmarkEnvironment()
+  results['benchmark'] = 'snapshots'
+  results['sizes'] = {
+    'jsonSchemaDefs' : numDefs,
+    'httpRoutes'     : numRoutes,
+    'jsonExamples'   : numExamples,
+    'exampleSize'    : exampleSize,
+  }
+  results['modes'] = modeResults
+  writeResults(results, outputPath)
+
+  differentModes = [
+    aMode for aMode in descriptions
+      if descriptions[aMode] != descriptions['pythonYaml']
+  ]
+  if differentModes :
+    print("The {} load(s) did not produce the same interfaceDescription".format(
+      ", ".join(differentModes)
+    ), file=sys.stderr)
+    sys.exit(-1)
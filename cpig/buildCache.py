@@ -0,0 +1,128 @@
+# The cpig (persistent) incremental build cache
+#
+# Each output file is keyed on a hash of everything which went into it:
+#   - the (normalised) YAML data the generator consumed,
+#   - the resolved Jinja2 template source,
+#   - the generator options,
+#   - the cpig version (together with a hash of cpig's own Python sources,
+#     since some outputs, such as the pythonValidators and the payloads,
+#     are produced by cpig's code rather than by a template).
+#
+# The keys of the last successful build of each interface are kept in
+# `<distDir>/.cpigCache/<interfaceName>.json`. An output whose key has not
+# changed (and which still exists) does not need to be regenerated.
+
+import cpig.backends
+import cpig.outputWriter
+import hashlib
+import json
+import os
+
+cacheDirName = '.cpigCache'
+
+cacheFilePath  = None
+forceRebuild   = False
+previousKeys   = {}
+currentKeys    = {}
+packageVersions = {}
+sourcesDigest   = None
+
+def packageVersion(packageName) :
+  if packageName not in packageVersions :
+    try :
+      # (importlib.metadata is slow to import, so we only import it when
+      # a build key is first needed)
+      metadata = cpig.backends.importBackend('importlib.metadata')
+      packageVersions[packageName] = metadata.version(packageName)
+    except Exception :
+      packageVersions[packageName] = 'unknown'
+  return packageVersions[packageName]
+
+def cpigSourcesDigest() :
+  # A hash of the (Python) source of every cpig module (the templates are
+  # part of the keys of the outputs which use them)
+  #
+  global sourcesDigest
+  if sourcesDigest is None :
+    cpigDir = os.path.dirname(os.path.abspath(__file__))
+    theHash = hashlib.sha256()
+    for aFileName in sorted(os.listdir(cpigDir)) :
+      if not aFileName.endswith('.py') :
+        continue
+      theHash.update(aFileName.encode('utf-8')+b'\0')
+      with open(os.path.join(cpigDir, aFileName), 'rb') as sourceFile :
+        theHash.update(sourceFile.read())
+      theHash.update(b'\0')
+    sourcesDigest = theHash.hexdigest()
+  return sourcesDigest
+
+def cpigVersion() :
+  return packageVersion('interfaceGenerator')+'+'+cpigSourcesDigest()[:16]
+
+def getCacheDir(options) :
+  return os.path.join(options['distDir'], cacheDirName)
+
+def loadBuildCache(options, interfaceName) :
+  global cacheFilePath, forceRebuild, previousKeys, currentKeys
+
+  cacheFilePath = os.path.join(getCacheDir(options), interfaceName+'.json')
+  forceRebuild  = 'force' in options and options['force']
+  previousKeys  = {}
+  currentKeys   = {}
+
+  if forceRebuild or not os.path.isfile(cacheFilePath) :
+    return
+
+  try :
+    with open(cacheFilePath) as cacheFile :
+      cacheData = json.load(cacheFile)
+    if cacheData['cpigVersion'] == cpigVersion() :
+      previousKeys = cacheData['outputs']
+  except Exception as ex :
+    print("Could not load the build cache [{}] (ignoring it)".format(cacheFilePath))
+    print(ex)
+
+def saveBuildCache() :
+  if cacheFilePath is None :
+    return
+
+  try :
+    os.makedirs(os.path.dirname(cacheFilePath), exist_ok=True)
+    with open(cacheFilePath, 'w') as cacheFile :
+      json.dump({
+        'cpigVersion' : cpigVersion(),
+        'outputs'     : currentKeys,
+      }, cacheFile, indent=2, sort_keys=True)
+  except Exception as ex :
+    print("Could not save the build cache [{}]".format(cacheFilePath))
+    print(ex)
+
+def computeBuildKey(*someInputs) :
+  # We hash the (canonical) JSON form of each input so that the key does
+  # not depend upon the order in which the YAML was merged.
+  #
+  theHash = hashlib.sha256()
+  theHash.update(cpigVersion().encode('utf-8'))
+  for anInput in someInputs :
+    theHash.update(b'\0')
+    theHash.update(
+      json.dumps(anInput, sort_keys=True, default=str).encode('utf-8')
+    )
+  return theHash.hexdigest()
+
+def isUpToDate(outputPath, buildKey) :
+  if forceRebuild :
+    return False
+  if outputPath not in previousKeys :
+    return False
+  if previousKeys[outputPath] != buildKey :
+    return False
+  if not os.path.isfile(outputPath) :
+    return False
+  currentKeys[outputPath] = buildKey
+  # (an up to date output is counted as an unchanged output file)
+  cpig.outputWriter.noteOutputFile(False, 0)
+  return True
+
+def recordBuildKey(outputPath, buildKey) :
+  currentKeys[outputPath] = buildKey
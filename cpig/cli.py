@@ -1,13 +1,22 @@
 # For file inclusion consider:
 #   https://github.com/jreese/markdown-pp
 import click
-import copy
+import concurrent.futures
+import contextlib
+import cpig.backends
+import cpig.buildCache
 import cpig.loadInterface
+import cpig.outputWriter
 import cpig.generateCode
-import datamodel_code_generator
+import cpig.profiler
+import cpig.validateExamples
+import cpig.watch
+import glob
+import io
 import json
 import os
 import sys
+import traceback
 import yaml
 
 def loadConfig(configFile, verbose) :
@@ -15,17 +24,24 @@ def loadConfig(configFile, verbose) :
     'options' : {
       'distDir'             : 'dist',
       'interfacesDir'       : 'interfaces',
+      'jobs'                : 1,
+      'threads'             : 1,
       'outputPathTemplates' : {
         'pydantic'              : [ 'python', '{}.py' ],
         'ajv'                   : [ 'js',     '{}_ajv.mjs' ],
+        'ajvShared'             : [ 'js',     '{}AjvValidators.mjs' ],
+        'pythonValidators'      : [ 'python', '{}Validators.py' ],
+        'payloads'              : [ 'payloads', '{}.ndjson' ],
         'pythonExamples'        : [ 'python', '{}Examples.py' ],
         'javaScriptExamples'    : [ 'js',     '{}Examples.mjs' ],
         'httpRouteUtils'        : [ 'js',     '{}HttpRouteUtils.mjs'],
         'mockServerExamples'    : [ 'js',     '{}MockServerExamples.mjs' ],
         'mithrilExamples'       : [ 'js',     '{}MithrilExamples.mjs' ],
         'mithrilConnectors'     : [ 'js',     '{}MithrilConnectors.mjs'],
+        'sseClients'            : [ 'js',     '{}SseClients.mjs'],
         'fastApiRoutes'         : [ 'python', '{}FastApiRoutes.py'],
         'fastApiExamples'       : [ 'python', '{}FastApiExamples.py'],
+        'loadTest'              : [ 'python', '{}LoadTest.py'],
         'natsSubjects'          : [ 'python', '{}NatsSubjects.py']
       },
     }
@@ -48,70 +64,231 @@ def loadConfig(configFile, verbose) :
 
   return config
 
+def generateInterface(config, interfaceName) :
+  # Generate all of the outputs for ONE interface.
+  #
+  # The interfaceName MUST be relative to the current working directory
+  # (which is the base interfaces directory for this interface).
+
+  # (the generators never alter the config, so a shallow copy suffices)
+  config = dict(config)
+  config['outputFiles'] = {}
+  config['outputDirs']  = {}
+
+  cpig.loadInterface.resetInterfaceDescription()
+  cpig.loadInterface.snapshotDir = None
+  if not config['options']['force'] :
+    cpig.loadInterface.snapshotDir = os.path.join(
+      cpig.buildCache.getCacheDir(config['options']), 'snapshots'
+    )
+  cpig.generateCode.resetGenerationErrors()
+  cpig.outputWriter.resetOutputCounts()
+
+  with cpig.profiler.profileSection('stage', 'loadInterfaceFile') :
+    theModel = cpig.loadInterface.loadInterfaceFile(interfaceName)
+
+  with cpig.profiler.profileSection('stage', 'validateJsonExamples') :
+    cpig.validateExamples.validateJsonExamples(config['options'], theModel)
+
+  cpig.buildCache.loadBuildCache(config['options'], theModel.name)
+
+  with cpig.profiler.profileSection('stage', 'computeOutputFileNames') :
+    cpig.generateCode.computeOutputFileNames(config, theModel)
+  #print(yaml.dump(config['outputFiles']))
+  #print(yaml.dump(config['outputDirs']))
+
+  cpig.generateCode.runGenerators(config, theModel)
+
+  #print("----------------------------------------")
+  #print(yaml.dump(config['options']))
+  cpig.generateCode.writeDistPackageInit(config['options'])
+
+  cpig.buildCache.saveBuildCache()
+
+  cpig.outputWriter.reportOutputs()
+
+  return cpig.generateCode.generationErrors
+
+def runInterface(config, interfacePath, captureOutput) :
+  # Run the generation of one interface, isolating any failures.
+  #
+  # When captureOutput is True, everything printed is collected and
+  # returned so that the output of concurrent runs is not interleaved.
+  #
+  # Returns [ interfacePath, errorMessage, capturedOutput ] where
+  # errorMessage is None if the interface was generated successfully.
+
+  outputBuffer = io.StringIO()
+  errorMessage = None
+  startDir     = os.getcwd()
+  with contextlib.ExitStack() as outputContext :
+    if captureOutput :
+      outputContext.enter_context(contextlib.redirect_stdout(outputBuffer))
+    try :
+      baseInterfacesDir = os.path.dirname(interfacePath)
+      if 0 < len(baseInterfacesDir) :
+        os.chdir(baseInterfacesDir)
+      with cpig.profiler.profileSection('interface', interfacePath) :
+        numErrors = generateInterface(config, os.path.basename(interfacePath))
+      if 0 < numErrors :
+        errorMessage = "{} generation error(s)".format(numErrors)
+    except SystemExit as ex :
+      if ex.code :
+        errorMessage = "stopped with exit code {}".format(ex.code)
+    except Exception as ex :
+      errorMessage = "unexpected error: {}".format(ex)
+      traceback.print_exc(file=sys.stdout)
+    finally :
+      os.chdir(startDir)
+
+  return [ interfacePath, errorMessage, outputBuffer.getvalue() ]
+
+def runInterfaceWorker(config, interfacePath, profileOptions) :
+  # Run the generation of one interface in a worker process.
+  #
+  # Returns the runInterface result, extended with this worker's profile
+  # of the interface (if we are profiling)
+  #
+  theProfile = []
+  if profileOptions['profile'] :
+    cpig.profiler.enableProfiling(profileOptions['profileMemory'])
+    cpig.profiler.resetProfile()
+  aResult = runInterface(config, interfacePath, True)
+  if profileOptions['profile'] :
+    theProfile = cpig.profiler.getProfile()
+  aResult.append(theProfile)
+  return aResult
+
+def expandInterfaceNames(interfaceNames) :
+  # Expand any glob patterns (in the order given on the command line)
+  #
+  interfacePaths = []
+  missingPaths   = []
+  for anInterfaceName in interfaceNames :
+    if glob.has_magic(anInterfaceName) :
+      someMatches = sorted(glob.glob(anInterfaceName, recursive=True))
+      if not someMatches :
+        missingPaths.append(anInterfaceName)
+      for aMatch in someMatches :
+        if aMatch not in interfacePaths :
+          interfacePaths.append(aMatch)
+    elif not os.path.isfile(anInterfaceName) :
+      missingPaths.append(anInterfaceName)
+    elif anInterfaceName not in interfacePaths :
+      interfacePaths.append(anInterfaceName)
+  return [ interfacePaths, missingPaths ]
+
+def reportProfile(profileOptions, profileJson, interfacePaths) :
+  if not profileOptions['profile'] :
+    return
+  cpig.profiler.printProfile()
+  if profileJson is not None :
+    cpig.profiler.writeProfileJson(profileJson, interfacePaths)
+
 @click.command()
 @click.option("-c", "--config", 'configFile',
   default="cpigConfig.yaml", show_default=True,
   help="Path to the cpig configuration file.")
 @click.option("-v", "--verbose", count=True,
   help="Provide more detail.")
-@click.argument('interface_name')
+@click.option("-f", "--force", is_flag=True, default=False,
+  help="Ignore the build cache and regenerate all outputs.")
+@click.option("-w", "--workers", default=1, show_default=True,
+  help="Number of interfaces to generate concurrently (0 uses all CPUs).")
+@click.option("-j", "--jobs", type=int, default=None,
+  help="Number of root types to generate concurrently (0 uses all CPUs).")
+@click.option("-t", "--threads", type=int, default=None,
+  help="Number of generator tasks to run concurrently (0 uses all CPUs).")
+@click.option("--watch", is_flag=True, default=False,
+  help="Keep watching the interface and regenerate the outputs affected by each change.")
+@click.option("--profile", is_flag=True, default=False,
+  help="Time each stage and generator, and print a summary.")
+@click.option("--profile-json", "profileJson", default=None,
+  help="Write the profile (as JSON) to this path.")
+@click.option("--profile-memory", "profileMemory", is_flag=True, default=False,
+  help="Also record the peak (tracemalloc) memory of each profiled section.")
+@click.argument('interface_names', nargs=-1, required=True)
 @click.pass_context
-def cli(ctx, configFile, verbose, interface_name):
+def cli(ctx, configFile, verbose, force, workers, jobs, threads, watch,
+  profile, profileJson, profileMemory, interface_names):
   """
   A simple Python tool to generate computer readable Python and JavaScript
   interfaces from Markdown/YAML descriptions.
+
+  Each INTERFACE_NAMES may be the path to an interface file or a glob
+  pattern matching interface files.
   """
 
   config = loadConfig(configFile, verbose)
-  config['outputFiles'] = {}
-  config['outputDirs']  = {}
+  config['options']['force'] = force
+  if jobs is not None :
+    config['options']['jobs'] = jobs
+  if threads is not None :
+    config['options']['threads'] = threads
 
-  baseInterfacesDir = os.path.dirname(interface_name)
-  if 0 < len(baseInterfacesDir) :
-    os.chdir(baseInterfacesDir)
-  interface_name = os.path.basename(interface_name)
+  interfacePaths, missingPaths = expandInterfaceNames(interface_names)
+  for aMissingPath in missingPaths :
+    print("No interface file found for [{}]".format(aMissingPath))
+  if not interfacePaths :
+    sys.exit(-1)
 
-  cpig.loadInterface.loadInterfaceFile(interface_name)
-
-  cpig.generateCode.computeOutputFileNames(
-    config,
-    cpig.loadInterface.interfaceDescription
-  )
-  #print(yaml.dump(config['outputFiles']))
-  #print(yaml.dump(config['outputDirs']))
+  profileOptions = {
+    'profile'       : profile or profileJson is not None or profileMemory,
+    'profileMemory' : profileMemory,
+  }
+  if profileOptions['profile'] :
+    cpig.profiler.enableProfiling(profileMemory)
 
-  cpig.generateCode.pydantic(
-    config,
-    cpig.loadInterface.interfaceDescription
-  )
+  cpig.backends.importConfiguredBackends(config)
 
-  cpig.generateCode.runSchemaTemplates(
-    config,
-    cpig.loadInterface.interfaceDescription
-  )
+  if watch :
+    if 1 < len(interfacePaths) :
+      print("Only one interface can be watched at a time")
+      sys.exit(-1)
+    baseInterfacesDir = os.path.dirname(interfacePaths[0])
+    if 0 < len(baseInterfacesDir) :
+      os.chdir(baseInterfacesDir)
+    try :
+      cpig.watch.watchInterface(config, os.path.basename(interfacePaths[0]))
+    except KeyboardInterrupt :
+      print("")
+    reportProfile(profileOptions, profileJson, interfacePaths)
+    return
 
-  # We run the httpRoutes first as the examples my need to import/require
-  # these files.
+  if workers < 1 :
+    workers = os.cpu_count() or 1
+  workers = min(workers, len(interfacePaths))
 
-  cpig.generateCode.runHttpRouteTemplates(
-    config,
-    cpig.loadInterface.interfaceDescription
-  )
+  results = []
+  if workers < 2 :
+    for anInterfacePath in interfacePaths :
+      results.append(runInterface(config, anInterfacePath, False))
+  else :
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool :
+      futures = [
+        pool.submit(runInterfaceWorker, config, anInterfacePath, profileOptions)
+          for anInterfacePath in interfacePaths
+      ]
+      # report each interface's output in command line order
+      for aFuture in futures :
+        aResult = aFuture.result()
+        print(aResult[2], end='')
+        cpig.profiler.mergeProfile(aResult.pop())
+        results.append(aResult)
 
-  cpig.generateCode.runNatsSubjectsTemplates(
-    config,
-    cpig.loadInterface.interfaceDescription
-  )
+  failures = [ aResult for aResult in results if aResult[1] is not None ]
+  if 1 < len(results) or missingPaths :
+    print("===============================================================")
+    print("Generated {} interface(s): {} succeeded, {} failed".format(
+      len(results), len(results) - len(failures), len(failures)
+    ))
+    for anInterfacePath, errorMessage, capturedOutput in failures :
+      print("  FAILED: {} ({})".format(anInterfacePath, errorMessage))
+    for aMissingPath in missingPaths :
+      print("  MISSING: {}".format(aMissingPath))
+    print("===============================================================")
 
-  cpig.generateCode.runExampleTemplates(
-    config,
-    cpig.loadInterface.interfaceDescription
-  )
+  reportProfile(profileOptions, profileJson, interfacePaths)
 
-  #print("----------------------------------------")
-  #print(yaml.dump(config['options']))
-  with open(
-    os.path.join(config['options']['distDir'], '__init__.py'),
-    "w"
-  ) as initFile :
-    initFile.write("# This file makes this directory a Python package\n\n")
\ No newline at end of file
+  if failures or missingPaths :
+    sys.exit(-1)
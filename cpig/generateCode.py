@@ -2,98 +2,166 @@
 # For file inclusion consider:
 #   https://github.com/jreese/markdown-pp
 
-import copy
-import datamodel_code_generator
+import hashlib
+import cpig.backends
+import cpig.buildCache
+import cpig.interfaceModel
+import cpig.outputWriter
+import cpig.payloadSynthesizer
+import cpig.profiler
+import cpig.scheduler
+import cpig.validatorCompiler
 import importlib.resources
-import jinja2
+import io
 import json
+import multiprocessing
 import os
 import pathlib
+import re
+import tempfile
+import threading
+import time
 import yaml
 
+# (the generators may run concurrently, see runGenerators)
+#
+generationErrors     = 0
+generationErrorsLock = threading.Lock()
+
+def resetGenerationErrors() :
+  global generationErrors
+  generationErrors = 0
+
+def noteGenerationError() :
+  global generationErrors
+  with generationErrorsLock :
+    generationErrors += 1
+
+# All templates are loaded through ONE (per process) Jinja2 Environment,
+# which caches the compiled templates in memory, and their bytecode on
+# disk (in the cpig build cache directory).
+#
+#   - the cpig templates are named 'cpig:<generationType>.j2'
+#   - the user's (jinja2) templates are named 'file:<absolutePath>'
+#
+jinjaEnvironment     = None
+jinjaEnvironmentLock = threading.Lock()
+
+def getJinjaEnvironment(options) :
+  # (the generators may load their templates concurrently)
+  #
+  global jinjaEnvironment
+  with jinjaEnvironmentLock :
+    if jinjaEnvironment is None :
+      jinja2 = cpig.backends.importBackend(cpig.backends.templateBackend)
+      bytecodeCacheDir = os.path.abspath(
+        os.path.join(cpig.buildCache.getCacheDir(options), 'jinja2')
+      )
+      os.makedirs(bytecodeCacheDir, exist_ok=True)
+      jinjaEnvironment = jinja2.Environment(
+        loader=jinja2.PrefixLoader({
+            'cpig' : jinja2.PackageLoader('cpig', 'templates'),
+            'file' : jinja2.FileSystemLoader(os.path.abspath(os.sep)),
+          },
+          delimiter=':'
+        ),
+        bytecode_cache=jinja2.FileSystemBytecodeCache(bytecodeCacheDir),
+      )
+      jinjaEnvironment.filters['pythonValidators'] = \
+        cpig.validatorCompiler.compileValidators
+      jinjaEnvironment.filters['jsTemplateText'] = jsTemplateText
+      jinjaEnvironment.filters['jsonETag'] = jsonETag
+  return jinjaEnvironment
+
+def jsTemplateText(aStr) :
+  # Escape aStr for use as the (literal) text of a JavaScript template
+  # literal
+  #
+  return aStr.replace('\\', '\\\\').replace('`', '\\`').replace('${', '\\${')
+
+def jsonETag(aJsonValue) :
+  # A (strong, quoted) HTTP ETag of a JSON value, which only changes when
+  # the value changes
+  #
+  canonicalJson = json.dumps(aJsonValue, sort_keys=True, separators=(',', ':'))
+  return '"{}"'.format(
+    hashlib.sha256(canonicalJson.encode('utf-8')).hexdigest()[:32]
+  )
+
 def loadTemplate(options, generationType, generationDetails) :
   jinjaTemplatePath = None
   if 'jinja2' in generationDetails :
     jinjaTemplatePath = generationDetails['jinja2']
     del generationDetails['jinja2']
 
-  theTemplateStr = None
+  templateName = None
   if jinjaTemplatePath and os.path.exists(jinjaTemplatePath) :
-    with open(jinjaTemplatePath, 'r') as jinjaFile :
-      theTemplateStr = jinjaFile.read()
+    templateName = 'file:'+os.path.abspath(jinjaTemplatePath)
   else :
     generationFileName = generationType + '.j2'
     if importlib.resources.is_resource('cpig.templates', generationFileName) :
-      theTemplateStr = importlib.resources.read_text('cpig.templates', generationFileName)
+      templateName = 'cpig:'+generationFileName
       jinjaTemplatePath = 'cpig/'+generationFileName
 
-  if not theTemplateStr :
+  if not templateName :
+    noteGenerationError()
     print("No jinja2 template found for {} [{}]".format(generationType, jinjaTemplatePath))
-    return [ None, jinjaTemplatePath ]
+    return [ None, jinjaTemplatePath, None ]
 
+  theTemplateStr = None
   try :
-    theTemplate = jinja2.Template(theTemplateStr)
+    theEnvironment = getJinjaEnvironment(options)
+    theTemplateStr = theEnvironment.loader.get_source(
+      theEnvironment, templateName
+    )[0]
+    theTemplate = theEnvironment.get_template(templateName)
   except Exception as ex :
+    noteGenerationError()
     print("Could not create the Jinja2 template [{}]".format(jinjaTemplatePath))
     print(ex)
-    return [ None, jinjaTemplatePath ]
+    return [ None, jinjaTemplatePath, theTemplateStr ]
 
-  return [ theTemplate, jinjaTemplatePath ]
-
-def jsonSchemaGenerator(options, interfaceDefinition) :
-  if 1 < options['verbose'] :
-    print("Generating json schema for {}".format(interfaceDefinition['name']))
-
-  preambles = { }
-  if 'jsonSchemaPreambles' in interfaceDefinition :
-    preambles = interfaceDefinition['jsonSchemaPreambles']
-
-  if 'jsonSchemaDefs' not in interfaceDefinition :
-    if 1 < options['verbose'] :
-      print("NO jsonSchemaDefs found in {}".format(interfaceName))
-    return [None, {}]
-  defs = interfaceDefinition['jsonSchemaDefs']
-
-  rootTypes = {}
-  if 'httpRoutes' in interfaceDefinition :
-    httpRoutes = interfaceDefinition['httpRoutes']
-    for  aRouteKey, aRoute in httpRoutes.items() :
-      if 'response' in aRoute :
-        rootTypes[aRoute['response']] = True
-      if 'body' in aRoute :
-        rootTypes[aRoute['body']] = True
+  return [ theTemplate, jinjaTemplatePath, theTemplateStr ]
 
+# The assembled root type JSON schemas are memoized (on each RootType of
+# the interface model). They share their (read-only) sub-structures with
+# the interface's jsonSchemaDefs, so no generator may alter them.
+#
+def assembleJsonSchema(options, theModel, aRootType) :
   if 2 < options['verbose'] :
-    print("rootTypes:")
-    print(yaml.dump(rootTypes))
+    print("Assembling the json schema of {}".format(aRootType.name))
 
-  for aRootType in rootTypes :
-    if aRootType not in defs :
-      continue
+  jsonSchema = {}
+  if aRootType.name in theModel.jsonSchemaPreambles :
+    jsonSchema.update(theModel.jsonSchemaPreambles[aRootType.name])
 
-    somePreamble = {}
-    if aRootType in preambles :
-      somePreamble.update(preambles[aRootType])
+  if 'title' not in jsonSchema :
+    jsonSchema['title'] = aRootType.name
 
-    jsonSchema = {}
-    for aKey, aValue in somePreamble.items() :
-      jsonSchema[aKey] = copy.deepcopy(aValue)
+  jsonSchema.update(theModel.jsonSchemaDefs[aRootType.name])
 
-    if 'title' not in jsonSchema :
-      jsonSchema['title'] = aRootType
+  # only include the definitions which can be reached from this root type
+  #
+  theDefs = {}
+  for aKey, aValue in theModel.jsonSchemaDefs.items() :
+    if aKey in aRootType.reachableDefs :
+      theDefs[aKey] = aValue
 
-    for aKey, aValue in defs[aRootType].items() :
-      jsonSchema[aKey] = copy.deepcopy(aValue)
+  jsonSchema['$defs'] = theDefs
 
-    theDefs = {}
-    for aKey, aValue in defs.items() :
-      theDefs[aKey] = copy.deepcopy(aValue)
+  if 2 < options['verbose'] :
+    print("Assembled {} with schema \n{}".format(aRootType.name, yaml.dump(jsonSchema)))
+  return jsonSchema
 
-    jsonSchema['$defs'] = theDefs
+def jsonSchemaGenerator(options, theModel) :
+  if 1 < options['verbose'] and not theModel.jsonSchemaDefs :
+    print("NO jsonSchemaDefs found in {}".format(theModel.name))
+  for aRootType in theModel.rootTypes :
+    if aRootType.jsonSchema is None :
+      aRootType.jsonSchema = assembleJsonSchema(options, theModel, aRootType)
+    yield [aRootType.name, aRootType.jsonSchema]
 
-    if 2 < options['verbose'] :
-      print("Yielding {} with schema \n{}".format(aRootType, yaml.dump(jsonSchema)))
-    yield [aRootType, jsonSchema]
+packageInitContent = "# This file makes this directory a Python package\n\n"
 
 def getOutputPaths(options, generationType, generationDetails) :
   distDir = options['distDir']
@@ -106,106 +174,227 @@ def getOutputPaths(options, generationType, generationDetails) :
     else:
       outputPathTemplate = outputPathTemplates[generationType]
   else:
-    outputPathTemplate = generationDetails['outputPathTemaplate']
+    outputPathTemplate = generationDetails['outputPathTemplate']
 
-  outputPathTemplate.insert(0, distDir)
-  outputPathTemplate = os.path.join(*outputPathTemplate)
+  outputPathTemplate = os.path.join(distDir, *outputPathTemplate)
   outputDir = os.path.dirname(outputPathTemplate)
 
   packageInitFile = os.path.join(outputDir, '__init__.py')
   if not os.path.isfile(packageInitFile) :
-    os.makedirs(outputDir, exist_ok=True)
-    with open(packageInitFile, 'w') as initFile :
-      initFile.write("# This file makes this directory a Python package\n\n")
+    cpig.outputWriter.writeOutputFile(packageInitFile, packageInitContent)
 
   return [ outputDir, outputPathTemplate ]
 
-def computeOutputFileNames(config, interfaceDefinition) :
-  interfaceName = interfaceDefinition['name']
+def writeDistPackageInit(options) :
+  cpig.outputWriter.writeOutputFile(
+    os.path.join(options['distDir'], '__init__.py'),
+    packageInitContent
+  )
 
-  # python (pydantic) schema file names
+def getGenerators(config, aSection) :
+  # The (generationType, generationDetails) of the generators configured
+  # in one section of the config. Each generator gets its own (shallow)
+  # copy of its details, which it may alter.
   #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genSchema' in generatorOptions :
-    generatorOptions = {
-      'pydantic': generatorOptions['genSchema']['pydantic']
-    }
-
-    for generationType, generationDetails in generatorOptions.items() :
+  if aSection not in config or not config[aSection] :
+    return []
+  return [
+    [ generationType, dict(generationDetails or {}) ]
+      for generationType, generationDetails in config[aSection].items()
+  ]
+
+# The output file keys of the generators which generate one file per
+# interface: config section -> output key suffix
+#
+interfaceOutputSuffixes = {
+  'genExamples'     : '-examples',
+  'genHttpRoutes'   : '-httproutes',
+  'genNatsSubjects' : '-natsSubjects',
+}
+
+# The outputFiles key suffix of each (non-js) schema generator's root type
+# files (all other schema generators use '-rootType-js')
+#
+schemaOutputSuffixes = {
+  'pydantic'         : '-rootType-py',
+  'pythonValidators' : '-rootType-pyValidators',
+  'payloads'         : '-rootType-ndjson',
+}
+
+def schemaOutputSuffix(generationType) :
+  return schemaOutputSuffixes.get(generationType, '-rootType-js')
+
+# The schema generators which write ONE file for all of the root types of
+# an interface (keyed '<generationType>-schemas'). Each root type's
+# '-rootType-js' key names this file, unless another (per root type)
+# schema generator has already claimed it.
+#
+sharedSchemaGenerators = [ 'ajvShared' ]
+
+def computeOutputFileNames(config, theModel) :
+  options = config['options']
+
+  # schema file names (python (pydantic and validators) and js)
+  #
+  # (the pydantic keys come first, the shared schema keys last)
+  #
+  schemaGenerators = sorted(
+    getGenerators(config, 'genSchema'),
+    key=lambda aGenerator : [
+      aGenerator[0] != 'pydantic', aGenerator[0] in sharedSchemaGenerators
+    ]
+  )
+  for generationType, generationDetails in schemaGenerators :
+    outputDir, outputPathTemplate = getOutputPaths(
+      options, generationType, generationDetails)
+    if outputDir is None :
+      continue
+    keySuffix = schemaOutputSuffix(generationType)
+    if generationType in sharedSchemaGenerators :
+      outputFile = os.path.basename(outputPathTemplate.format(theModel.name))
+      config['outputFiles'][generationType+'-schemas'] = outputFile
+      config['outputDirs' ][generationType+'-schemas'] = outputDir
+      for aRootType in theModel.rootTypes :
+        if aRootType.name+keySuffix not in config['outputFiles'] :
+          config['outputFiles'][aRootType.name+keySuffix] = outputFile
+          config['outputDirs' ][aRootType.name+keySuffix] = outputDir
+      continue
+    for aRootType in theModel.rootTypes :
+      outputPath = outputPathTemplate.format(aRootType.name)
+      config['outputFiles'][aRootType.name+keySuffix] = os.path.basename(outputPath)
+      config['outputDirs' ][aRootType.name+keySuffix] = outputDir
+
+  # examples, httpRoute and natsSubjects output file names
+  #
+  for aSection, keySuffix in interfaceOutputSuffixes.items() :
+    for generationType, generationDetails in getGenerators(config, aSection) :
       outputDir, outputPathTemplate = getOutputPaths(
         options, generationType, generationDetails)
       if outputDir is not None:
-        for aRootType, aJsonSchema in jsonSchemaGenerator(options, interfaceDefinition) :
-          outputPath = outputPathTemplate.format(aRootType)
-          config['outputFiles'][aRootType+'-rootType-py'] = os.path.basename(outputPath)
-          config['outputDirs' ][aRootType+'-rootType-py'] = outputDir
-
-  # js schema file names
+        outputPath = outputPathTemplate.format(theModel.name)
+        config['outputFiles'][generationType+keySuffix] = os.path.basename(outputPath)
+        config['outputDirs' ][generationType+keySuffix] = outputDir
+
+def getRootTypeFiles(config) :
+  rootTypeFiles = {}
+  for anOutputKey, anOutputFile in config['outputFiles'].items() :
+    if anOutputKey.endswith('-rootType-js') :
+      rootTypeFiles[anOutputKey.split('-')[0]] = anOutputFile
+  return rootTypeFiles
+
+def getNumJobs(options) :
+  # The number of worker processes to use for the CPU heavy stages
+  #
+  numJobs = 1
+  if 'jobs' in options and options['jobs'] is not None :
+    numJobs = int(options['jobs'])
+  if numJobs < 1 :
+    numJobs = os.cpu_count() or 1
+  if multiprocessing.current_process().daemon :
+    # daemonic processes are not allowed to have children
+    numJobs = 1
+  return numJobs
+
+# datamodel_code_generator time stamps the header of its output, which
+# would make every (otherwise unchanged) model look changed.
+#
+pydanticTimestampMatcher = re.compile(rb"^#\s+timestamp:.*\n", re.MULTILINE)
+
+def removePydanticTimestamp(modelCode) :
+  return pydanticTimestampMatcher.sub(b'', modelCode, count=1)
+
+# datamodel_code_generator (lazily) imports its formatters while it
+# generates a model, which is not safe to do concurrently in threads. (The
+# pydantic models only run concurrently in worker processes)
+#
+pydanticLock = threading.Lock()
+
+def generatePydanticModel(aRootType, aJsonSchemaStr, outputPath) :
+  # Generate the pydantic model for ONE root type.
   #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genSchema' in generatorOptions :
-    generatorOptions = generatorOptions['genSchema']
-    del generatorOptions['pydantic']
-
-    if generatorOptions :
-      for generationType, generationDetails in generatorOptions.items() :
-        outputDir, outputPathTemplate = getOutputPaths(
-          options, generationType, generationDetails)
-        if outputDir is not None:
-          for aRootType, aJsonSchema in jsonSchemaGenerator(options, interfaceDefinition) :
-            outputPath = outputPathTemplate.format(aRootType)
-            config['outputFiles'][aRootType+'-rootType-js'] = os.path.basename(outputPath)
-            config['outputDirs' ][aRootType+'-rootType-js'] = outputDir
-
-  # examples
+  # This may run in a worker process, so everything printed is captured
+  # and returned as:
   #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genExamples' in generatorOptions :
-    generatorOptions = generatorOptions['genExamples']
-    if generatorOptions :
-      for generationType, generationDetails in generatorOptions.items() :
-        outputDir, outputPathTemplate = getOutputPaths(
-          options, generationType, generationDetails)
-        if outputDir is not None:
-          outputPath = outputPathTemplate.format(interfaceName)
-          config['outputFiles'][generationType+'-examples'] = os.path.basename(outputPath)
-          config['outputDirs' ][generationType+'-examples'] = outputDir
-
-  # httpRoute output file names
+  #   [ aRootType, succeeded, capturedOutput, wasWritten, numBytes,
+  #     wallTime, cpuTime ]
   #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genHttpRoutes' in generatorOptions :
-    generatorOptions = generatorOptions['genHttpRoutes']
-    if generatorOptions :
-      for generationType, generationDetails in generatorOptions.items() :
-        outputDir, outputPathTemplate = getOutputPaths(
-          options, generationType, generationDetails)
-        if outputDir is not None:
-          outputPath = outputPathTemplate.format(interfaceName)
-          config['outputFiles'][generationType+'-httproutes'] = os.path.basename(outputPath)
-          config['outputDirs' ][generationType+'-httproutes'] = outputDir
-
-  # natsSubjects output file names
+  startWall    = time.perf_counter()
+  startCpu     = time.process_time()
+  outputBuffer = io.StringIO()
+  succeeded  = False
+  wasWritten = False
+  numBytes   = 0
+  with cpig.scheduler.captureOutput(outputBuffer) :
+    try:
+      datamodel_code_generator = cpig.backends.getGeneratorBackend('pydantic')
+      with tempfile.TemporaryDirectory() as tmpDir :
+        tmpPath = pathlib.Path(tmpDir, os.path.basename(outputPath))
+        with pydanticLock :
+          datamodel_code_generator.generate(
+            aJsonSchemaStr,
+            output=tmpPath,
+          )
+        wasWritten, numBytes = cpig.outputWriter.replaceFileIfChanged(
+          outputPath, removePydanticTimestamp(tmpPath.read_bytes())
+        )
+      succeeded = True
+    except Exception as ex :
+      print("Error found while parsing the [{}] JSON type".format(aRootType))
+      print("  "+"\n    ".join(str(ex).split("\n")))
+      print("(It may have been inside a reference to another type)")
+      print("---------------------------------------------------------------")
+      print(yaml.dump(json.loads(aJsonSchemaStr)))
+      print("---------------------------------------------------------------")
+  return [
+    aRootType, succeeded, outputBuffer.getvalue(), wasWritten, numBytes,
+    time.perf_counter() - startWall, time.process_time() - startCpu
+  ]
+
+def runPydanticTask(config, theModel, aRootType, taskGraph) :
+  # Generate (and report) the pydantic model of ONE root type, in one of
+  # the task graph's worker processes (if it has any)
   #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genNatsSubjects' in generatorOptions :
-    generatorOptions = generatorOptions['genNatsSubjects']
-    if generatorOptions :
-      for generationType, generationDetails in generatorOptions.items() :
-        outputDir, outputPathTemplate = getOutputPaths(
-          options, generationType, generationDetails)
-        if outputDir is not None:
-          outputPath = outputPathTemplate.format(interfaceName)
-          config['outputFiles'][generationType+'-natsSubjects'] = os.path.basename(outputPath)
-          config['outputDirs' ][generationType+'-natsSubjects'] = outputDir
-
-def pydantic(config, interfaceDefinition) :
-  interfaceName = interfaceDefinition['name']
+  aRootTypeKey = aRootType+'-rootType-py'
+  outputDir  = config['outputDirs' ][aRootTypeKey]
+  os.makedirs(outputDir, exist_ok=True)
+  outputPath = os.path.join(outputDir, config['outputFiles'][aRootTypeKey])
+  aJsonSchema = theModel.rootTypesByName[aRootType].jsonSchema
+  buildKey = cpig.buildCache.computeBuildKey(
+    'pydantic',
+    cpig.buildCache.packageVersion('datamodel-code-generator'),
+    config['genSchema']['pydantic'],
+    aJsonSchema,
+  )
+  if cpig.buildCache.isUpToDate(outputPath, buildKey) :
+    print("Unchanged pydantic {} at {}".format(aRootType, outputPath))
+    return
+
+  aJsonSchemaStr = json.dumps(aJsonSchema)
+  if taskGraph.useProcesses() :
+    aResult = taskGraph.submitToProcesses(
+      generatePydanticModel, aRootType, aJsonSchemaStr, outputPath
+    ).result()
+  else :
+    aResult = generatePydanticModel(aRootType, aJsonSchemaStr, outputPath)
+
+  print("Generating pydantic {} to {}".format(aRootType, outputPath))
+  print("---------------------------------------------------------")
+  print(aResult[2], end='')
+  if aResult[1] :
+    cpig.outputWriter.noteOutputFile(aResult[3], aResult[4])
+    cpig.buildCache.recordBuildKey(outputPath, buildKey)
+  else :
+    noteGenerationError()
+  # (the model may have been generated in a worker process, which timed
+  # itself)
+  if cpig.profiler.profilingEnabled :
+    cpig.profiler.recordSection(
+      'generator', 'pydantic:'+aRootType, aResult[5], aResult[6],
+      aResult[4] if aResult[3] else 0
+    )
+
+def addPydanticTasks(taskGraph, config, theModel, schemasTask, someRootTypes=None) :
+  interfaceName = theModel.name
   options = config['options']
   if 'genSchema' not in config :
     return
@@ -216,280 +405,534 @@ def pydantic(config, interfaceDefinition) :
   if 1 < options['verbose'] :
     print("Running pydantic schema templates on {}".format(interfaceName))
 
-  for aRootType, aJsonSchema in jsonSchemaGenerator(options, interfaceDefinition) :
-    aRootTypeKey = aRootType+'-rootType-py'
-    if aRootTypeKey not in config['outputFiles'] :
+  for aRootType in theModel.rootTypeNames() :
+    if someRootTypes is not None and aRootType not in someRootTypes :
       continue
-    outputDir  = config['outputDirs' ][aRootTypeKey]
-    os.makedirs(outputDir, exist_ok=True)
-    outputPath = os.path.join(outputDir, config['outputFiles'][aRootTypeKey])
-    print("Generating pydantic {} to {}".format(aRootType, outputPath))
-    print("---------------------------------------------------------")
-    try:
-      datamodel_code_generator.generate(
-        json.dumps(aJsonSchema),
-        output=pathlib.Path(outputPath),
-      )
-    except Exception as ex :
-      print("Error found while parsing the [{}] JSON type".format(aRootType))
-      print("  "+"\n    ".join(str(ex).split("\n")))
-      print("(It may have been inside a reference to another type)")
-      print("---------------------------------------------------------------")
-      print(yaml.dump(aJsonSchema))
-      print("---------------------------------------------------------------")
-
-def runSchemaTemplates(config, interfaceDefinition) :
-  interfaceName = interfaceDefinition['name']
-  if 1 < config['options']['verbose'] :
-    print("Running schema templates on {}".format(interfaceName))
-  #
-  # setup the collection of generators for our use...
+    if aRootType+'-rootType-py' not in config['outputFiles'] :
+      continue
+    taskGraph.addTask(
+      'pydantic:'+aRootType, runPydanticTask,
+      [ config, theModel, aRootType, taskGraph ], [ schemasTask ],
+      usesProcesses=True
+    )
+
+# The options of the payloads generator (any of which may be overridden,
+# for each root type, in its rootTypes dictionary)
+#
+defaultPayloadOptions = {
+  'seed'                : 0,
+  'targetSize'          : '1MB',
+  'numPayloads'         : None,
+  'maxItems'            : 5,
+  'maxDepth'            : 6,
+  'optionalProbability' : 0.5,
+}
+
+def runPayloadsTask(config, theModel, aRootType) :
+  # Synthesize the payloads of ONE root type
   #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genSchema' not in generatorOptions :
+  generationDetails = config['genSchema']['payloads'] or {}
+  aRootTypeKey = aRootType+schemaOutputSuffix('payloads')
+  outputDir  = config['outputDirs' ][aRootTypeKey]
+  os.makedirs(outputDir, exist_ok=True)
+  outputPath = os.path.join(outputDir, config['outputFiles'][aRootTypeKey])
+  aJsonSchema = theModel.rootTypesByName[aRootType].jsonSchema
+
+  payloadOptions = dict(defaultPayloadOptions)
+  for aKey in defaultPayloadOptions :
+    if aKey in generationDetails :
+      payloadOptions[aKey] = generationDetails[aKey]
+  if 'rootTypes' in generationDetails and \
+    aRootType in (generationDetails['rootTypes'] or {}) :
+    payloadOptions.update(generationDetails['rootTypes'][aRootType] or {})
+
+  buildKey = cpig.buildCache.computeBuildKey(
+    'payloads', payloadOptions, aJsonSchema
+  )
+  if cpig.buildCache.isUpToDate(outputPath, buildKey) :
+    print("Unchanged payloads {} at {}".format(aRootType, outputPath))
     return
-  generatorOptions = generatorOptions['genSchema']
-  del generatorOptions['pydantic']
+  print("Generating payloads {} to {}".format(aRootType, outputPath))
+  print("---------------------------------------------------------")
 
-  for generationType, generationDetails in generatorOptions.items() :
-    if 1 < config['options']['verbose'] :
-      print("Running {} schema templates on {}".format(generationType, interfaceName))
-
-    theTemplate, jinjaTemplatePath = loadTemplate(
-      options, generationType, generationDetails)
-    if theTemplate is None :
-      continue
+  try :
+    targetSize = payloadOptions['targetSize']
+    if targetSize is not None :
+      targetSize = cpig.payloadSynthesizer.parseSize(targetSize)
+    if payloadOptions['numPayloads'] is not None :
+      targetSize = None
+    with cpig.profiler.profileSection('generator', 'payloads:'+aRootType) :
+      cpig.outputWriter.writeOutputStream(
+        outputPath,
+        cpig.payloadSynthesizer.streamPayloadChunks(
+          aJsonSchema,
+          seed=payloadOptions['seed'],
+          targetSize=targetSize,
+          maxPayloads=payloadOptions['numPayloads'],
+          maxItems=payloadOptions['maxItems'],
+          maxDepth=payloadOptions['maxDepth'],
+          optionalProbability=payloadOptions['optionalProbability'],
+        )
+      )
+    cpig.buildCache.recordBuildKey(outputPath, buildKey)
+  except Exception as ex :
+    noteGenerationError()
+    print("Could not synthesize the {} payloads".format(aRootType))
+    print(ex)
 
-    for aRootType, aJsonSchema in jsonSchemaGenerator(options, interfaceDefinition) :
-      aRootTypeKey = aRootType+'-rootType-js'
-      if aRootTypeKey not in config['outputFiles'] :
-        continue
-      outputDir  = config['outputDirs' ][aRootTypeKey]
-      os.makedirs(outputDir, exist_ok=True)
-      outputPath = os.path.join(outputDir, config['outputFiles'][aRootTypeKey])
-      print("Generating {} {} to {}".format(generationType, aRootType, outputPath))
-      print("---------------------------------------------------------")
-
-      generationDetails['interfaceName'] = interfaceName
-      generationDetails['rootType'] = aRootType
-      try :
-        renderedStr = theTemplate.render({
-          'options'     : generationDetails,
-          'outputFiles' : config['outputFiles'],
-          'schema'      : aJsonSchema,
-        })
-        with open(outputPath, 'w') as outFile :
-          outFile.write(renderedStr)
-      except Exception as ex :
-        print("Could not render the Jinja2 template [{}] using the {} JSON Schema".format(jinjaTemplatePath, aRootType ))
-        print(ex)
-        print("---------------------------------------------------------------")
-        print(yaml.dump(aJsonSchema))
-        print("---------------------------------------------------------------")
-
-spaceTranslator = str.maketrans(' ', '_')
-
-def runExampleTemplates(config, interfaceDefinition) :
-
-  interfaceName = interfaceDefinition['name']
-
-  if 'jsonExamples' not in interfaceDefinition :
+def addPayloadsTasks(taskGraph, config, theModel, schemasTask, someRootTypes=None) :
+  interfaceName = theModel.name
+  options = config['options']
+  if 'genSchema' not in config :
     return
-  jsonExamples = interfaceDefinition['jsonExamples']
 
-  if 'httpRoutes' not in interfaceDefinition :
+  if 'payloads' not in config['genSchema'] :
     return
-  httpRoutes = interfaceDefinition['httpRoutes']
-  httpRoutesSorted = list(httpRoutes.keys())
-  httpRoutesSorted.sort()
 
+  if 1 < options['verbose'] :
+    print("Synthesizing payloads for {}".format(interfaceName))
+
+  for aRootType in theModel.rootTypeNames() :
+    if someRootTypes is not None and aRootType not in someRootTypes :
+      continue
+    if aRootType+schemaOutputSuffix('payloads') not in config['outputFiles'] :
+      continue
+    taskGraph.addTask(
+      'payloads:'+aRootType, runPayloadsTask,
+      [ config, theModel, aRootType ], [ schemasTask ]
+    )
+
+def rewriteDefsRefs(aJsonSchema, aDefsId) :
+  # A copy of aJsonSchema whose (local) $defs $refs refer to the $defs of
+  # the (separate) schema aDefsId
+  #
+  if type(aJsonSchema) is dict :
+    newSchema = {}
+    for aKey, aValue in aJsonSchema.items() :
+      if aKey == '$ref' and type(aValue) is str and \
+        aValue.startswith(cpig.interfaceModel.defsRefPrefix) :
+        newSchema[aKey] = aDefsId + aValue
+      else :
+        newSchema[aKey] = rewriteDefsRefs(aValue, aDefsId)
+    return newSchema
+  if type(aJsonSchema) is list :
+    return [ rewriteDefsRefs(aValue, aDefsId) for aValue in aJsonSchema ]
+  return aJsonSchema
+
+def sharedJsonSchemas(options, theModel) :
+  # The (one) schema holding the $defs used by any root type, together
+  # with each root type's schema (without a copy of the $defs)
   #
-  # setup the collection of generators for our use...
+  # Returns [ defsSchema, rootSchemas ]
   #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genExamples' not in generatorOptions :
+  defsId = theModel.name+'Defs.json'
+  someDefs = set()
+  rootSchemas = {}
+  for aRootType, aJsonSchema in jsonSchemaGenerator(options, theModel) :
+    someDefs |= theModel.rootTypesByName[aRootType].reachableDefs
+    rootSchema = {}
+    for aKey, aValue in aJsonSchema.items() :
+      if aKey != '$defs' :
+        rootSchema[aKey] = aValue
+    rootSchemas[aRootType] = rewriteDefsRefs(rootSchema, defsId)
+
+  defsSchema = { '$id' : defsId, '$defs' : {} }
+  for aKey, aValue in theModel.jsonSchemaDefs.items() :
+    if aKey in someDefs :
+      defsSchema['$defs'][aKey] = aValue
+  return [ defsSchema, rootSchemas ]
+
+def runSharedSchemaTemplate(config, theModel, generationType, generationDetails,
+  templateTask) :
+  theTemplate, jinjaTemplatePath, theTemplateStr = templateTask.result
+  if theTemplate is None :
+    return
+  interfaceName = theModel.name
+  options = config['options']
+  anOutputKey = generationType+'-schemas'
+  if anOutputKey not in config['outputFiles'] :
+    return
+  outputDir  = config['outputDirs' ][anOutputKey]
+  os.makedirs(outputDir, exist_ok=True)
+  outputPath = os.path.join(outputDir, config['outputFiles'][anOutputKey])
+
+  defsSchema, rootSchemas = sharedJsonSchemas(options, theModel)
+  generationDetails['interfaceName'] = interfaceName
+  templateOptions = {
+    'options'     : generationDetails,
+    'outputFiles' : config['outputFiles'],
+    'schema'      : defsSchema,
+    'rootSchemas' : rootSchemas,
+  }
+  buildKey = cpig.buildCache.computeBuildKey(
+    generationType, theTemplateStr, templateOptions
+  )
+  if cpig.buildCache.isUpToDate(outputPath, buildKey) :
+    print("Unchanged {} {} at {}".format(generationType, interfaceName, outputPath))
     return
-  generatorOptions = generatorOptions['genExamples']
+  print("Generating {} {} to {}".format(generationType, interfaceName, outputPath))
+  print("---------------------------------------------------------")
 
-  if not generatorOptions :
+  try :
+    with cpig.profiler.profileSection('generator', generationType+':'+interfaceName) :
+      renderedStr = theTemplate.render(templateOptions)
+      cpig.outputWriter.writeOutputFile(outputPath, renderedStr)
+    cpig.buildCache.recordBuildKey(outputPath, buildKey)
+  except Exception as ex :
+    noteGenerationError()
+    print("Could not render the Jinja2 template [{}] using the {} JSON Schemas".format(jinjaTemplatePath, interfaceName))
+    print(ex)
+
+def runSchemaTemplate(config, theModel, generationType, generationDetails,
+  templateTask, aRootType) :
+  theTemplate, jinjaTemplatePath, theTemplateStr = templateTask.result
+  if theTemplate is None :
+    return
+  interfaceName = theModel.name
+  aJsonSchema = theModel.rootTypesByName[aRootType].jsonSchema
+  aRootTypeKey = aRootType+schemaOutputSuffix(generationType)
+  outputDir  = config['outputDirs' ][aRootTypeKey]
+  os.makedirs(outputDir, exist_ok=True)
+  outputPath = os.path.join(outputDir, config['outputFiles'][aRootTypeKey])
+
+  generationDetails['interfaceName'] = interfaceName
+  generationDetails['rootType'] = aRootType
+  templateOptions = {
+    'options'     : generationDetails,
+    'outputFiles' : config['outputFiles'],
+    'schema'      : aJsonSchema,
+  }
+  buildKey = cpig.buildCache.computeBuildKey(
+    generationType, theTemplateStr, templateOptions
+  )
+  if cpig.buildCache.isUpToDate(outputPath, buildKey) :
+    print("Unchanged {} {} at {}".format(generationType, aRootType, outputPath))
     return
-  for generationType, generationDetails in generatorOptions.items() :
+  print("Generating {} {} to {}".format(generationType, aRootType, outputPath))
+  print("---------------------------------------------------------")
 
-    theTemplate, jinjaTemplatePath = loadTemplate(
-      options, generationType, generationDetails)
+  try :
+    with cpig.profiler.profileSection('generator', generationType+':'+aRootType) :
+      renderedStr = theTemplate.render(templateOptions)
+      cpig.outputWriter.writeOutputFile(outputPath, renderedStr)
+    cpig.buildCache.recordBuildKey(outputPath, buildKey)
+  except Exception as ex :
+    noteGenerationError()
+    print("Could not render the Jinja2 template [{}] using the {} JSON Schema".format(jinjaTemplatePath, aRootType ))
+    print(ex)
+    print("---------------------------------------------------------------")
+    print(yaml.dump(aJsonSchema))
+    print("---------------------------------------------------------------")
 
-    generationTypeKey = generationType+'-examples'
-    if generationTypeKey not in config['outputFiles'] :
+def addSchemaTemplateTasks(taskGraph, config, theModel, schemasTask, someRootTypes=None) :
+  interfaceName = theModel.name
+  options = config['options']
+  if 1 < options['verbose'] :
+    print("Running schema templates on {}".format(interfaceName))
+
+  for generationType, generationDetails in getGenerators(config, 'genSchema') :
+    if generationType in [ 'pydantic', 'payloads' ] :
       continue
-    outputDir  = config['outputDirs' ][generationTypeKey]
-    os.makedirs(outputDir, exist_ok=True)
-    outputPath = os.path.join(outputDir, config['outputFiles'][generationTypeKey])
-    print("Generating {} {} to {}".format(generationType, interfaceName, outputPath))
-    print("---------------------------------------------------------")
-
-    for exampleType, exampleDetails in jsonExamples.items() :
-      exampleNum = 0
-      for anExample in exampleDetails :
-        exampleNum += 1
-        if 'title' in anExample :
-          anExample['name'] = anExample['title'].translate(spaceTranslator)
-        else :
-          anExample['name'] = "{}_{}".format(interfaceName, exampleNum)
-
-    generationDetails['interfaceName'] = interfaceName
-    try :
-      templateOptions = {
-              'options'          : generationDetails,
-              'outputFiles'      : config['outputFiles'],
-              'examples'         : jsonExamples,
-              'httpRoutes'       : httpRoutes,
-              'httpRoutesSorted' : httpRoutesSorted,
-            }
-      #print(yaml.dump(templateOptions))
-      renderedStr = theTemplate.render(templateOptions)
-      with open(outputPath, 'w') as outFile :
-        outFile.write(renderedStr)
-    except Exception as ex :
-      print("Could not render the Jinja2 template [{}] using the {} jsonExamples".format(jinjaTemplatePath, interfaceName ))
-      print(ex)
-      print("---------------------------------------------------------------")
-      print(yaml.dump(jsonExamples))
-      print("---------------------")
-      print(yaml.dump(httpRoutes))
-      print("---------------------------------------------------------------")
+    if 1 < options['verbose'] :
+      print("Running {} schema templates on {}".format(generationType, interfaceName))
 
-def runHttpRouteTemplates(config, interfaceDefinition) :
-  interfaceName = interfaceDefinition['name']
+    # (each template is loaded once, and then rendered for each root type)
+    templateTask = taskGraph.addTask(
+      'template:'+generationType, loadTemplate,
+      [ options, generationType, generationDetails ]
+    )
+
+    if generationType in sharedSchemaGenerators :
+      taskGraph.addTask(
+        generationType+':'+interfaceName, runSharedSchemaTemplate,
+        [ config, theModel, generationType, generationDetails, templateTask ],
+        [ schemasTask, templateTask ]
+      )
+      continue
 
-  if 'httpRoutes' not in interfaceDefinition :
-    return
-  httpRoutes = interfaceDefinition['httpRoutes']
-  httpRoutesSorted = list(httpRoutes.keys())
-  httpRoutesSorted.sort()
+    # (each root type renders with its own copy of the generator's
+    # details, as they run concurrently, but the copies are taken before
+    # loadTemplate has removed the template path from the details)
+    renderDetails = dict(generationDetails)
+    renderDetails.pop('jinja2', None)
 
-  if 'jsonSchemaDefs' not in interfaceDefinition :
-    return
-  jsonSchemaDefs = interfaceDefinition['jsonSchemaDefs']
+    for aRootType in theModel.rootTypeNames() :
+      if someRootTypes is not None and aRootType not in someRootTypes :
+        continue
+      if aRootType+schemaOutputSuffix(generationType) not in config['outputFiles'] :
+        continue
+      taskGraph.addTask(
+        generationType+':'+aRootType, runSchemaTemplate,
+        [ config, theModel, generationType, dict(renderDetails),
+          templateTask, aRootType ],
+        [ schemasTask, templateTask ]
+      )
 
-  #
-  # setup the collection of generators for our use...
-  #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genHttpRoutes' not in generatorOptions :
-    return
-  generatorOptions = generatorOptions['genHttpRoutes']
+def runExampleTemplate(config, theModel, generationType, generationDetails) :
+  interfaceName = theModel.name
+  jsonExamples = theModel.examplesByType
+  httpRoutes = theModel.httpRoutes
+  options = config['options']
 
-  if not generatorOptions :
+  theTemplate, jinjaTemplatePath, theTemplateStr = loadTemplate(
+    options, generationType, generationDetails)
+
+  generationTypeKey = generationType+'-examples'
+  outputDir  = config['outputDirs' ][generationTypeKey]
+  os.makedirs(outputDir, exist_ok=True)
+  outputPath = os.path.join(outputDir, config['outputFiles'][generationTypeKey])
+
+  generationDetails['interfaceName'] = interfaceName
+  templateOptions = {
+    'options'          : generationDetails,
+    'outputFiles'      : config['outputFiles'],
+    'examples'           : jsonExamples,
+    'httpRoutes'         : httpRoutes,
+    'httpRoutesSorted'   : theModel.httpRoutesSorted,
+    'routesByMountPoint' : theModel.routesByMountPoint,
+    'httpRouteTrie'      : theModel.httpRouteTrie,
+  }
+  buildKey = cpig.buildCache.computeBuildKey(
+    generationType, theTemplateStr, templateOptions
+  )
+  if cpig.buildCache.isUpToDate(outputPath, buildKey) :
+    print("Unchanged {} {} at {}".format(generationType, interfaceName, outputPath))
     return
-  for generationType, generationDetails in generatorOptions.items() :
+  print("Generating {} {} to {}".format(generationType, interfaceName, outputPath))
+  print("---------------------------------------------------------")
 
-    theTemplate, jinjaTemplatePath = loadTemplate(
-      options, generationType, generationDetails)
+  try :
+    #print(yaml.dump(templateOptions))
+    with cpig.profiler.profileSection('generator', generationType+':'+interfaceName) :
+      renderedStr = theTemplate.render(templateOptions)
+      cpig.outputWriter.writeOutputFile(outputPath, renderedStr)
+    cpig.buildCache.recordBuildKey(outputPath, buildKey)
+  except Exception as ex :
+    noteGenerationError()
+    print("Could not render the Jinja2 template [{}] using the {} jsonExamples".format(jinjaTemplatePath, interfaceName ))
+    print(ex)
+    print("---------------------------------------------------------------")
+    print(yaml.dump(jsonExamples))
+    print("---------------------")
+    print(yaml.dump(httpRoutes))
+    print("---------------------------------------------------------------")
+
+def addExampleTemplateTasks(taskGraph, config, theModel, schemasTask, someRootTypes=None) :
+  if not theModel.hasSection('jsonExamples') :
+    return
+  if not theModel.hasSection('httpRoutes') :
+    return
 
-    generationTypeKey = generationType+'-httproutes'
+  for generationType, generationDetails in getGenerators(config, 'genExamples') :
+    generationTypeKey = generationType+'-examples'
     if generationTypeKey not in config['outputFiles'] :
       continue
-    outputDir  = config['outputDirs' ][generationTypeKey]
-    os.makedirs(outputDir, exist_ok=True)
-    outputPath = os.path.join(outputDir, config['outputFiles'][generationTypeKey])
-    print("Generating {} {} to {}".format(generationType, interfaceName, outputPath))
-    print("---------------------------------------------------------")
-
-    rootTypeFiles = {}
-    for anOutputKey, anOutputFile in config['outputFiles'].items() :
-      if anOutputKey.endswith('-rootType-js') :
-        rootTypeFiles[anOutputKey.split('-')[0]] = anOutputFile
-
-    generationDetails['interfaceName'] = interfaceName
-    try :
-      #print(yaml.dump(config['outputFiles']))
-      #print(yaml.dump(rootTypeFiles))
-      renderedStr = theTemplate.render({
-        'options'          : generationDetails,
-        'outputFiles'      : config['outputFiles'],
-        'rootTypeFiles'    : rootTypeFiles,
-        'httpRoutes'       : httpRoutes,
-        'httpRoutesSorted' : httpRoutesSorted,
-        'jsonSchemaDefs'   : jsonSchemaDefs,
-      })
-      with open(outputPath, 'w') as outFile :
-        outFile.write(renderedStr)
-    except Exception as ex :
-      print("Could not render the Jinja2 template [{}] using the {} httpRoutes".format(jinjaTemplatePath, interfaceName ))
-      print(ex)
-      print("---------------------------------------------------------------")
-      print(yaml.dump(rootTypeFiles))
-      print("---------------------")
-      print(yaml.dump(httpRoutes))
-      print("---------------------")
-      print(yaml.dump(jsonSchemaDefs))
-      print("---------------------------------------------------------------")
-
-def runNatsSubjectsTemplates(config, interfaceDefinition) :
-  interfaceName = interfaceDefinition['name']
+    taskGraph.addTask(
+      generationTypeKey+':'+theModel.name, runExampleTemplate,
+      [ config, theModel, generationType, generationDetails ]
+    )
+
+def runHttpRouteTemplate(config, theModel, generationType, generationDetails) :
+  interfaceName = theModel.name
+  httpRoutes = theModel.httpRoutes
+  jsonSchemaDefs = theModel.jsonSchemaDefs
+  options = config['options']
 
-  if 'natsSubjects' not in interfaceDefinition :
+  theTemplate, jinjaTemplatePath, theTemplateStr = loadTemplate(
+    options, generationType, generationDetails)
+
+  generationTypeKey = generationType+'-httproutes'
+  outputDir  = config['outputDirs' ][generationTypeKey]
+  os.makedirs(outputDir, exist_ok=True)
+  outputPath = os.path.join(outputDir, config['outputFiles'][generationTypeKey])
+
+  rootTypeFiles = getRootTypeFiles(config)
+
+  generationDetails['interfaceName'] = interfaceName
+  templateOptions = {
+    'options'          : generationDetails,
+    'outputFiles'      : config['outputFiles'],
+    'rootTypeFiles'    : rootTypeFiles,
+    'httpRoutes'         : httpRoutes,
+    'httpRoutesSorted'   : theModel.httpRoutesSorted,
+    'routesByMountPoint' : theModel.routesByMountPoint,
+    'httpRouteTrie'      : theModel.httpRouteTrie,
+    'jsonSchemaDefs'     : jsonSchemaDefs,
+  }
+  buildKey = cpig.buildCache.computeBuildKey(
+    generationType, theTemplateStr, templateOptions
+  )
+  if cpig.buildCache.isUpToDate(outputPath, buildKey) :
+    print("Unchanged {} {} at {}".format(generationType, interfaceName, outputPath))
     return
-  natsSubjects = interfaceDefinition['natsSubjects']
+  print("Generating {} {} to {}".format(generationType, interfaceName, outputPath))
+  print("---------------------------------------------------------")
 
-  if 'jsonSchemaDefs' not in interfaceDefinition :
+  try :
+    #print(yaml.dump(config['outputFiles']))
+    #print(yaml.dump(rootTypeFiles))
+    with cpig.profiler.profileSection('generator', generationType+':'+interfaceName) :
+      renderedStr = theTemplate.render(templateOptions)
+      cpig.outputWriter.writeOutputFile(outputPath, renderedStr)
+    cpig.buildCache.recordBuildKey(outputPath, buildKey)
+  except Exception as ex :
+    noteGenerationError()
+    print("Could not render the Jinja2 template [{}] using the {} httpRoutes".format(jinjaTemplatePath, interfaceName ))
+    print(ex)
+    print("---------------------------------------------------------------")
+    print(yaml.dump(rootTypeFiles))
+    print("---------------------")
+    print(yaml.dump(httpRoutes))
+    print("---------------------")
+    print(yaml.dump(jsonSchemaDefs))
+    print("---------------------------------------------------------------")
+
+def addHttpRouteTemplateTasks(taskGraph, config, theModel, schemasTask, someRootTypes=None) :
+  if not theModel.hasSection('httpRoutes') :
     return
-  jsonSchemaDefs = interfaceDefinition['jsonSchemaDefs']
-
-  #
-  # setup the collection of generators for our use...
-  #
-  generatorOptions = copy.deepcopy(config)
-  options = generatorOptions['options']
-  if 'genNatsSubjects' not in generatorOptions :
+  if not theModel.hasSection('jsonSchemaDefs') :
     return
-  generatorOptions = generatorOptions['genNatsSubjects']
 
-  if not generatorOptions :
+  for generationType, generationDetails in getGenerators(config, 'genHttpRoutes') :
+    generationTypeKey = generationType+'-httproutes'
+    if generationTypeKey not in config['outputFiles'] :
+      continue
+    taskGraph.addTask(
+      generationTypeKey+':'+theModel.name, runHttpRouteTemplate,
+      [ config, theModel, generationType, generationDetails ]
+    )
+
+def runNatsSubjectsTemplate(config, theModel, generationType, generationDetails) :
+  interfaceName = theModel.name
+  natsSubjects = theModel.natsSubjects
+  jsonSchemaDefs = theModel.jsonSchemaDefs
+  options = config['options']
+
+  theTemplate, jinjaTemplatePath, theTemplateStr = loadTemplate(
+    options, generationType, generationDetails)
+
+  generationTypeKey = generationType+'-natsSubjects'
+  outputDir  = config['outputDirs' ][generationTypeKey]
+  os.makedirs(outputDir, exist_ok=True)
+  outputPath = os.path.join(outputDir, config['outputFiles'][generationTypeKey])
+
+  rootTypeFiles = getRootTypeFiles(config)
+
+  generationDetails['interfaceName'] = interfaceName
+  templateOptions = {
+    'options'        : generationDetails,
+    'outputFiles'    : config['outputFiles'],
+    'rootTypeFiles'  : rootTypeFiles,
+    'natsSubjects'   : natsSubjects,
+    'jsonSchemaDefs' : jsonSchemaDefs,
+    # the (compiled) subject router
+    'natsSubjectTrie'   : theModel.natsSubjectTrie,
+    'natsRouterSubject' : cpig.interfaceModel.natsRouterSubject(natsSubjects),
+  }
+  buildKey = cpig.buildCache.computeBuildKey(
+    generationType, theTemplateStr, templateOptions
+  )
+  if cpig.buildCache.isUpToDate(outputPath, buildKey) :
+    print("Unchanged {} {} at {}".format(generationType, interfaceName, outputPath))
     return
-  for generationType, generationDetails in generatorOptions.items() :
+  print("Generating {} {} to {}".format(generationType, interfaceName, outputPath))
+  print("---------------------------------------------------------")
 
-    theTemplate, jinjaTemplatePath = loadTemplate(
-      options, generationType, generationDetails)
+  try :
+    #print(yaml.dump(config['outputFiles']))
+    #print(yaml.dump(rootTypeFiles))
+    print(yaml.dump(natsSubjects))
+    with cpig.profiler.profileSection('generator', generationType+':'+interfaceName) :
+      renderedStr = theTemplate.render(templateOptions)
+      cpig.outputWriter.writeOutputFile(outputPath, renderedStr)
+    cpig.buildCache.recordBuildKey(outputPath, buildKey)
+  except Exception as ex :
+    noteGenerationError()
+    print("Could not render the Jinja2 template [{}] using the {} natsSubjects".format(jinjaTemplatePath, interfaceName ))
+    print(ex)
+    print("---------------------------------------------------------------")
+    print(yaml.dump(rootTypeFiles))
+    print("---------------------")
+    print(yaml.dump(natsSubjects))
+    print("---------------------")
+    print(yaml.dump(jsonSchemaDefs))
+    print("---------------------------------------------------------------")
+
+def addNatsSubjectsTemplateTasks(taskGraph, config, theModel, schemasTask, someRootTypes=None) :
+  if not theModel.hasSection('natsSubjects') :
+    return
+  if not theModel.hasSection('jsonSchemaDefs') :
+    return
 
+  for generationType, generationDetails in getGenerators(config, 'genNatsSubjects') :
     generationTypeKey = generationType+'-natsSubjects'
     if generationTypeKey not in config['outputFiles'] :
       continue
-    outputDir  = config['outputDirs' ][generationTypeKey]
-    os.makedirs(outputDir, exist_ok=True)
-    outputPath = os.path.join(outputDir, config['outputFiles'][generationTypeKey])
-    print("Generating {} {} to {}".format(generationType, interfaceName, outputPath))
-    print("---------------------------------------------------------")
-
-    rootTypeFiles = {}
-    for anOutputKey, anOutputFile in config['outputFiles'].items() :
-      if anOutputKey.endswith('-rootType-js') :
-        rootTypeFiles[anOutputKey.split('-')[0]] = anOutputFile
-
-    generationDetails['interfaceName'] = interfaceName
-    try :
-      #print(yaml.dump(config['outputFiles']))
-      #print(yaml.dump(rootTypeFiles))
-      print(yaml.dump(natsSubjects))
-      renderedStr = theTemplate.render({
-        'options'        : generationDetails,
-        'outputFiles'    : config['outputFiles'],
-        'rootTypeFiles'  : rootTypeFiles,
-        'natsSubjects'   : natsSubjects,
-        'jsonSchemaDefs' : jsonSchemaDefs,
-      })
-      with open(outputPath, 'w') as outFile :
-        outFile.write(renderedStr)
-    except Exception as ex :
-      print("Could not render the Jinja2 template [{}] using the {} natsSubjects".format(jinjaTemplatePath, interfaceName ))
-      print(ex)
-      print("---------------------------------------------------------------")
-      print(yaml.dump(rootTypeFiles))
-      print("---------------------")
-      print(yaml.dump(natsSubjects))
-      print("---------------------")
-      print(yaml.dump(jsonSchemaDefs))
-      print("---------------------------------------------------------------")
+    taskGraph.addTask(
+      generationTypeKey+':'+theModel.name, runNatsSubjectsTemplate,
+      [ config, theModel, generationType, generationDetails ]
+    )
+
+# The generation stages, in the order in which their tasks are added to
+# the task graph. Each stage adds the tasks of its generators (one for
+# each generator/root type, or generator/interface, pair) to the graph.
+#
+# The only ordering which matters is that the root type JSON schemas are
+# assembled (once) before they are used, and that each schema template is
+# loaded (once) before it is rendered for each root type. All of the
+# output file names (which the templates may refer to, for example when
+# the examples import the httpRoutes) have already been fixed by
+# computeOutputFileNames, so the stages need not wait for each other.
+#
+generationStages = [
+  [ 'pydantic',              addPydanticTasks ],
+  [ 'schemaTemplates',       addSchemaTemplateTasks ],
+  [ 'payloads',              addPayloadsTasks ],
+  [ 'httpRouteTemplates',    addHttpRouteTemplateTasks ],
+  [ 'natsSubjectsTemplates', addNatsSubjectsTemplateTasks ],
+  [ 'exampleTemplates',      addExampleTemplateTasks ],
+]
+
+# The stages which use the (assembled) root type JSON schemas
+#
+rootTypeStages = [ 'pydantic', 'schemaTemplates', 'payloads' ]
+
+def assembleJsonSchemas(options, theModel) :
+  for aRootType, aJsonSchema in jsonSchemaGenerator(options, theModel) :
+    pass
+
+def getNumThreads(options) :
+  # The number of threads on which to run the generation tasks
+  #
+  numThreads = 1
+  if 'threads' in options and options['threads'] is not None :
+    numThreads = int(options['threads'])
+  if numThreads < 1 :
+    numThreads = os.cpu_count() or 1
+  return numThreads
+
+def runGenerators(config, theModel, someStages=None, someRootTypes=None) :
+  # Run (some of) the generation stages, as one graph of tasks (see
+  # cpig.scheduler) on the configured number of threads. The output of
+  # the tasks is reported in the order in which they were added.
+  #
+  # If someStages is not None, only the named stages are run. If
+  # someRootTypes is not None, the root type stages only (re)generate the
+  # outputs of those root types.
+  #
+  options = config['options']
+  taskGraph = cpig.scheduler.TaskGraph(
+    getNumThreads(options), getNumJobs(options)
+  )
+  schemasTask = None
+  for aStageName, addStageTasks in generationStages :
+    if someStages is not None and aStageName not in someStages :
+      continue
+    if schemasTask is None and aStageName in rootTypeStages :
+      schemasTask = taskGraph.addTask(
+        'jsonSchemas', assembleJsonSchemas, [ options, theModel ]
+      )
+    addStageTasks(taskGraph, config, theModel, schemasTask, someRootTypes)
+
+  with cpig.profiler.profileSection('stage', 'runGenerators') :
+    taskGraph.run()
@@ -0,0 +1,251 @@
+# The (compact) model of a loaded interface
+#
+# The model is built ONCE, after an interface has been loaded (and all of
+# its included files merged), and holds the sections of the interface
+# together with the indexes used by the checks and the generators.
+#
+# The sections are NOT copied, so the model (and every check and
+# generator which uses it) MUST treat them as read-only.
+
+defsRefPrefix = '#/$defs/'
+
+def collectSchemaRefs(aJsonSchema, someRefs) :
+  # Collect the names of all of the $defs referenced (anywhere) inside
+  # aJsonSchema
+  #
+  if type(aJsonSchema) is dict :
+    for aKey, aValue in aJsonSchema.items() :
+      if aKey == '$ref' and type(aValue) is str :
+        if aValue.startswith(defsRefPrefix) :
+          someRefs.add(aValue[len(defsRefPrefix):].split('/')[0])
+      else :
+        collectSchemaRefs(aValue, someRefs)
+  elif type(aJsonSchema) is list :
+    for aValue in aJsonSchema :
+      collectSchemaRefs(aValue, someRefs)
+  return someRefs
+
+def buildRefGraph(defs) :
+  # The $ref dependency graph: jsonType -> set of directly referenced
+  # jsonTypes
+  #
+  refGraph = {}
+  for aDefName, aDef in defs.items() :
+    refGraph[aDefName] = collectSchemaRefs(aDef, set())
+  return refGraph
+
+def reachableDefs(refGraph, someRefs) :
+  reachable = set()
+  toVisit   = list(someRefs)
+  while toVisit :
+    aDefName = toVisit.pop()
+    if aDefName in reachable or aDefName not in refGraph :
+      continue
+    reachable.add(aDefName)
+    toVisit.extend(refGraph[aDefName])
+  return reachable
+
+def enumSet(someValues) :
+  # A set of the (hashable) enum values, or None
+  #
+  try :
+    return frozenset(someValues)
+  except TypeError :
+    return None
+
+def natsSubjectTokens(aSubject) :
+  # The (NATS) tokens of a normalized natsSubject, with '*' or '>' for
+  # each of its subjectParts
+  #
+  someTokens = []
+  if aSubject.get('baseSubject', '') :
+    someTokens = aSubject['baseSubject'].split('.')
+  for aSubjectPart in aSubject.get('subjectParts', []) :
+    someTokens.append(aSubject['subjectWildcards'][aSubjectPart])
+  return someTokens
+
+def buildTokenTrie(someTokenLists) :
+  # The token trie of a collection of [ name, tokens ] lists. Each node is
+  # a [ name (or ""), { token : childNode } ] list (which is also a valid
+  # JSON/Python literal), whose wildcard children are the '*' (one token)
+  # and '>' (all of the remaining tokens) tokens. (The first name wins if
+  # two names have the same tokens)
+  #
+  theTrie = [ "", {} ]
+  for aName, someTokens in someTokenLists :
+    aNode = theTrie
+    for aToken in someTokens :
+      aNode = aNode[1].setdefault(aToken, [ "", {} ])
+    if not aNode[0] :
+      aNode[0] = aName
+  return theTrie
+
+def buildNatsSubjectTrie(natsSubjects) :
+  return buildTokenTrie([
+    [ aSubjectName, natsSubjectTokens(aSubject) ]
+      for aSubjectName, aSubject in natsSubjects.items()
+  ])
+
+def buildHttpRouteTrie(httpRoutes) :
+  # The token trie of the (normalized) httpRoutes, named by their route
+  # names (with a '*' token for each routePart)
+  #
+  someTokenLists = []
+  for aRouteName, aRoute in httpRoutes.items() :
+    if 'mountPoint' not in aRoute :
+      continue
+    someTokens = [ aToken for aToken in aRoute['mountPoint'].split('/') if aToken ]
+    someTokens.extend([ '*' ] * len(aRoute['routeParts']))
+    someTokenLists.append([ aRouteName, someTokens ])
+  return buildTokenTrie(someTokenLists)
+
+def natsRouterSubject(natsSubjects) :
+  # The (one) subscription subject which covers every natsSubject: the
+  # literal tokens shared by all of the subjects followed by '>'
+  #
+  someTokenLists = [
+    natsSubjectTokens(aSubject) for aSubject in natsSubjects.values()
+  ]
+  if not someTokenLists :
+    return '>'
+  # ('>' must match at least one token)
+  maxPrefix = min(len(someTokens) for someTokens in someTokenLists) - 1
+  prefixTokens = []
+  for i in range(max(maxPrefix, 0)) :
+    aToken = someTokenLists[0][i]
+    if aToken in [ '*', '>' ] :
+      break
+    if any(someTokens[i] != aToken for someTokens in someTokenLists) :
+      break
+    prefixTokens.append(aToken)
+  return ".".join(prefixTokens + [ '>' ])
+
+class RootType :
+  # A jsonType used as the body or response of an httpRoute
+  #
+  __slots__ = ( 'name', 'reachableDefs', 'jsonSchema' )
+
+  def __init__(self, name, reachableDefs) :
+    self.name          = name
+    # the names of all of the $defs needed by this root type's schema
+    self.reachableDefs = reachableDefs
+    # the assembled JSON schema (built on first use by cpig.generateCode)
+    self.jsonSchema    = None
+
+class InterfaceModel :
+  __slots__ = (
+    'name',
+    'description',
+    'jsonSchemaPreambles',
+    'jsonSchemaDefs',
+    'httpRoutes',
+    'httpRoutesSorted',
+    'natsSubjects',
+    'examplesByType',
+    'refGraph',
+    'rootTypes',
+    'rootTypesByName',
+    'routesByMountPoint',
+    'subjectsByBaseSubject',
+    'natsSubjectTrie',
+    'httpRouteTrie',
+    'enumSets',
+  )
+
+  def __init__(self, interfaceDescription) :
+    self.name        = interfaceDescription['name']
+    self.description = interfaceDescription
+
+    self.jsonSchemaPreambles = interfaceDescription.get('jsonSchemaPreambles', {})
+    self.jsonSchemaDefs      = interfaceDescription.get('jsonSchemaDefs', {})
+    self.httpRoutes          = interfaceDescription.get('httpRoutes', {})
+    self.natsSubjects        = interfaceDescription.get('natsSubjects', {})
+    self.examplesByType      = interfaceDescription.get('jsonExamples', {})
+    self.httpRoutesSorted    = sorted(self.httpRoutes.keys())
+
+    self.refGraph = buildRefGraph(self.jsonSchemaDefs)
+    self.buildRootTypes()
+    self.buildRouteIndexes()
+    self.buildEnumSets()
+    self.nameExamples()
+
+  def hasSection(self, aSection) :
+    return aSection in self.description
+
+  def buildRootTypes(self) :
+    # The root types (in the order in which the httpRoutes first use them)
+    #
+    self.rootTypes       = []
+    self.rootTypesByName = {}
+    for aRoute in self.httpRoutes.values() :
+      for aKey in [ 'response', 'body' ] :
+        if aKey not in aRoute :
+          continue
+        aRootTypeName = aRoute[aKey]
+        if aRootTypeName in self.rootTypesByName :
+          continue
+        if aRootTypeName not in self.jsonSchemaDefs :
+          continue
+        rootRefs = set(self.refGraph[aRootTypeName])
+        if aRootTypeName in self.jsonSchemaPreambles :
+          collectSchemaRefs(self.jsonSchemaPreambles[aRootTypeName], rootRefs)
+        aRootType = RootType(
+          aRootTypeName, reachableDefs(self.refGraph, rootRefs)
+        )
+        self.rootTypes.append(aRootType)
+        self.rootTypesByName[aRootTypeName] = aRootType
+
+  def buildRouteIndexes(self) :
+    self.routesByMountPoint = {}
+    for aRouteName, aRoute in self.httpRoutes.items() :
+      if 'mountPoint' in aRoute :
+        self.routesByMountPoint[aRoute['mountPoint']] = aRouteName
+    self.httpRouteTrie = buildHttpRouteTrie(self.httpRoutes)
+
+    self.subjectsByBaseSubject = {}
+    for aSubjectName, aSubject in self.natsSubjects.items() :
+      if 'baseSubject' in aSubject :
+        self.subjectsByBaseSubject.setdefault(
+          aSubject['baseSubject'], []
+        ).append(aSubjectName)
+
+    self.natsSubjectTrie = buildNatsSubjectTrie(self.natsSubjects)
+
+  def buildEnumSets(self) :
+    # The (hashable) enumerations of each jsonType (as 'jsonType') and of
+    # each of its (top level) properties (as 'jsonType.propertyName')
+    #
+    self.enumSets = {}
+    for aDefName, aDef in self.jsonSchemaDefs.items() :
+      if type(aDef) is not dict :
+        continue
+      if 'enum' in aDef :
+        someValues = enumSet(aDef['enum'])
+        if someValues is not None :
+          self.enumSets[aDefName] = someValues
+      someProperties = aDef.get('properties', {})
+      if type(someProperties) is not dict :
+        continue
+      for aPropertyName, aProperty in someProperties.items() :
+        if type(aProperty) is dict and 'enum' in aProperty :
+          someValues = enumSet(aProperty['enum'])
+          if someValues is not None :
+            self.enumSets[aDefName+'.'+aPropertyName] = someValues
+
+  def nameExamples(self) :
+    # Give each example the (identifier like) name used by the example
+    # generators
+    #
+    for exampleType, exampleDetails in self.examplesByType.items() :
+      exampleNum = 0
+      for anExample in exampleDetails :
+        exampleNum += 1
+        if 'title' in anExample :
+          anExample['name'] = anExample['title'].translate(spaceTranslator)
+        else :
+          anExample['name'] = "{}_{}".format(self.name, exampleNum)
+
+  def rootTypeNames(self) :
+    return [ aRootType.name for aRootType in self.rootTypes ]
+
+spaceTranslator = str.maketrans(' ', '_')
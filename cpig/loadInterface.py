@@ -1,11 +1,24 @@
+import concurrent.futures
 import copy
+import cpig.backends
+import cpig.buildCache
+import cpig.interfaceModel
+import cpig.profiler
+import hashlib
+import io
 import json
-import jsonschema
 import os
+import pickle
 import re
 import sys
+import tempfile
 import yaml
 
+# We use the (much faster) libyaml based loader whenever PyYAML has been
+# built with libyaml
+#
+yamlSafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 # We validate the following schema using: jsonschema.Draft7Validator
 # see: https://stackoverflow.com/a/13826826
 #
@@ -74,12 +87,42 @@ interfaceSchemasYaml = """
               - POST
               - PUT
               - DELETE
+        eventTypes:
+          # the named (SSE) events of this mount point
+          type: array
+          items:
+            type: string
 
   natsSubjects: { }
     # is a dictionary of NATS subjects -> ????
 """
 
+# The (compiled) validators of the interface schemas, and the draft 7
+# meta-schema, which are created once and then reused for every YAML
+# block.
+#
+interfaceValidators = {}
+metaSchemaValidator = None
+
+def getInterfaceValidator(aSchemaName) :
+  if aSchemaName not in interfaceValidators :
+    jsonschema = cpig.backends.getValidationBackend()
+    interfaceValidators[aSchemaName] = jsonschema.Draft7Validator(
+      getInterfaceSchemas()[aSchemaName]
+    )
+  return interfaceValidators[aSchemaName]
+
+def getMetaSchemaValidator() :
+  global metaSchemaValidator
+  if metaSchemaValidator is None :
+    jsonschema = cpig.backends.getValidationBackend()
+    metaSchemaValidator = jsonschema.Draft7Validator(
+      jsonschema.Draft7Validator.META_SCHEMA
+    )
+  return metaSchemaValidator
+
 def validateJsonData(jsonData, aSchemaName) :
+  interfaceSchemas = getInterfaceSchemas()
   if aSchemaName not in interfaceSchemas :
     print("Interface schema name {} has not been defined".format(aSchemaName))
     print(yaml.dump(jsonData))
@@ -91,10 +134,8 @@ def validateJsonData(jsonData, aSchemaName) :
 
   aSchema = interfaceSchemas[aSchemaName]
   try :
-    jsonschema.validate(
-      instance=jsonData,
-      schema=aSchema,
-    )
+    with cpig.profiler.profileSection('function', 'validateJsonData') :
+      getInterfaceValidator(aSchemaName).validate(jsonData)
   except Exception as ex :
     print("Could not validate the schema {}".format(aSchemaName))
     print("--------------------------------------------------------")
@@ -106,8 +147,11 @@ def validateJsonData(jsonData, aSchemaName) :
     sys.exit(-1)
 
 def validateSchema(aSchemaName, aSchema) :
+  jsonschema = cpig.backends.getValidationBackend()
   try :
-    jsonschema.Draft7Validator.check_schema(aSchema)
+    with cpig.profiler.profileSection('function', 'validateSchema') :
+      for anError in getMetaSchemaValidator().iter_errors(aSchema) :
+        raise jsonschema.exceptions.SchemaError.create_from(anError)
   except Exception as ex :
     print("Could not validate the schema {}".format(aSchemaName))
     print("--------------------------------------------------------")
@@ -198,17 +242,20 @@ def normalizeNatsSubjects(someNatsSubjects) :
       subjectDetails['subjectParts']     = subjectParts
       subjectDetails['subjectWildcards'] = subjectWildcards
 
-def loadInterfaceSchemas() :
+# The interface schemas are parsed (and checked) when they are first used
+#
+interfaceSchemas = None
+
+def getInterfaceSchemas() :
   global interfaceSchemas
   if interfaceSchemas is None :
-    interfaceSchemas = yaml.safe_load(interfaceSchemasYaml)
-    normalizeJsonSchema(interfaceSchemas)
-    for aSchemaName, aSchema in interfaceSchemas.items() :
+    someSchemas = yaml.load(interfaceSchemasYaml, Loader=yamlSafeLoader)
+    normalizeJsonSchema(someSchemas)
+    for aSchemaName, aSchema in someSchemas.items() :
       if aSchemaName != 'jsonSchemaDefs' :
         validateSchema(aSchemaName, aSchema)
-
-interfaceSchemas = None
-loadInterfaceSchemas()
+    interfaceSchemas = someSchemas
+  return interfaceSchemas
 
 def normalizeJsonExample(newYamlData) :
   # we have found a jsonExample which we need to deal with
@@ -297,29 +344,71 @@ def mergeYamlData(yamlData, newYamlData, thePath) :
 
 interfaceDescription = {}
 
-def addYamlBlock(yamlLines) :
-  newYamlData = None
+# The (cpig.interfaceModel.InterfaceModel) model of the loaded
+# interfaceDescription
+#
+loadedModel = None
+
+# The [ fileName, lineNumber ] sources of each jsonExample, as a
+# dictionary of exampleType -> list of sources (in the same order as the
+# examples in interfaceDescription['jsonExamples'][exampleType])
+#
+jsonExampleSources = {}
+
+def resetInterfaceDescription() :
+  # Forget any previously loaded interface (so that one process can load
+  # many interfaces, one after another)
+  #
+  global loadedModel
+  interfaceDescription.clear()
+  jsonExampleSources.clear()
+  loadedModel = None
+
+def parseYamlBlock(yamlLines) :
+  # Parse (but do not yet normalise) one YAML code block
+  #
+  # Returns [ newYamlData, errorMessage ]
+  #
   try :
-    newYamlData = []
-    for someYaml in yaml.safe_load_all("\n".join(yamlLines)) :
-      newYamlData.append(someYaml)
+    with cpig.profiler.profileSection('function', 'parseYamlBlock') :
+      newYamlData = []
+      someDocuments = yaml.load_all("\n".join(yamlLines), Loader=yamlSafeLoader)
+      for someYaml in someDocuments :
+        newYamlData.append(someYaml)
   except Exception as ex:
-    print("Could not parse the YAML code block: ")
-    print("--------------------------------------------------------------")
-    print("\n  ".join(yamlLines))
-    print("--------------------------------------------------------------")
-    print("Error: {}".format(ex))
-    print("--------------------------------------------------------------")
+    return [ None, str(ex) ]
+  return [ newYamlData, None ]
+
+def yamlSourceStr(yamlSource) :
+  if yamlSource is None :
+    return ""
+  return " (in {} line {})".format(*yamlSource)
+
+def reportYamlParseError(yamlLines, errorMessage, yamlSource=None) :
+  print("Could not parse the YAML code block{}: ".format(yamlSourceStr(yamlSource)))
+  print("--------------------------------------------------------------")
+  print("\n  ".join(yamlLines))
+  print("--------------------------------------------------------------")
+  print("Error: {}".format(errorMessage))
+  print("--------------------------------------------------------------")
+
+def normalizeYamlData(newYamlData, yamlLines, yamlSource=None) :
+  # Check and normalise the (parsed) data of one YAML code block
+  #
+  # yamlSource is the [ fileName, lineNumber ] of the block (if known)
+  #
+  # Returns the normalised YAML data, or None if the block could not be
+  # normalised (or is empty)
+  #
   if not newYamlData :
-    return # there is no YAML data (that we could parse) in this block
-  # Check and normalise the loaded YAML data
+    return None # there is no YAML data (that we could parse) in this block
   #
   if type(newYamlData[0]) is not dict :
-    print("The base of a YAML block MUST be a dictionary")
-    return
+    print("The base of a YAML block MUST be a dictionary{}".format(yamlSourceStr(yamlSource)))
+    return None
   if len(newYamlData[0]) != 1 :
-    print("The base of a YAML block must contain ONE key/value")
-    return
+    print("The base of a YAML block must contain ONE key/value{}".format(yamlSourceStr(yamlSource)))
+    return None
   #
   if 'jsonSchemaDefs' in newYamlData[0] :
     newYamlData = newYamlData[0]
@@ -340,21 +429,46 @@ def addYamlBlock(yamlLines) :
     newYamlData = newYamlData[0]
     validateJsonData(newYamlData, 'jsonSchemaPreambles')
   else :
-    print("The YAML block must contain a 'jsonSchemaPreambles', 'jsonSchemaDefs', 'jsonExamples', 'httpRoutes' or 'natsSubjects' definition.")
+    print("The YAML block must contain a 'jsonSchemaPreambles', 'jsonSchemaDefs', 'jsonExamples', 'httpRoutes' or 'natsSubjects' definition{}.".format(yamlSourceStr(yamlSource)))
     print("--------------------------------------------------------------")
     print("\n  ".join(yamlLines))
     print("--------------------------------------------------------------")
-    return
+    return None
 
-  # Check and merge the normalised YAML data
-  #
-  if newYamlData is None :
-    return # the normalisation failed....
+  return newYamlData
+
+def mergeNormalizedYamlData(newYamlData, yamlSource=None) :
+  # Merge the (normalised) data of one YAML code block
   #
   mergeYamlData(interfaceDescription, newYamlData, "")
 
+  if 'jsonExamples' in newYamlData :
+    for exampleType in newYamlData['jsonExamples'] :
+      if exampleType not in jsonExampleSources :
+        jsonExampleSources[exampleType] = []
+      jsonExampleSources[exampleType].append(yamlSource)
 
-def checkEntityInterfaceMapping() :
+def addYamlData(newYamlData, yamlLines, yamlSource=None) :
+  # Check, normalise and merge the (parsed) data of one YAML code block
+  #
+  # Returns the normalised YAML data (or None if the block could not be
+  # normalised)
+  #
+  newYamlData = normalizeYamlData(newYamlData, yamlLines, yamlSource)
+  if newYamlData is None :
+    return None # the normalisation failed....
+  mergeNormalizedYamlData(newYamlData, yamlSource)
+  return newYamlData
+
+def addYamlBlock(yamlLines, yamlSource=None) :
+  newYamlData, errorMessage = parseYamlBlock(yamlLines)
+  if errorMessage is not None :
+    reportYamlParseError(yamlLines, errorMessage, yamlSource)
+    return
+  with cpig.profiler.profileSection('function', 'addYamlData') :
+    addYamlData(newYamlData, yamlLines, yamlSource)
+
+def checkEntityInterfaceMapping(theModel) :
   # The over all interface MUST have an entityInterfaceMapping
   #
   # AND all of the mount points MUST have been defined
@@ -362,11 +476,11 @@ def checkEntityInterfaceMapping() :
   # AND all of the entityTypes MUST have been defined in the entityType
   #     definition
 
-  if 'jsonExamples' not in interfaceDescription :
+  if not theModel.hasSection('jsonExamples') :
     print("Error no entityInterfaceMapping found (no jsonExamples)")
     print(yaml.dump(interfaceDescription))
     sys.exit(-1)
-  jsonExamples = interfaceDescription['jsonExamples']
+  jsonExamples = theModel.examplesByType
 
   if 'entityInterfaceMapping' not in jsonExamples :
     print("Error no entityInterfaceMapping found")
@@ -379,17 +493,17 @@ def checkEntityInterfaceMapping() :
     print(yaml.dump(entityInterfaceMapping))
     sys.exit(-1)
 
-  if 'httpRoutes' not in interfaceDescription :
+  if not theModel.hasSection('httpRoutes') :
     print("Error no httpRoutes defined for entityInterfaceMapping")
     print(yaml.dump(interfaceDescription))
     sys.exit(-1)
-  httpRoutes = interfaceDescription['httpRoutes']
+  httpRoutes = theModel.httpRoutes
 
-  if 'jsonSchemaDefs' not in interfaceDescription :
+  if not theModel.hasSection('jsonSchemaDefs') :
     print("Error no jsonSchemaDefs defined for entityInterfaceMapping")
     print(yaml.dump(interfaceDescription))
     sys.exit(-1)
-  jsonSchemaDefs = interfaceDescription['jsonSchemaDefs']
+  jsonSchemaDefs = theModel.jsonSchemaDefs
 
   if 'entityType' not in jsonSchemaDefs :
     print("Error no entityType defined in jsonSchemaDefs")
@@ -397,15 +511,11 @@ def checkEntityInterfaceMapping() :
     sys.exit(-1)
   entityTypeDef = jsonSchemaDefs['entityType']
 
-  if (
-    'properties' not in entityTypeDef or
-    'entityType' not in entityTypeDef['properties'] or
-    'enum' not in entityTypeDef['properties']['entityType']
-    ) :
+  if 'entityType.entityType' not in theModel.enumSets :
     print("Error no entityType enumeration in entityType definition")
     print(yaml.dump(entityTypeDef))
     sys.exit(-1)
-  entityTypeEnum = entityTypeDef['properties']['entityType']['enum']
+  entityTypeEnum = theModel.enumSets['entityType.entityType']
 
   entityInterfaceMapping = entityInterfaceMapping['example']
   for entityType, mountPoint in entityInterfaceMapping.items() :
@@ -426,15 +536,294 @@ def checkEntityInterfaceMapping() :
       print("--------------------------------------------------------------------")
       sys.exit(-1)
 
-def checkInterfaceDescription() :
-  checkEntityInterfaceMapping()
+def checkInterfaceDescription(theModel) :
+  checkEntityInterfaceMapping(theModel)
 
 sepTranslator = str.maketrans('/\\', '__')
 includeInterfaceMatcher = re.compile(r"Include\.Interface\:\s\[.+\]\((.+)\)")
 
-def loadInterfaceFile(interfaceFileName) :
+# The maximum number of interface files to parse concurrently
+#
+maxParseWorkers = 8
+
+# The (include keys of the) interface files merged into the last loaded
+# interfaceDescription, in merge order.
+#
+loadedInterfaceFiles = []
+
+# When keepParsedFiles is True (for example when watching an interface)
+# the parsed items of each interface file are kept, and reused until the
+# file's modification time or size changes.
+#
+keepParsedFiles = False
+parsedFileCache = {}
+
+# When snapshotDir is not None, the normalised YAML data of each interface
+# file is kept (as a pickled snapshot) in this directory. A snapshot is
+# keyed on a hash of the file's content and the cpig version, so an
+# unchanged interface file is loaded from its snapshot without parsing or
+# normalising any of its YAML.
+#
+# (snapshotFormat MUST be changed whenever the normalisation, or the
+# structure of the snapshots, changes)
+#
+snapshotDir    = None
+snapshotFormat = 1
+
+def snapshotPath(interfaceFileName) :
+  # (one snapshot per interface file, so old snapshots are replaced
+  # rather than accumulated)
+  #
+  pathHash = hashlib.sha256(
+    os.path.abspath(interfaceFileName).encode('utf-8')
+  ).hexdigest()
+  return os.path.join(snapshotDir, pathHash+'.pickle')
+
+def snapshotKey(fileContent) :
+  theHash = hashlib.sha256(fileContent)
+  theHash.update("\n{}\n{}".format(
+    cpig.buildCache.cpigVersion(), snapshotFormat
+  ).encode('utf-8'))
+  return theHash.hexdigest()
+
+def loadSnapshot(interfaceFileName, aSnapshotKey) :
+  # Returns the snapshot's (normalised) items, or None if there is no
+  # (current) snapshot of this interface file
+  #
+  try :
+    with open(snapshotPath(interfaceFileName), 'rb') as snapshotFile :
+      theSnapshot = pickle.load(snapshotFile)
+  except Exception :
+    return None
+  if type(theSnapshot) is not dict or theSnapshot.get('key') != aSnapshotKey :
+    return None
+  return theSnapshot['items']
+
+def saveSnapshot(interfaceFileName, aSnapshotKey, someItems) :
+  # Atomically write the snapshot of one interface file (a failure to
+  # write a snapshot only means that the file will be parsed again)
+  #
+  thePath = snapshotPath(interfaceFileName)
+  try :
+    os.makedirs(snapshotDir, exist_ok=True)
+    tmpFd, tmpPath = tempfile.mkstemp(
+      dir=snapshotDir, prefix='.'+os.path.basename(thePath)+'.', suffix='.tmp'
+    )
+    try :
+      with os.fdopen(tmpFd, 'wb') as tmpFile :
+        pickle.dump(
+          { 'key' : aSnapshotKey, 'items' : someItems },
+          tmpFile, protocol=pickle.HIGHEST_PROTOCOL
+        )
+      os.replace(tmpPath, thePath)
+    except BaseException :
+      if os.path.exists(tmpPath) :
+        os.unlink(tmpPath)
+      raise
+  except Exception as ex :
+    print("Could not save the interface snapshot [{}]".format(thePath))
+    print(ex)
+
+def interfaceFileStat(interfaceFileName) :
+  try :
+    fileStat = os.stat(interfaceFileName)
+  except OSError :
+    return None
+  return ( fileStat.st_mtime_ns, fileStat.st_size )
+
+def scanInterfaceFile(interfaceFileName, fileContent=None) :
+  # A streaming scanner which yields (in file order) the includes and the
+  # fenced yaml code blocks of one interface file, as either:
+  #
+  #   [ 'include', includedFileName, lineNumber ]
+  #   [ 'yaml',    yamlLines,        lineNumber ]
+  #
+  # (the line number of a yaml block is that of its first YAML line)
+  #
+  # If the (bytes) fileContent has already been read, it is scanned
+  # instead of re-reading the file.
+  #
+  if fileContent is None :
+    interfaceFile = open(interfaceFileName)
+  else :
+    interfaceFile = io.TextIOWrapper(io.BytesIO(fileContent))
+  with interfaceFile as interface :
+    insideYaml  = False
+    theYaml     = []
+    yamlLineNum = 0
+    for lineNum, line in enumerate(interface, 1) :
+      line = line.rstrip()
+      if insideYaml :
+        if line != "```" :
+          theYaml.append(line)
+        else :
+          yield [ 'yaml', theYaml, yamlLineNum ]
+          theYaml = []
+          insideYaml = False
+      else :
+        includeMatch = includeInterfaceMatcher.search(line)
+        if includeMatch :
+          yield [ 'include', includeMatch.group(1), lineNum ]
+        elif line != "```yaml" :
+          pass
+        else :
+          insideYaml  = True
+          yamlLineNum = lineNum + 1
+
+def parseInterfaceFile(interfaceFileName) :
+  # Scan one interface file and parse (but do not normalise) its yaml
+  # code blocks, unless the file has a current snapshot. This may run
+  # concurrently with the parsing of other interface files, so it MUST
+  # NOT print anything.
+  #
+  # Returns a list of (in file order):
+  #
+  #   [ 'include',    includedFileName, lineNumber ]
+  #   [ 'yaml',       yamlLines,        lineNumber, newYamlData, errorMessage ]
+  #   [ 'normalized', pickledYamlData,  lineNumber ]
+  #   [ 'error',      errorMessage ]
+  #
+  # where the 'normalized' items (whose YAML data is pickled, so that the
+  # items can be cheaply copied) come from a snapshot. The items of a
+  # file which should be snapshotted end with:
+  #
+  #   [ 'snapshot', snapshotKey ]
+  #
+  parsedItems = []
+  try :
+    fileContent = None
+    if snapshotDir is not None :
+      with open(interfaceFileName, 'rb') as interfaceFile :
+        fileContent = interfaceFile.read()
+      aSnapshotKey = snapshotKey(fileContent)
+      with cpig.profiler.profileSection('function', 'loadSnapshot') :
+        someItems = loadSnapshot(interfaceFileName, aSnapshotKey)
+      if someItems is not None :
+        return someItems
+    for anItem in scanInterfaceFile(interfaceFileName, fileContent) :
+      if anItem[0] == 'yaml' :
+        anItem.extend(parseYamlBlock(anItem[1]))
+      parsedItems.append(anItem)
+    if snapshotDir is not None :
+      parsedItems.append([ 'snapshot', aSnapshotKey ])
+  except Exception as ex :
+    parsedItems.append([ 'error', str(ex) ])
+  return parsedItems
+
+def includeKey(interfaceFileName) :
+  return os.path.normpath(interfaceFileName)
+
+def parseInterfaceFileCached(interfaceFileName) :
+  if not keepParsedFiles :
+    return parseInterfaceFile(interfaceFileName)
+
+  # the normalisation and merging of the parsed YAML data alters it in
+  # place, so we only ever hand out copies of the cached items
+  #
+  aKey     = includeKey(interfaceFileName)
+  fileStat = interfaceFileStat(interfaceFileName)
+  if aKey not in parsedFileCache or parsedFileCache[aKey][0] != fileStat :
+    parsedFileCache[aKey] = [ fileStat, parseInterfaceFile(interfaceFileName) ]
+  return copy.deepcopy(parsedFileCache[aKey][1])
+
+def parseIncludeGraph(interfaceFileName) :
+  # Parse the interface file and (transitively) all of the files it
+  # includes, each file exactly once.
+  #
+  # All of the (newly discovered) files at the same include depth are
+  # parsed concurrently.
+  #
+  # Returns a dictionary of includeKey -> parsedItems
+  #
+  parsedFiles = {}
+  toParse = [ interfaceFileName ]
+  with concurrent.futures.ThreadPoolExecutor(max_workers=maxParseWorkers) as pool :
+    while toParse :
+      futures = {}
+      for aFileName in toParse :
+        futures[includeKey(aFileName)] = pool.submit(
+          parseInterfaceFileCached, aFileName
+        )
+      toParse = []
+      for aKey, aFuture in futures.items() :
+        parsedFiles[aKey] = aFuture.result()
+        for anItem in parsedFiles[aKey] :
+          if anItem[0] != 'include' :
+            continue
+          anIncludeKey = includeKey(anItem[1])
+          if anIncludeKey in parsedFiles or anIncludeKey in futures :
+            continue
+          if anIncludeKey in map(includeKey, toParse) :
+            continue
+          toParse.append(anItem[1])
+  return parsedFiles
+
+def mergeInterfaceFile(interfaceFileName, parsedFiles, includeStack, mergedFiles) :
+  # Merge the (parsed) yaml code blocks of one interface file, and
+  # recursively those of its includes, in file order. A file which has
+  # already been merged (from an earlier include) is not merged again.
+  #
+  aKey = includeKey(interfaceFileName)
+  if aKey in includeStack :
+    print("Include cycle found: {}".format(
+      " -> ".join(includeStack[includeStack.index(aKey):] + [ aKey ])
+    ))
+    sys.exit(-1)
+  if aKey in mergedFiles :
+    return
+  mergedFiles.append(aKey)
+  includeStack.append(aKey)
+
   print("Working on {}".format(interfaceFileName))
 
+  # The (normalised) items of this file, which are only snapshotted if
+  # every yaml code block could be normalised. (The merge alters the
+  # normalised data in place, so each block is pickled before it is
+  # merged)
+  #
+  snapshotItems = []
+  canSnapshot   = True
+
+  for anItem in parsedFiles[aKey] :
+    if anItem[0] == 'include' :
+      mergeInterfaceFile(anItem[1], parsedFiles, includeStack, mergedFiles)
+      snapshotItems.append(anItem)
+    elif anItem[0] == 'yaml' :
+      itemType, yamlLines, lineNum, newYamlData, errorMessage = anItem
+      yamlSource = [ interfaceFileName, lineNum ]
+      if errorMessage is not None :
+        reportYamlParseError(yamlLines, errorMessage, yamlSource)
+        canSnapshot = False
+        continue
+      with cpig.profiler.profileSection('function', 'addYamlData') :
+        newYamlData = normalizeYamlData(newYamlData, yamlLines, yamlSource)
+        if newYamlData is None :
+          canSnapshot = canSnapshot and not anItem[3]
+          continue
+        if canSnapshot :
+          snapshotItems.append([ 'normalized', pickle.dumps(
+            newYamlData, protocol=pickle.HIGHEST_PROTOCOL
+          ), lineNum ])
+        mergeNormalizedYamlData(newYamlData, yamlSource)
+    elif anItem[0] == 'normalized' :
+      itemType, newYamlData, lineNum = anItem
+      mergeNormalizedYamlData(pickle.loads(newYamlData), [ interfaceFileName, lineNum ])
+    elif anItem[0] == 'snapshot' :
+      if canSnapshot :
+        saveSnapshot(interfaceFileName, anItem[1], snapshotItems)
+    else :
+      print("Could not load the interface file [{}]".format(interfaceFileName))
+      print(anItem[1])
+      sys.exit(-1)
+
+  includeStack.pop()
+
+def loadInterfaceFile(interfaceFileName) :
+  # Load (and check) the interface, and build its model
+  #
+  # Returns the (cpig.interfaceModel.InterfaceModel) model
+  #
+  global loadedModel
   shouldCheckInterfaceDescription = False
   if 'name' not in interfaceDescription :
     # the name of the first interface file loaded... wins...
@@ -442,28 +831,13 @@ def loadInterfaceFile(interfaceFileName) :
     interfaceDescription['name'] = baseName.translate(sepTranslator)
     shouldCheckInterfaceDescription = True
 
-  interface = open(interfaceFileName)
-  lines = interface.readlines()
-  interface.close()
-  insideYaml = False
-  theYaml = []
-  for line in lines :
-    line = line.rstrip()
-    if insideYaml :
-      if line != "```" :
-        theYaml.append(line)
-      else :
-        addYamlBlock(theYaml)
-        theYaml = []
-        insideYaml = False
-    else :
-      includeMatch = includeInterfaceMatcher.search(line)
-      if includeMatch :
-        loadInterfaceFile(includeMatch.group(1))
-      elif line != "```yaml" :
-        pass
-      else :
-        insideYaml = True
+  parsedFiles = parseIncludeGraph(interfaceFileName)
+  loadedInterfaceFiles.clear()
+  mergeInterfaceFile(interfaceFileName, parsedFiles, [], loadedInterfaceFiles)
+
+  loadedModel = cpig.interfaceModel.InterfaceModel(interfaceDescription)
 
   if shouldCheckInterfaceDescription :
-    checkInterfaceDescription()
+    checkInterfaceDescription(loadedModel)
+
+  return loadedModel
@@ -0,0 +1,161 @@
+# The cpig output writer
+#
+# All generated files are written through this module. A file is only
+# (re)written if its content has changed (so that the modification times
+# of unchanged files, and hence any downstream builds, are not disturbed),
+# and changed files are written atomically (to a temporary file which is
+# then renamed over the original).
+
+import hashlib
+import os
+import secrets
+import stat
+import threading
+
+# (output files may be written concurrently, see cpig.scheduler)
+#
+filesWritten   = 0
+filesUnchanged = 0
+bytesWritten   = 0
+countsLock     = threading.Lock()
+
+# the bytes written by each thread (see cpig.profiler)
+#
+threadCounts = threading.local()
+
+def resetOutputCounts() :
+  global filesWritten, filesUnchanged, bytesWritten
+  filesWritten   = 0
+  filesUnchanged = 0
+  bytesWritten   = 0
+
+def noteOutputFile(wasWritten, numBytes) :
+  global filesWritten, filesUnchanged, bytesWritten
+  with countsLock :
+    if wasWritten :
+      filesWritten += 1
+      bytesWritten += numBytes
+    else :
+      filesUnchanged += 1
+  if wasWritten :
+    threadCounts.bytesWritten = threadBytesWritten() + numBytes
+
+def threadBytesWritten() :
+  # The number of bytes written (ever) by the current thread
+  #
+  return getattr(threadCounts, 'bytesWritten', 0)
+
+def fileDigest(filePath) :
+  theHash = hashlib.sha256()
+  try :
+    with open(filePath, 'rb') as theFile :
+      for aChunk in iter(lambda : theFile.read(1 << 20), b'') :
+        theHash.update(aChunk)
+  except OSError :
+    return None
+  return theHash.hexdigest()
+
+def createTempFile(outputPath) :
+  # Create a new temporary file (in the same directory as outputPath) to
+  # be renamed over outputPath.
+  #
+  # The file is created with the mode 0o666 (less the process's umask, as
+  # any new file would be), unless outputPath already exists, in which
+  # case it is given the mode of the existing file.
+  #
+  # Returns [ tmpFd, tmpPath ]
+  #
+  outputDir = os.path.dirname(outputPath)
+  if outputDir :
+    os.makedirs(outputDir, exist_ok=True)
+  tmpPrefix = os.path.join(outputDir, '.'+os.path.basename(outputPath)+'.')
+  openFlags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+  while True :
+    tmpPath = tmpPrefix + secrets.token_hex(4) + '.tmp'
+    try :
+      tmpFd = os.open(tmpPath, openFlags, 0o666)
+      break
+    except FileExistsError :
+      continue
+  try :
+    os.chmod(tmpPath, stat.S_IMODE(os.stat(outputPath).st_mode))
+  except FileNotFoundError :
+    pass
+  except BaseException :
+    os.close(tmpFd)
+    os.unlink(tmpPath)
+    raise
+  return [ tmpFd, tmpPath ]
+
+def replaceFileIfChanged(outputPath, content) :
+  # Write content (a str or bytes) to outputPath, unless the file already
+  # has exactly this content.
+  #
+  # Returns [ wasWritten, numBytes ] (but does not count the file)
+  #
+  if isinstance(content, str) :
+    content = content.encode('utf-8')
+
+  if fileDigest(outputPath) == hashlib.sha256(content).hexdigest() :
+    return [ False, len(content) ]
+
+  tmpFd, tmpPath = createTempFile(outputPath)
+  try :
+    with os.fdopen(tmpFd, 'wb') as tmpFile :
+      tmpFile.write(content)
+    os.replace(tmpPath, outputPath)
+  except BaseException :
+    if os.path.exists(tmpPath) :
+      os.unlink(tmpPath)
+    raise
+  return [ True, len(content) ]
+
+def replaceFileWithStream(outputPath, someChunks) :
+  # Write the (bytes) chunks of an iterable to outputPath, in constant
+  # memory, unless the file already has exactly this content (in which
+  # case the file is left untouched).
+  #
+  # Returns [ wasWritten, numBytes ] (but does not count the file)
+  #
+  tmpFd, tmpPath = createTempFile(outputPath)
+  theHash  = hashlib.sha256()
+  numBytes = 0
+  try :
+    with os.fdopen(tmpFd, 'wb') as tmpFile :
+      for aChunk in someChunks :
+        theHash.update(aChunk)
+        numBytes += len(aChunk)
+        tmpFile.write(aChunk)
+    if fileDigest(outputPath) == theHash.hexdigest() :
+      os.unlink(tmpPath)
+      return [ False, numBytes ]
+    os.replace(tmpPath, outputPath)
+  except BaseException :
+    if os.path.exists(tmpPath) :
+      os.unlink(tmpPath)
+    raise
+  return [ True, numBytes ]
+
+def writeOutputFile(outputPath, content) :
+  # Write (and count) one output file.
+  #
+  # Returns True if the file was (re)written
+  #
+  wasWritten, numBytes = replaceFileIfChanged(outputPath, content)
+  noteOutputFile(wasWritten, numBytes)
+  return wasWritten
+
+def writeOutputStream(outputPath, someChunks) :
+  # Write (and count) one (large) output file from an iterable of (bytes)
+  # chunks.
+  #
+  # Returns True if the file was (re)written
+  #
+  wasWritten, numBytes = replaceFileWithStream(outputPath, someChunks)
+  noteOutputFile(wasWritten, numBytes)
+  return wasWritten
+
+def reportOutputs() :
+  print("Wrote {} output file(s) ({} bytes), {} unchanged".format(
+    filesWritten, bytesWritten, filesUnchanged
+  ))
@@ -0,0 +1,379 @@
+# Synthesize (valid) JSON payloads from (draft 7) JSON schemas
+#
+# The synthesizer walks an assembled root type schema, following local
+# $refs, enums/consts, required/optional properties, arrays (and tuples),
+# dictionaries (additionalProperties) and the anyOf/oneOf/allOf
+# combinators, and builds random (but reproducible, for a given seed)
+# payloads which its schema accepts.
+#
+# The payloads are streamed, one JSON document per line (NDJSON), so that
+# fixtures of any size are written in constant memory.
+#
+# Only a few string formats are understood, and a pattern is only
+# matched by (hex) random strings, optionally after the pattern's literal
+# prefix. When a schema can not be satisfied a PayloadError is raised.
+
+import fractions
+import json
+import math
+import random
+import re
+
+class PayloadError(ValueError) :
+  pass
+
+# The payloads of the string formats which we know how to synthesize
+#
+formatPayloads = {
+  'date-time' : lambda aRandom : "20{:02d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}Z".format(
+    aRandom.randrange(100), aRandom.randint(1, 12), aRandom.randint(1, 28),
+    aRandom.randrange(24), aRandom.randrange(60), aRandom.randrange(60)
+  ),
+  'date'      : lambda aRandom : "20{:02d}-{:02d}-{:02d}".format(
+    aRandom.randrange(100), aRandom.randint(1, 12), aRandom.randint(1, 28)
+  ),
+  'time'      : lambda aRandom : "{:02d}:{:02d}:{:02d}Z".format(
+    aRandom.randrange(24), aRandom.randrange(60), aRandom.randrange(60)
+  ),
+  'email'     : lambda aRandom : "user{}@example.com".format(aRandom.randrange(100000)),
+  'hostname'  : lambda aRandom : "host{}.example.com".format(aRandom.randrange(100000)),
+  'uri'       : lambda aRandom : "https://example.com/{}".format(aRandom.randrange(100000)),
+  'uuid'      : lambda aRandom : "{:08x}-{:04x}-4{:03x}-8{:03x}-{:012x}".format(
+    aRandom.getrandbits(32), aRandom.getrandbits(16), aRandom.getrandbits(12),
+    aRandom.getrandbits(12), aRandom.getrandbits(48)
+  ),
+}
+
+# The number of random strings tried against a pattern
+#
+maxPatternTries = 100
+
+# The literal (alphanumeric) characters at the start of an anchored
+# pattern (which are not followed by a quantifier)
+#
+literalPrefixMatcher = re.compile(r'\^?((?:[A-Za-z0-9_\-](?![*?{]))*)')
+
+# Parse a (synthesis) size such as 1024, "64KB", "10MB" or "2GB" into bytes
+#
+sizeUnits = { '' : 1, 'B' : 1, 'KB' : 1 << 10, 'MB' : 1 << 20, 'GB' : 1 << 30 }
+
+def parseSize(aSize) :
+  if isinstance(aSize, (int, float)) :
+    return int(aSize)
+  aMatch = re.fullmatch(r'\s*([0-9.]+)\s*([KMG]?B?)\s*', str(aSize).upper())
+  if not aMatch :
+    raise PayloadError("Could not parse the size [{}]".format(aSize))
+  return int(float(aMatch.group(1)) * sizeUnits[aMatch.group(2)])
+
+class PayloadSynthesizer :
+  __slots__ = (
+    'rootSchema', 'random', 'maxItems', 'maxDepth', 'optionalProbability',
+    'patterns',
+  )
+
+  def __init__(self, rootSchema, seed=0, maxItems=5, maxDepth=6,
+    optionalProbability=0.5) :
+    self.rootSchema          = rootSchema
+    self.random              = random.Random(seed)
+    self.maxItems            = maxItems
+    self.maxDepth            = maxDepth
+    self.optionalProbability = optionalProbability
+    self.patterns            = {}
+
+  def resolveRef(self, aRef) :
+    if not aRef.startswith('#') :
+      raise PayloadError("Only local $refs can be synthesized (not [{}])".format(aRef))
+    aSchema = self.rootSchema
+    for aToken in aRef[1:].split('/')[1:] :
+      aToken = aToken.replace('~1', '/').replace('~0', '~')
+      if type(aSchema) is list :
+        aToken = int(aToken)
+      aSchema = aSchema[aToken]
+    return aSchema
+
+  def mergeAllOf(self, aSchema) :
+    # A (shallow) merge of aSchema with the subschemas of its allOf
+    #
+    mergedSchema = dict(aSchema)
+    del mergedSchema['allOf']
+    for aSubschema in aSchema['allOf'] :
+      while type(aSubschema) is dict and '$ref' in aSubschema :
+        aSubschema = self.resolveRef(aSubschema['$ref'])
+      if type(aSubschema) is not dict :
+        continue
+      if 'allOf' in aSubschema :
+        aSubschema = self.mergeAllOf(aSubschema)
+      for aKey, aValue in aSubschema.items() :
+        if aKey == 'properties' :
+          someProperties = dict(mergedSchema.get('properties', {}))
+          someProperties.update(aValue)
+          mergedSchema['properties'] = someProperties
+        elif aKey == 'required' :
+          mergedSchema['required'] = list(mergedSchema.get('required', [])) + [
+            aName for aName in aValue if aName not in mergedSchema.get('required', [])
+          ]
+        elif aKey not in mergedSchema :
+          mergedSchema[aKey] = aValue
+    return mergedSchema
+
+  def schemaType(self, aSchema) :
+    someTypes = aSchema.get('type')
+    if isinstance(someTypes, list) :
+      if not someTypes :
+        raise PayloadError("An empty list of types can not be satisfied")
+      return self.random.choice(someTypes)
+    if someTypes is not None :
+      return someTypes
+    if 'properties' in aSchema or 'additionalProperties' in aSchema or 'required' in aSchema :
+      return 'object'
+    if 'items' in aSchema :
+      return 'array'
+    if any(aKey in aSchema for aKey in [ 'minimum', 'maximum', 'multipleOf' ]) :
+      return 'number'
+    return 'string'
+
+  def count(self, aSchema, minKey, maxKey, depth) :
+    minCount = aSchema.get(minKey, 0)
+    maxCount = aSchema.get(maxKey, max(minCount, self.maxItems))
+    if self.maxDepth <= depth :
+      return minCount
+    return self.random.randint(minCount, max(minCount, min(maxCount, minCount + self.maxItems)))
+
+  def synthesize(self, aSchema=None, depth=0) :
+    if aSchema is None :
+      aSchema = self.rootSchema
+    if aSchema is True :
+      aSchema = {}
+    if aSchema is False :
+      raise PayloadError("A false schema can not be satisfied")
+    if '$ref' in aSchema :
+      # (as in draft 7, the siblings of a $ref are ignored)
+      return self.synthesize(self.resolveRef(aSchema['$ref']), depth)
+    if 'allOf' in aSchema :
+      aSchema = self.mergeAllOf(aSchema)
+    if 'const' in aSchema :
+      return aSchema['const']
+    if 'enum' in aSchema :
+      if not aSchema['enum'] :
+        raise PayloadError("An empty enum can not be satisfied")
+      return self.random.choice(aSchema['enum'])
+    for aCombinator in [ 'oneOf', 'anyOf' ] :
+      if aCombinator in aSchema :
+        someSubschemas = aSchema[aCombinator]
+        if self.maxDepth <= depth :
+          # (prefer the branches which do not recurse)
+          someSubschemas = [
+            aSubschema for aSubschema in someSubschemas
+              if type(aSubschema) is not dict or '$ref' not in aSubschema
+          ] or someSubschemas
+        aSubschema = self.random.choice(someSubschemas)
+        return self.synthesize(aSubschema, depth)
+
+    aType = self.schemaType(aSchema)
+    if aType == 'object' or aType == 'dictionary' :
+      return self.synthesizeObject(aSchema, depth)
+    if aType == 'array' :
+      return self.synthesizeArray(aSchema, depth)
+    if aType == 'string' :
+      return self.synthesizeString(aSchema)
+    if aType == 'integer' :
+      return self.synthesizeNumber(aSchema, True)
+    if aType == 'number' :
+      return self.synthesizeNumber(aSchema, False)
+    if aType == 'boolean' :
+      return self.random.random() < 0.5
+    if aType == 'null' :
+      return None
+    raise PayloadError("Could not synthesize a value of type [{}]".format(aType))
+
+  def synthesizeObject(self, aSchema, depth) :
+    someProperties = aSchema.get('properties', {})
+    someRequired   = aSchema.get('required', [])
+    anObject = {}
+    for aName, aSubschema in someProperties.items() :
+      if aName in someRequired or (
+        depth < self.maxDepth and self.random.random() < self.optionalProbability
+      ) :
+        anObject[aName] = self.synthesize(aSubschema, depth + 1)
+    for aName in someRequired :
+      if aName not in anObject :
+        anObject[aName] = self.synthesize(
+          aSchema.get('additionalProperties', True), depth + 1
+        )
+
+    # (cpig's dictionaries give the schema of their values as items)
+    valueSchema = aSchema.get('additionalProperties')
+    if valueSchema is None and aSchema.get('type') == 'dictionary' :
+      valueSchema = aSchema.get('items', True)
+    if valueSchema is not None and valueSchema is not False :
+      numValues = self.count(aSchema, 'minProperties', 'maxProperties', depth)
+      numValues = max(numValues - len(anObject), 0)
+      for aValue in range(numValues) :
+        aKey = 'key{}'.format(self.random.randrange(1 << 20))
+        if aKey not in anObject and aKey not in someProperties :
+          anObject[aKey] = self.synthesize(valueSchema, depth + 1)
+    return anObject
+
+  def synthesizeArray(self, aSchema, depth) :
+    someItems = aSchema.get('items', True)
+    if isinstance(someItems, list) :
+      # (a tuple)
+      anArray = [
+        self.synthesize(aSubschema, depth + 1) for aSubschema in someItems
+      ]
+      minItems = aSchema.get('minItems', 0)
+      extraSchema = aSchema.get('additionalItems', True)
+      while len(anArray) < minItems and extraSchema is not False :
+        anArray.append(self.synthesize(extraSchema, depth + 1))
+      return anArray
+
+    numItems = self.count(aSchema, 'minItems', 'maxItems', depth)
+    anArray = []
+    someKeys = set()
+    for anAttempt in range(numItems * 10 + 10) :
+      if numItems <= len(anArray) :
+        break
+      anItem = self.synthesize(someItems, depth + 1)
+      if aSchema.get('uniqueItems') :
+        aKey = json.dumps(anItem, sort_keys=True)
+        if aKey in someKeys :
+          continue
+        someKeys.add(aKey)
+      anArray.append(anItem)
+    if len(anArray) < aSchema.get('minItems', 0) :
+      raise PayloadError("Could not synthesize {} unique items".format(aSchema['minItems']))
+    return anArray
+
+  def randomString(self, minLength, maxLength) :
+    aLength = self.random.randint(minLength, maxLength)
+    if not aLength :
+      return ''
+    # (one (hex) digit per 4 random bits)
+    return '{:0{}x}'.format(self.random.getrandbits(4 * aLength), aLength)
+
+  def synthesizeString(self, aSchema) :
+    minLength = aSchema.get('minLength', 0)
+    maxLength = aSchema.get('maxLength', max(minLength, 12))
+    maxLength = max(minLength, min(maxLength, minLength + 24))
+    aFormat = aSchema.get('format')
+    if aFormat in formatPayloads and 'pattern' not in aSchema :
+      aString = formatPayloads[aFormat](self.random)
+      if minLength <= len(aString) <= aSchema.get('maxLength', len(aString)) :
+        return aString
+    if 'pattern' not in aSchema :
+      return self.randomString(minLength, maxLength)
+
+    aPattern = aSchema['pattern']
+    if aPattern not in self.patterns :
+      self.patterns[aPattern] = re.compile(aPattern)
+    # (try random strings, and random strings after the pattern's literal
+    # prefix)
+    aPrefix = literalPrefixMatcher.match(aPattern).group(1)
+    for aTry in range(maxPatternTries) :
+      aString = self.randomString(minLength, maxLength)
+      if aTry % 2 :
+        aString = (aPrefix + aString)[:max(maxLength, len(aPrefix))]
+      if self.patterns[aPattern].search(aString) :
+        return aString
+    raise PayloadError("Could not synthesize a string which matches [{}]".format(aPattern))
+
+  def synthesizeNumber(self, aSchema, isInteger) :
+    # (the window is [-1000, 1000] unless the schema bounds it, and is
+    # 2000 wide when only one end is bounded)
+    someLowerBounds = [
+      aSchema[aKey] for aKey in [ 'minimum', 'exclusiveMinimum' ] if aKey in aSchema
+    ]
+    someUpperBounds = [
+      aSchema[aKey] for aKey in [ 'maximum', 'exclusiveMaximum' ] if aKey in aSchema
+    ]
+    lowerBound = max(someLowerBounds) if someLowerBounds else None
+    upperBound = min(someUpperBounds) if someUpperBounds else None
+    if lowerBound is None :
+      lowerBound = -1000 if upperBound is None else upperBound - 2000
+    if upperBound is None :
+      upperBound = lowerBound + 2000
+    if upperBound < lowerBound :
+      raise PayloadError("Could not synthesize a number in [{}, {}]".format(
+        lowerBound, upperBound
+      ))
+
+    aStep = aSchema.get('multipleOf')
+    if aStep is None and not isInteger :
+      someExclusiveBounds = (
+        aSchema.get('exclusiveMinimum'), aSchema.get('exclusiveMaximum')
+      )
+      aNumber = self.random.uniform(lowerBound, upperBound)
+      if aNumber in someExclusiveBounds :
+        aNumber = (lowerBound + upperBound) / 2
+      if aNumber in someExclusiveBounds :
+        raise PayloadError("Could not synthesize a number in ({}, {})".format(
+          lowerBound, upperBound
+        ))
+      return aNumber
+    if isInteger :
+      # (the integer multiples of n/d are the multiples of n)
+      aStep = 1 if aStep is None else fractions.Fraction(str(aStep)).numerator
+
+    lowerMultiple = math.ceil(lowerBound / aStep)
+    upperMultiple = math.floor(upperBound / aStep)
+    if 'exclusiveMinimum' in aSchema and lowerMultiple * aStep <= aSchema['exclusiveMinimum'] :
+      lowerMultiple += 1
+    if 'exclusiveMaximum' in aSchema and aSchema['exclusiveMaximum'] <= upperMultiple * aStep :
+      upperMultiple -= 1
+    if upperMultiple < lowerMultiple :
+      raise PayloadError("Could not synthesize a multiple of {} in [{}, {}]".format(
+        aStep, lowerBound, upperBound
+      ))
+    if isInteger or type(aStep) is int :
+      return int(self.random.randint(lowerMultiple, upperMultiple) * aStep)
+
+    # (validators check (float) multiples by division, which is inexact
+    # for most multiples, so we only use those which pass that check)
+    for aTry in range(maxPatternTries) :
+      aNumber = self.random.randint(lowerMultiple, upperMultiple) * aStep
+      aQuotient = aNumber / aStep
+      if int(aQuotient) == aQuotient :
+        return aNumber
+    if lowerMultiple <= 0 <= upperMultiple :
+      return 0
+    raise PayloadError("Could not synthesize a multiple of {} in [{}, {}]".format(
+      aStep, lowerBound, upperBound
+    ))
+
+def streamPayloads(aJsonSchema, seed=0, targetSize=None, maxPayloads=None,
+  **synthesizerOptions) :
+  # Yield (encoded) NDJSON lines until their total size reaches targetSize
+  # (bytes) or maxPayloads lines have been yielded (one of which must be
+  # given)
+  #
+  if targetSize is None and maxPayloads is None :
+    raise PayloadError("Either a target size or a number of payloads is needed")
+  theSynthesizer = PayloadSynthesizer(aJsonSchema, seed, **synthesizerOptions)
+  totalSize   = 0
+  numPayloads = 0
+  while True :
+    if targetSize is not None and targetSize <= totalSize :
+      return
+    if maxPayloads is not None and maxPayloads <= numPayloads :
+      return
+    aLine = (json.dumps(
+      theSynthesizer.synthesize(), separators=(',', ':'), ensure_ascii=False
+    ) + "\n").encode('utf-8')
+    totalSize   += len(aLine)
+    numPayloads += 1
+    yield aLine
+
+def streamPayloadChunks(aJsonSchema, chunkSize=1 << 20, **streamOptions) :
+  # Yield the NDJSON lines of streamPayloads in (about) chunkSize chunks
+  #
+  someLines = []
+  linesSize = 0
+  for aLine in streamPayloads(aJsonSchema, **streamOptions) :
+    someLines.append(aLine)
+    linesSize += len(aLine)
+    if chunkSize <= linesSize :
+      yield b''.join(someLines)
+      someLines = []
+      linesSize = 0
+  if someLines :
+    yield b''.join(someLines)
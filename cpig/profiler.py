@@ -0,0 +1,197 @@
+# Profile a cpig run
+#
+# Every pipeline stage, every generator/root type (or generator/interface)
+# pair, and the more expensive parts of loading an interface, are timed
+# inside a profileSection. Profiling is off by default, in which case a
+# profileSection costs (almost) nothing.
+#
+# For each (kind, name) we total the number of calls, the wall and CPU
+# time, the number of bytes written (by the cpig.outputWriter) and,
+# optionally, the peak (tracemalloc) memory allocated above the memory in
+# use when the section started.
+#
+# The kinds of section are:
+#
+#   - 'interface' : the whole generation of one interface
+#   - 'stage'     : a stage of the pipeline (loadInterfaceFile, pydantic, ...)
+#   - 'generator' : one generator on one root type (or one interface)
+#   - 'function'  : a (frequently called) function (parseYamlBlock, ...)
+#
+# Sections may be nested (and may be entered concurrently in threads). The
+# times of a nested section are also included in the times of the
+# sections which enclose it.
+#
+# The sections of the main thread (which only waits while the generators
+# run in other threads) are charged with the CPU time and bytes written
+# of the whole process. The sections of any other thread are only charged
+# with the CPU time and bytes written of that thread, so that concurrent
+# generators are not charged for each other's work.
+
+import contextlib
+import cpig.buildCache
+import cpig.outputWriter
+import json
+import platform
+import threading
+import time
+import tracemalloc
+
+profilingEnabled = False
+traceMemory      = False
+
+# (kind, name) -> { 'calls', 'wallTime', 'cpuTime', 'bytesWritten', 'peakMemory' }
+#
+profileTotals = {}
+profileLock   = threading.Lock()
+
+# the (absolute) peak memory of each open (memory traced) section of the
+# main thread
+#
+memoryStack = []
+
+def enableProfiling(withMemory=False) :
+  global profilingEnabled, traceMemory
+  profilingEnabled = True
+  traceMemory      = withMemory
+  if traceMemory and not tracemalloc.is_tracing() :
+    tracemalloc.start()
+
+def disableProfiling() :
+  global profilingEnabled, traceMemory
+  if traceMemory and tracemalloc.is_tracing() :
+    tracemalloc.stop()
+  profilingEnabled = False
+  traceMemory      = False
+
+def resetProfile() :
+  with profileLock :
+    profileTotals.clear()
+
+def recordSection(kind, name, wallTime, cpuTime, bytesWritten=0, peakMemory=None, calls=1) :
+  # Add one (or more) timed calls to the totals of (kind, name)
+  #
+  with profileLock :
+    aKey = (kind, name)
+    if aKey not in profileTotals :
+      profileTotals[aKey] = {
+        'calls'        : 0,
+        'wallTime'     : 0.0,
+        'cpuTime'      : 0.0,
+        'bytesWritten' : 0,
+        'peakMemory'   : None,
+      }
+    someTotals = profileTotals[aKey]
+    someTotals['calls']        += calls
+    someTotals['wallTime']     += wallTime
+    someTotals['cpuTime']      += cpuTime
+    someTotals['bytesWritten'] += bytesWritten
+    if peakMemory is not None :
+      if someTotals['peakMemory'] is None or someTotals['peakMemory'] < peakMemory :
+        someTotals['peakMemory'] = peakMemory
+
+@contextlib.contextmanager
+def timedSection(kind, name) :
+  # Only the main thread traces the memory of its sections (tracemalloc
+  # has only ONE (process wide) peak)
+  #
+  onMainThread = threading.current_thread() is threading.main_thread()
+  withMemory   = traceMemory and onMainThread
+  if onMainThread :
+    cpuClock     = time.process_time
+    bytesCounter = lambda : cpig.outputWriter.bytesWritten
+  else :
+    cpuClock     = time.thread_time
+    bytesCounter = cpig.outputWriter.threadBytesWritten
+  if withMemory :
+    currentMemory, peakMemory = tracemalloc.get_traced_memory()
+    if memoryStack :
+      memoryStack[-1] = max(memoryStack[-1], peakMemory)
+    tracemalloc.reset_peak()
+    memoryStack.append(currentMemory)
+  startBytes = bytesCounter()
+  startWall  = time.perf_counter()
+  startCpu   = cpuClock()
+  try :
+    yield
+  finally :
+    wallTime = time.perf_counter() - startWall
+    cpuTime  = cpuClock() - startCpu
+    peakMemory = None
+    if withMemory :
+      absolutePeak = max(memoryStack.pop(), tracemalloc.get_traced_memory()[1])
+      if memoryStack :
+        memoryStack[-1] = max(memoryStack[-1], absolutePeak)
+      peakMemory = absolutePeak - currentMemory
+    recordSection(
+      kind, name, wallTime, cpuTime,
+      bytesCounter() - startBytes, peakMemory
+    )
+
+def profileSection(kind, name) :
+  if not profilingEnabled :
+    return contextlib.nullcontext()
+  return timedSection(kind, name)
+
+def getProfile() :
+  # The totals as a (picklable) list of dictionaries, sorted by wall time
+  #
+  with profileLock :
+    someSections = []
+    for (kind, name), someTotals in profileTotals.items() :
+      aSection = { 'kind' : kind, 'name' : name }
+      aSection.update(someTotals)
+      someSections.append(aSection)
+  someSections.sort(key=lambda aSection : aSection['wallTime'], reverse=True)
+  return someSections
+
+def mergeProfile(someSections) :
+  # Merge the profile of another (worker) process into our totals
+  #
+  for aSection in someSections :
+    recordSection(
+      aSection['kind'], aSection['name'],
+      aSection['wallTime'], aSection['cpuTime'],
+      aSection['bytesWritten'], aSection['peakMemory'],
+      aSection['calls']
+    )
+
+def formatBytes(numBytes) :
+  if numBytes is None :
+    return "-"
+  for aUnit in [ 'B', 'KiB', 'MiB' ] :
+    if numBytes < 1024 :
+      return "{:.0f}{}".format(numBytes, aUnit)
+    numBytes /= 1024
+  return "{:.1f}GiB".format(numBytes)
+
+def printProfile() :
+  someSections = getProfile()
+  print("===============================================================")
+  print("Profile (sorted by wall time):")
+  print("{:<9} {:>7} {:>10} {:>10} {:>10} {:>10}  {}".format(
+    'kind', 'calls', 'wall(s)', 'cpu(s)', 'written', 'peak', 'name'
+  ))
+  for aSection in someSections :
+    print("{:<9} {:>7} {:>10.4f} {:>10.4f} {:>10} {:>10}  {}".format(
+      aSection['kind'],
+      aSection['calls'],
+      aSection['wallTime'],
+      aSection['cpuTime'],
+      formatBytes(aSection['bytesWritten']),
+      formatBytes(aSection['peakMemory']),
+      aSection['name']
+    ))
+  print("===============================================================")
+
+def writeProfileJson(outputPath, someInterfaces) :
+  theReport = {
+    'cpigVersion' : cpig.buildCache.cpigVersion(),
+    'python'      : platform.python_version(),
+    'platform'    : platform.platform(),
+    'interfaces'  : someInterfaces,
+    'traceMemory' : traceMemory,
+    'sections'    : getProfile(),
+  }
+  with open(outputPath, 'w') as outputFile :
+    outputFile.write(json.dumps(theReport, indent=2)+"\n")
+  print("Wrote the profile to {}".format(outputPath))
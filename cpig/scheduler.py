@@ -0,0 +1,255 @@
+# The cpig task scheduler
+#
+# The generation of an interface is described as a graph of tasks (one
+# for each generator/root type, or generator/interface, pair, together
+# with the tasks they depend upon, such as assembling the root type JSON
+# schemas or loading a generator's template). A task may only depend upon
+# tasks which were added to the graph before it, so the graph can not
+# have cycles, and the order in which the tasks were added is always a
+# valid order in which to run them.
+#
+# The tasks are run on a pool of threads, each task as soon as all of the
+# tasks it depends upon have finished. (The CPU heavy tasks, such as the
+# pydantic models, may hand their work on to the graph's pool of worker
+# processes, and the (I/O bound) template renders then overlap with them.
+# The worker processes are started before any of the threads, as forking
+# a process which is running other threads may deadlock)
+#
+# Everything a task prints is captured (per thread) and reported in the
+# order in which the tasks were added, so the output of a run does not
+# depend upon the order in which its tasks finished.
+
+import concurrent.futures
+import contextlib
+import io
+import os
+import sys
+import threading
+
+class ThreadLocalStdout :
+  # A sys.stdout which sends what each thread writes to that thread's own
+  # output buffer (if it has one), and everything else on to the original
+  # sys.stdout.
+
+  def __init__(self, baseStdout) :
+    self.baseStdout = baseStdout
+    self.threadData = threading.local()
+
+  def target(self) :
+    theBuffer = getattr(self.threadData, 'outputBuffer', None)
+    if theBuffer is None :
+      return self.baseStdout
+    return theBuffer
+
+  def write(self, aStr) :
+    return self.target().write(aStr)
+
+  def flush(self) :
+    self.target().flush()
+
+  def __getattr__(self, aName) :
+    return getattr(self.baseStdout, aName)
+
+@contextlib.contextmanager
+def threadLocalStdout() :
+  # Install a ThreadLocalStdout (unless one is already installed)
+  #
+  if isinstance(sys.stdout, ThreadLocalStdout) :
+    yield sys.stdout
+    return
+  theStdout  = ThreadLocalStdout(sys.stdout)
+  sys.stdout = theStdout
+  try :
+    yield theStdout
+  finally :
+    sys.stdout = theStdout.baseStdout
+
+@contextlib.contextmanager
+def captureOutput(outputBuffer) :
+  # Capture everything the current thread prints in outputBuffer.
+  #
+  # (contextlib.redirect_stdout replaces sys.stdout for ALL threads, so
+  # it is only used when no ThreadLocalStdout has been installed)
+  #
+  theStdout = sys.stdout
+  if not isinstance(theStdout, ThreadLocalStdout) :
+    with contextlib.redirect_stdout(outputBuffer) :
+      yield outputBuffer
+    return
+  previousBuffer = getattr(theStdout.threadData, 'outputBuffer', None)
+  theStdout.threadData.outputBuffer = outputBuffer
+  try :
+    yield outputBuffer
+  finally :
+    theStdout.threadData.outputBuffer = previousBuffer
+
+class Task :
+
+  __slots__ = (
+    'name', 'taskFunc', 'taskArgs', 'dependsOn', 'dependents',
+    'usesProcesses', 'result', 'error', 'output', 'isDone'
+  )
+
+  def __init__(self, name, taskFunc, taskArgs, dependsOn, usesProcesses) :
+    self.name          = name
+    self.taskFunc      = taskFunc
+    self.taskArgs      = taskArgs
+    self.dependsOn     = dependsOn
+    self.usesProcesses = usesProcesses
+    self.dependents    = []
+    self.result        = None
+    self.error         = None
+    self.output        = ""
+    self.isDone        = False
+
+  def run(self) :
+    self.result = self.taskFunc(*self.taskArgs)
+    return self.result
+
+  def runCaptured(self) :
+    # Run this task (in a worker thread) capturing its output and any
+    # exception (which is re-raised, in task order, once the graph has
+    # been run)
+    #
+    outputBuffer = io.StringIO()
+    with captureOutput(outputBuffer) :
+      try :
+        self.run()
+      except BaseException as ex :
+        self.error = ex
+    self.output = outputBuffer.getvalue()
+
+class TaskGraph :
+
+  __slots__ = (
+    'numThreads', 'numProcesses', 'tasks', 'taskNames', 'processPool'
+  )
+
+  def __init__(self, numThreads=1, numProcesses=1) :
+    self.numThreads   = max(int(numThreads), 1)
+    self.numProcesses = max(int(numProcesses), 1)
+    self.tasks        = []
+    self.taskNames    = set()
+    self.processPool  = None
+
+  def addTask(self, name, taskFunc, taskArgs=[], dependsOn=[], usesProcesses=False) :
+    # Add a task which runs taskFunc(*taskArgs) once all of the (already
+    # added) tasks in dependsOn have finished.
+    #
+    # A task which may hand its work on to the worker processes (see
+    # submitToProcesses) MUST set usesProcesses.
+    #
+    # Returns the new Task (whose result is taskFunc's return value)
+    #
+    if name in self.taskNames :
+      print("The task [{}] has already been added".format(name))
+      sys.exit(-1)
+    for aTask in dependsOn :
+      if aTask.name not in self.taskNames :
+        print("The task [{}] depends upon the unknown task [{}]".format(name, aTask.name))
+        sys.exit(-1)
+    newTask = Task(
+      name, taskFunc, list(taskArgs), list(dependsOn), usesProcesses
+    )
+    for aTask in dependsOn :
+      aTask.dependents.append(newTask)
+    self.tasks.append(newTask)
+    self.taskNames.add(name)
+    return newTask
+
+  def useProcesses(self) :
+    # (only True while the graph is running)
+    return self.processPool is not None
+
+  def submitToProcesses(self, aFunc, *args) :
+    # Run aFunc(*args) in the graph's pool of worker processes
+    #
+    # Returns a concurrent.futures.Future
+    #
+    return self.processPool.submit(aFunc, *args)
+
+  def startProcessPool(self) :
+    # Start the worker processes (if any task may use them) BEFORE any of
+    # the threads. (The pool forks all of its workers when the first job
+    # is submitted, so we wait for one trivial job)
+    #
+    if self.numProcesses < 2 :
+      return
+    if not any(aTask.usesProcesses for aTask in self.tasks) :
+      return
+    self.processPool = concurrent.futures.ProcessPoolExecutor(
+      max_workers=self.numProcesses
+    )
+    self.processPool.submit(os.getpid).result()
+
+  def run(self) :
+    # Run all of the tasks
+    #
+    try :
+      self.startProcessPool()
+      if self.numThreads < 2 and not self.useProcesses() :
+        for aTask in self.tasks :
+          aTask.run()
+          aTask.isDone = True
+      else :
+        self.runConcurrently()
+    finally :
+      if self.processPool is not None :
+        self.processPool.shutdown()
+        self.processPool = None
+
+  def runConcurrently(self) :
+    # (a task which waits upon the process pool holds on to its thread, so
+    # we add one thread for each worker process to stop those tasks
+    # starving the others)
+    #
+    numWorkers = self.numThreads
+    if self.useProcesses() :
+      numWorkers += self.numProcesses
+
+    numWaiting = {}
+    for aTask in self.tasks :
+      numWaiting[aTask.name] = len(aTask.dependsOn)
+
+    reportedTasks = 0
+    with threadLocalStdout() as theStdout :
+      with concurrent.futures.ThreadPoolExecutor(max_workers=numWorkers) as pool :
+        running = {}
+        for aTask in self.tasks :
+          if numWaiting[aTask.name] == 0 :
+            running[pool.submit(aTask.runCaptured)] = aTask
+
+        while running :
+          someDone, notDone = concurrent.futures.wait(
+            running, return_when=concurrent.futures.FIRST_COMPLETED
+          )
+          for aFuture in someDone :
+            aTask = running.pop(aFuture)
+            self.finishTask(aTask, numWaiting, running, pool)
+
+          # report the output of the tasks (in task order) as soon as all
+          # of the earlier tasks have been reported
+          #
+          while reportedTasks < len(self.tasks) and \
+            self.tasks[reportedTasks].isDone :
+            theStdout.baseStdout.write(self.tasks[reportedTasks].output)
+            reportedTasks += 1
+
+    for aTask in self.tasks :
+      if aTask.error is not None :
+        raise aTask.error
+
+  def finishTask(self, aTask, numWaiting, running, pool) :
+    aTask.isDone = True
+    for aDependent in aTask.dependents :
+      if aTask.error is not None :
+        # (a task whose dependencies failed is never run)
+        if aDependent.error is None :
+          aDependent.error = aTask.error
+      numWaiting[aDependent.name] -= 1
+      if numWaiting[aDependent.name] != 0 :
+        continue
+      if aDependent.error is None :
+        running[pool.submit(aDependent.runCaptured)] = aDependent
+      else :
+        self.finishTask(aDependent, numWaiting, running, pool)
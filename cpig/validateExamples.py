@@ -0,0 +1,143 @@
+# Validate every jsonExample against the jsonSchemaDefs type it claims to
+# be an example of.
+#
+# One validator is compiled for each (used) definition and then reused
+# for all of the examples of that type. Large example corpora can be
+# validated by a pool of worker processes.
+
+import concurrent.futures
+import cpig.backends
+import cpig.generateCode
+import cpig.interfaceModel
+import cpig.loadInterface
+
+# The compiled validators (in this process), keyed by jsonType. This
+# cache is cleared whenever a new interface is validated.
+#
+definitionValidators = {}
+
+def buildDefinitionSchema(theModel, aJsonType) :
+  # The JSON schema of one definition, together with all of the
+  # definitions it (transitively) references.
+  #
+  defs = theModel.jsonSchemaDefs
+  jsonSchema = dict(defs[aJsonType])
+  someReachableDefs = cpig.interfaceModel.reachableDefs(
+    theModel.refGraph, theModel.refGraph[aJsonType]
+  )
+  theDefs = {}
+  for aKey, aValue in defs.items() :
+    if aKey in someReachableDefs :
+      theDefs[aKey] = aValue
+  jsonSchema['$defs'] = theDefs
+  return jsonSchema
+
+def getDefinitionValidator(aJsonType, aJsonSchema) :
+  if aJsonType not in definitionValidators :
+    jsonschema = cpig.backends.getValidationBackend()
+    definitionValidators[aJsonType] = jsonschema.Draft7Validator(aJsonSchema)
+  return definitionValidators[aJsonType]
+
+def validateExampleBatch(aJsonType, aJsonSchema, someExamples) :
+  # Validate a batch of [ exampleIndex, exampleBody ] of one jsonType.
+  #
+  # This may run in a worker process.
+  #
+  # Returns a list of [ exampleIndex, errorPath, errorMessage ]
+  #
+  theValidator = getDefinitionValidator(aJsonType, aJsonSchema)
+  theErrors = []
+  for exampleIndex, exampleBody in someExamples :
+    for anError in theValidator.iter_errors(exampleBody) :
+      errorPath = "/".join(map(str, anError.absolute_path))
+      theErrors.append([ exampleIndex, errorPath, anError.message ])
+  return theErrors
+
+def splitIntoBatches(someItems, batchSize) :
+  return [
+    someItems[i:i+batchSize] for i in range(0, len(someItems), batchSize)
+  ]
+
+def validateJsonExamples(options, theModel) :
+  # Validate all of the jsonExamples in one batched pass, reporting every
+  # invalid example (with the file and line of its YAML block).
+  #
+  definitionValidators.clear()
+
+  if 'validateExamples' in options and not options['validateExamples'] :
+    return
+  if not theModel.hasSection('jsonExamples') :
+    return
+  if not theModel.hasSection('jsonSchemaDefs') :
+    return
+  jsonExamples = theModel.examplesByType
+  defs = theModel.jsonSchemaDefs
+
+  exampleBatches = []
+  numExamples = 0
+  for aJsonType, someExamples in jsonExamples.items() :
+    if aJsonType not in defs :
+      if 1 < options['verbose'] :
+        print("Not validating the {} examples (no such jsonType)".format(aJsonType))
+      continue
+    aJsonSchema = buildDefinitionSchema(theModel, aJsonType)
+    indexedExamples = []
+    for exampleIndex, anExample in enumerate(someExamples) :
+      if 'example' in anExample :
+        indexedExamples.append([ exampleIndex, anExample['example'] ])
+    numExamples += len(indexedExamples)
+    exampleBatches.append([ aJsonType, aJsonSchema, indexedExamples ])
+
+  validationPoolThreshold = 1000
+  if 'validationPoolThreshold' in options :
+    validationPoolThreshold = options['validationPoolThreshold']
+  numJobs = 1
+  if validationPoolThreshold <= numExamples :
+    numJobs = cpig.generateCode.getNumJobs(options)
+
+  batchResults = []
+  if numJobs < 2 :
+    for aJsonType, aJsonSchema, indexedExamples in exampleBatches :
+      batchResults.append([
+        aJsonType,
+        validateExampleBatch(aJsonType, aJsonSchema, indexedExamples)
+      ])
+  else :
+    batchSize = max(1, numExamples // (4 * numJobs))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=numJobs) as pool :
+      futures = []
+      for aJsonType, aJsonSchema, indexedExamples in exampleBatches :
+        for aBatch in splitIntoBatches(indexedExamples, batchSize) :
+          futures.append([
+            aJsonType,
+            pool.submit(validateExampleBatch, aJsonType, aJsonSchema, aBatch)
+          ])
+      for aJsonType, aFuture in futures :
+        batchResults.append([ aJsonType, aFuture.result() ])
+
+  numInvalid = 0
+  for aJsonType, theErrors in batchResults :
+    exampleSources = []
+    if aJsonType in cpig.loadInterface.jsonExampleSources :
+      exampleSources = cpig.loadInterface.jsonExampleSources[aJsonType]
+    for exampleIndex, errorPath, errorMessage in theErrors :
+      numInvalid += 1
+      # (the interface is still generated, but the run fails)
+      cpig.generateCode.noteGenerationError()
+      anExample = jsonExamples[aJsonType][exampleIndex]
+      exampleSource = ""
+      if exampleIndex < len(exampleSources) and exampleSources[exampleIndex] :
+        exampleSource = cpig.loadInterface.yamlSourceStr(
+          exampleSources[exampleIndex]
+        )
+      print("The {} example [{}]{} does not match its schema".format(
+        aJsonType, anExample.get('title', exampleIndex+1), exampleSource
+      ))
+      print("  at /{}: {}".format(errorPath, errorMessage))
+
+  if 1 < options['verbose'] :
+    print("Validated {} examples ({} errors)".format(numExamples, numInvalid))
+
+  if 0 < numInvalid :
+    print("--------------------------------------------------------------")
+    print("Found {} error(s) in the jsonExamples".format(numInvalid))
@@ -0,0 +1,572 @@
+# Compile (draft 7) JSON schemas into plain Python validation functions
+#
+# Each (assembled) root type schema is compiled into straight line
+# Python code, so that the generated validators do no per-call schema
+# interpretation:
+#
+#   - the type of a value is checked once, after which the keywords of
+#     that type are checked without any further guards
+#   - enums become (type aware) frozensets
+#   - patterns are compiled (once) when the module is imported
+#   - small (leaf) $refs are inlined, all other $refs become direct calls
+#     to the (module level) function of the referenced definition (so
+#     recursive definitions work)
+#
+# Every compiled function returns None when its value is valid, and
+# otherwise an error message of the form "<path>: <message>". The path of
+# an error is only built (as the error is returned) when a value is
+# invalid.
+#
+# The generated validators give the same verdicts as
+# jsonschema.Draft7Validator (without a format checker, so 'format' is
+# ignored). As in draft 7, the siblings of a $ref are ignored.
+
+import json
+import re
+
+# The Python expression which checks the JSON type of a value
+#
+typeTests = {
+  'string'  : "isinstance({0}, str)",
+  'object'  : "isinstance({0}, dict)",
+  'array'   : "isinstance({0}, list)",
+  'null'    : "{0} is None",
+  'boolean' : "isinstance({0}, bool)",
+  'number'  : "(isinstance({0}, (int, float)) and not isinstance({0}, bool))",
+  'integer' : "((isinstance({0}, int) and not isinstance({0}, bool)) or (isinstance({0}, float) and {0}.is_integer()))",
+}
+
+# The keywords which only apply to values of one type
+#
+stringKeywords = [ 'minLength', 'maxLength', 'pattern' ]
+numberKeywords = [
+  'minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum', 'multipleOf'
+]
+objectKeywords = [
+  'required', 'properties', 'patternProperties', 'additionalProperties',
+  'dependencies', 'propertyNames', 'minProperties', 'maxProperties'
+]
+arrayKeywords = [
+  'items', 'additionalItems', 'contains', 'minItems', 'maxItems', 'uniqueItems'
+]
+
+# $refs to definitions (without any $refs of their own) whose JSON is at
+# most this long are inlined
+#
+maxInlineRefSize = 256
+
+# The (generated) runtime support shared by the compiled functions
+#
+runtimeCode = '''
+import re
+
+_MISSING = object()
+
+def _enum_key(value):
+    # a hashable key which (like jsonschema) distinguishes booleans from
+    # numbers (but not 1 from 1.0)
+    if isinstance(value, bool):
+        return ('b', value)
+    if isinstance(value, (int, float)):
+        return ('n', value)
+    if isinstance(value, str):
+        return ('s', value)
+    if value is None:
+        return ('z', None)
+    return None
+
+def _equal(one, two):
+    if one is two:
+        return True
+    if isinstance(one, str) or isinstance(two, str):
+        return one == two
+    if isinstance(one, list) and isinstance(two, list):
+        return len(one) == len(two) and all(
+            _equal(i, j) for i, j in zip(one, two)
+        )
+    if isinstance(one, dict) and isinstance(two, dict):
+        return one.keys() == two.keys() and all(
+            _equal(one[key], two[key]) for key in one
+        )
+    if isinstance(one, bool) or isinstance(two, bool):
+        return isinstance(one, bool) and isinstance(two, bool) and one == two
+    return one == two
+
+def _in_enum(value, enum_keys, enum_values):
+    key = _enum_key(value)
+    if key is not None:
+        return key in enum_keys
+    return any(_equal(value, each) for each in enum_values)
+
+def _unique(values):
+    seen_keys = set()
+    seen_values = []
+    for value in values:
+        key = _enum_key(value)
+        if key is not None:
+            if key in seen_keys:
+                return False
+            seen_keys.add(key)
+        else:
+            if any(_equal(value, each) for each in seen_values):
+                return False
+            seen_values.append(value)
+    return True
+
+def _not_multiple(value, divisor):
+    if isinstance(divisor, float):
+        quotient = value / divisor
+        try:
+            return int(quotient) != quotient
+        except OverflowError:
+            from fractions import Fraction
+            return (Fraction(value) / Fraction(divisor)).denominator != 1
+    return bool(value % divisor)
+'''
+
+def pathExpr(pathParts) :
+  # The Python expression of a (relative) JSON path, from a list of
+  # static strings and [ variableName ] lists
+  #
+  someTerms = []
+  staticPart = ""
+  for aPart in pathParts :
+    if type(aPart) is str :
+      staticPart += '/' + aPart
+    else :
+      if staticPart :
+        someTerms.append(repr(staticPart + '/'))
+      else :
+        someTerms.append(repr('/'))
+      someTerms.append("str({})".format(aPart[0]))
+      staticPart = ""
+  if staticPart or not someTerms :
+    someTerms.append(repr(staticPart))
+  return " + ".join(someTerms)
+
+def safeName(aName) :
+  return re.sub(r'\W', '_', aName)
+
+class ValidatorCompiler :
+  __slots__ = (
+    'rootSchema', 'rootType', 'lines', 'constants', 'constantNames',
+    'functionNames', 'toCompile', 'numNames',
+  )
+
+  def __init__(self, rootSchema, rootType) :
+    self.rootSchema    = rootSchema
+    self.rootType      = rootType
+    self.lines         = []
+    self.constants     = []
+    self.constantNames = {}
+    self.functionNames = {}
+    self.toCompile     = []
+    self.numNames      = 0
+
+  def newName(self, aPrefix) :
+    self.numNames += 1
+    return "{}{}".format(aPrefix, self.numNames)
+
+  def emit(self, indent, aLine) :
+    self.lines.append("    " * indent + aLine)
+
+  def constant(self, aPrefix, anExpression) :
+    # A module level constant (shared by all of the checks which need it)
+    #
+    if anExpression not in self.constantNames :
+      aName = self.newName(aPrefix)
+      self.constantNames[anExpression] = aName
+      self.constants.append("{} = {}".format(aName, anExpression))
+    return self.constantNames[anExpression]
+
+  def resolveRef(self, aRef) :
+    if not aRef.startswith('#') :
+      raise ValueError("Only local $refs can be compiled (not [{}])".format(aRef))
+    aSchema = self.rootSchema
+    for aToken in aRef[1:].split('/')[1:] :
+      aToken = aToken.replace('~1', '/').replace('~0', '~')
+      if type(aSchema) is list :
+        aToken = int(aToken)
+      aSchema = aSchema[aToken]
+    return aSchema
+
+  def functionFor(self, aRef) :
+    # The name of the (module level) function which validates the schema
+    # at aRef (which is compiled later)
+    #
+    if aRef not in self.functionNames :
+      baseName = self.rootType
+      if aRef != '#' :
+        baseName = aRef.split('/')[-1]
+      self.functionNames[aRef] = self.newName('_validate_'+safeName(baseName)+'_')
+      self.toCompile.append(aRef)
+    return self.functionNames[aRef]
+
+  def subschemaFunction(self, aSchema) :
+    # A (module level) function for a subschema used by anyOf, oneOf,
+    # not, contains or if (whose verdict we need as a value)
+    #
+    aName = self.newName('_check_')
+    self.functionNames[aName] = aName
+    self.toCompile.append([ aName, aSchema ])
+    return aName
+
+  def isInlineable(self, aSchema) :
+    if type(aSchema) is bool :
+      return True
+    theJson = json.dumps(aSchema, sort_keys=True, default=str)
+    return '"$ref"' not in theJson and len(theJson) <= maxInlineRefSize
+
+  def fail(self, indent, pathParts, aTemplate, *someExpressions) :
+    # Return an error (at pathParts) whose message is the %-template
+    # aTemplate applied to the (Python) expressions someExpressions
+    #
+    aMessage = repr(aTemplate)
+    if someExpressions :
+      aMessage = "{} % ({},)".format(aMessage, ", ".join(someExpressions))
+    if all(type(aPart) is str for aPart in pathParts) :
+      aPrefix = repr("".join('/' + aPart for aPart in pathParts) + ': ')
+    else :
+      aPrefix = pathExpr(pathParts) + " + ': '"
+    self.emit(indent, "return {} + {}".format(aPrefix, aMessage))
+
+  def compileSchema(self, aSchema, aVar, pathParts, indent, knownType=None) :
+    if aSchema is True or aSchema == {} :
+      return
+    if aSchema is False :
+      self.fail(indent, pathParts, "False schema does not allow %r", aVar)
+      return
+    if type(aSchema) is not dict :
+      return
+
+    if '$ref' in aSchema :
+      aRef = aSchema['$ref']
+      theTarget = self.resolveRef(aRef)
+      if self.isInlineable(theTarget) :
+        self.compileSchema(theTarget, aVar, pathParts, indent, knownType)
+        return
+      errorVar = self.newName('e')
+      self.emit(indent, "{} = {}({})".format(errorVar, self.functionFor(aRef), aVar))
+      self.emit(indent, "if {} is not None:".format(errorVar))
+      self.emit(indent+1, "return {} + {}".format(pathExpr(pathParts), errorVar))
+      return
+
+    if 'type' in aSchema :
+      someTypes = aSchema['type']
+      if type(someTypes) is str :
+        someTypes = [ someTypes ]
+      someTests = [ typeTests[aType].format(aVar) for aType in someTypes if aType in typeTests ]
+      if someTests :
+        self.emit(indent, "if not ({}):".format(" or ".join(someTests)))
+        self.fail(indent+1, pathParts, "%r is not of type " + ", ".join(
+          repr(aType) for aType in someTypes
+        ).replace('%', '%%'), aVar)
+      if len(someTypes) == 1 :
+        knownType = someTypes[0]
+
+    if 'enum' in aSchema :
+      self.compileEnum(aSchema['enum'], aVar, pathParts, indent, knownType)
+
+    if 'const' in aSchema :
+      aConst = self.constant('_const_', repr(aSchema['const']))
+      self.emit(indent, "if not _equal({}, {}):".format(aVar, aConst))
+      self.fail(indent+1, pathParts, "%r was expected", aConst)
+
+    self.compileTypedKeywords(aSchema, aVar, pathParts, indent, knownType,
+      stringKeywords, [ 'string' ], self.compileStringKeywords)
+    self.compileTypedKeywords(aSchema, aVar, pathParts, indent, knownType,
+      numberKeywords, [ 'number', 'integer' ], self.compileNumberKeywords)
+    self.compileTypedKeywords(aSchema, aVar, pathParts, indent, knownType,
+      objectKeywords, [ 'object' ], self.compileObjectKeywords)
+    self.compileTypedKeywords(aSchema, aVar, pathParts, indent, knownType,
+      arrayKeywords, [ 'array' ], self.compileArrayKeywords)
+
+    self.compileCombinators(aSchema, aVar, pathParts, indent)
+
+  def compileTypedKeywords(self, aSchema, aVar, pathParts, indent, knownType,
+    someKeywords, someTypes, compileKeywords) :
+    if not any(aKeyword in aSchema for aKeyword in someKeywords) :
+      return
+    if knownType in someTypes :
+      compileKeywords(aSchema, aVar, pathParts, indent)
+      return
+    aTest = typeTests['number' if 'number' in someTypes else someTypes[0]]
+    self.emit(indent, "if {}:".format(aTest.format(aVar)))
+    numLines = len(self.lines)
+    compileKeywords(aSchema, aVar, pathParts, indent+1)
+    if len(self.lines) == numLines :
+      self.emit(indent+1, "pass")
+
+  def compileEnum(self, someValues, aVar, pathParts, indent, knownType) :
+    someKeys = []
+    someOthers = []
+    for aValue in someValues :
+      if isinstance(aValue, bool) :
+        someKeys.append(('b', aValue))
+      elif isinstance(aValue, (int, float)) :
+        someKeys.append(('n', aValue))
+      elif isinstance(aValue, str) :
+        someKeys.append(('s', aValue))
+      elif aValue is None :
+        someKeys.append(('z', None))
+      else :
+        someOthers.append(aValue)
+    enumValues = self.constant('_enum_list_', repr(someValues))
+    if not someOthers and all(aKey[0] == 's' for aKey in someKeys) :
+      # (the usual case) an enumeration of strings
+      aSet = self.constant('_enum_', "frozenset({!r})".format(
+        sorted(aKey[1] for aKey in someKeys)
+      ))
+      if knownType == 'string' :
+        self.emit(indent, "if {} not in {}:".format(aVar, aSet))
+      else :
+        self.emit(indent, "if not (isinstance({0}, str) and {0} in {1}):".format(aVar, aSet))
+    else :
+      aSet = self.constant('_enum_', "frozenset({!r})".format(
+        sorted(someKeys, key=repr)
+      ))
+      someOthersName = self.constant('_enum_values_', repr(someOthers))
+      self.emit(indent, "if not _in_enum({}, {}, {}):".format(aVar, aSet, someOthersName))
+    self.fail(indent+1, pathParts, "%r is not one of %r", aVar, enumValues)
+
+  def compileStringKeywords(self, aSchema, aVar, pathParts, indent) :
+    if 'minLength' in aSchema :
+      self.emit(indent, "if len({}) < {!r}:".format(aVar, aSchema['minLength']))
+      self.fail(indent+1, pathParts, "%r is too short", aVar)
+    if 'maxLength' in aSchema :
+      self.emit(indent, "if len({}) > {!r}:".format(aVar, aSchema['maxLength']))
+      self.fail(indent+1, pathParts, "%r is too long", aVar)
+    if 'pattern' in aSchema :
+      aPattern = self.constant('_pattern_', "re.compile({!r})".format(aSchema['pattern']))
+      self.emit(indent, "if not {}.search({}):".format(aPattern, aVar))
+      self.fail(indent+1, pathParts, "%r does not match %r", aVar, aPattern+'.pattern')
+
+  def compileNumberKeywords(self, aSchema, aVar, pathParts, indent) :
+    for aKeyword, aComparison, aMessage in [
+      [ 'minimum',          '<',  'less than the minimum of' ],
+      [ 'maximum',          '>',  'greater than the maximum of' ],
+      [ 'exclusiveMinimum', '<=', 'less than or equal to the minimum of' ],
+      [ 'exclusiveMaximum', '>=', 'greater than or equal to the maximum of' ],
+    ] :
+      if aKeyword in aSchema :
+        self.emit(indent, "if {} {} {!r}:".format(aVar, aComparison, aSchema[aKeyword]))
+        self.fail(indent+1, pathParts,
+          "%r is " + "{} {!r}".format(aMessage, aSchema[aKeyword]).replace('%', '%%'),
+          aVar)
+    if 'multipleOf' in aSchema :
+      self.emit(indent, "if _not_multiple({}, {!r}):".format(aVar, aSchema['multipleOf']))
+      self.fail(indent+1, pathParts,
+        "%r is not a multiple of " + repr(aSchema['multipleOf']).replace('%', '%%'), aVar)
+
+  def compileObjectKeywords(self, aSchema, aVar, pathParts, indent) :
+    for aProperty in aSchema.get('required', []) :
+      self.emit(indent, "if {!r} not in {}:".format(aProperty, aVar))
+      self.fail(indent+1, pathParts,
+        "{!r} is a required property".format(aProperty).replace('%', '%%'))
+
+    if 'minProperties' in aSchema :
+      self.emit(indent, "if len({}) < {!r}:".format(aVar, aSchema['minProperties']))
+      self.fail(indent+1, pathParts, "%r does not have enough properties", aVar)
+    if 'maxProperties' in aSchema :
+      self.emit(indent, "if len({}) > {!r}:".format(aVar, aSchema['maxProperties']))
+      self.fail(indent+1, pathParts, "%r has too many properties", aVar)
+
+    someProperties = aSchema.get('properties', {})
+    for aProperty, aPropertySchema in someProperties.items() :
+      if aPropertySchema is True or aPropertySchema == {} :
+        continue
+      valueVar = self.newName('x')
+      self.emit(indent, "{} = {}.get({!r}, _MISSING)".format(valueVar, aVar, aProperty))
+      self.emit(indent, "if {} is not _MISSING:".format(valueVar))
+      self.compileSchema(aPropertySchema, valueVar, pathParts + [ aProperty ], indent+1)
+      if self.lines[-1].endswith(':') :
+        self.emit(indent+1, "pass")
+
+    somePatterns = aSchema.get('patternProperties', {})
+    for aPattern, aPatternSchema in somePatterns.items() :
+      aCompiledPattern = self.constant('_pattern_', "re.compile({!r})".format(aPattern))
+      keyVar   = self.newName('k')
+      valueVar = self.newName('x')
+      self.emit(indent, "for {}, {} in {}.items():".format(keyVar, valueVar, aVar))
+      self.emit(indent+1, "if {}.search({}):".format(aCompiledPattern, keyVar))
+      self.compileSchema(aPatternSchema, valueVar, pathParts + [ [ keyVar ] ], indent+2)
+      if self.lines[-1].endswith(':') :
+        self.emit(indent+2, "pass")
+
+    if 'additionalProperties' in aSchema :
+      additionalSchema = aSchema['additionalProperties']
+      if additionalSchema is not True and additionalSchema != {} :
+        knownProperties = self.constant('_properties_', "frozenset({!r})".format(
+          sorted(someProperties.keys())
+        ))
+        keyVar   = self.newName('k')
+        valueVar = self.newName('x')
+        self.emit(indent, "for {}, {} in {}.items():".format(keyVar, valueVar, aVar))
+        aTest = "{} in {}".format(keyVar, knownProperties)
+        for aPattern in somePatterns :
+          aCompiledPattern = self.constant('_pattern_', "re.compile({!r})".format(aPattern))
+          aTest += " or {}.search({})".format(aCompiledPattern, keyVar)
+        self.emit(indent+1, "if {}:".format(aTest))
+        self.emit(indent+2, "continue")
+        if additionalSchema is False :
+          self.fail(indent+1, pathParts,
+            "Additional properties are not allowed (%r was unexpected)", keyVar)
+        else :
+          self.compileSchema(additionalSchema, valueVar, pathParts + [ [ keyVar ] ], indent+1)
+
+    for aProperty, aDependency in aSchema.get('dependencies', {}).items() :
+      self.emit(indent, "if {!r} in {}:".format(aProperty, aVar))
+      if type(aDependency) is list :
+        for aRequired in aDependency :
+          self.emit(indent+1, "if {!r} not in {}:".format(aRequired, aVar))
+          self.fail(indent+2, pathParts,
+            "{!r} is a dependency of {!r}".format(aRequired, aProperty).replace('%', '%%'))
+      else :
+        self.compileSchema(aDependency, aVar, pathParts, indent+1, 'object')
+      if self.lines[-1].endswith(':') :
+        self.emit(indent+1, "pass")
+
+    if 'propertyNames' in aSchema :
+      keyVar = self.newName('k')
+      self.emit(indent, "for {} in {}:".format(keyVar, aVar))
+      self.compileSchema(aSchema['propertyNames'], keyVar, pathParts, indent+1, 'string')
+      if self.lines[-1].endswith(':') :
+        self.emit(indent+1, "pass")
+
+  def compileArrayKeywords(self, aSchema, aVar, pathParts, indent) :
+    if 'minItems' in aSchema :
+      self.emit(indent, "if len({}) < {!r}:".format(aVar, aSchema['minItems']))
+      self.fail(indent+1, pathParts, "%r is too short", aVar)
+    if 'maxItems' in aSchema :
+      self.emit(indent, "if len({}) > {!r}:".format(aVar, aSchema['maxItems']))
+      self.fail(indent+1, pathParts, "%r is too long", aVar)
+    if aSchema.get('uniqueItems', False) :
+      self.emit(indent, "if not _unique({}):".format(aVar))
+      self.fail(indent+1, pathParts, "%r has non-unique elements", aVar)
+
+    someItems = aSchema.get('items', True)
+    if type(someItems) is list :
+      for anIndex, anItemSchema in enumerate(someItems) :
+        if anItemSchema is True or anItemSchema == {} :
+          continue
+        itemVar = self.newName('x')
+        self.emit(indent, "if len({}) > {}:".format(aVar, anIndex))
+        self.emit(indent+1, "{} = {}[{}]".format(itemVar, aVar, anIndex))
+        self.compileSchema(anItemSchema, itemVar, pathParts + [ str(anIndex) ], indent+1)
+      additionalItems = aSchema.get('additionalItems', True)
+      if additionalItems is not True and additionalItems != {} :
+        indexVar = self.newName('i')
+        itemVar  = self.newName('x')
+        self.emit(indent, "for {} in range({}, len({})):".format(indexVar, len(someItems), aVar))
+        self.emit(indent+1, "{} = {}[{}]".format(itemVar, aVar, indexVar))
+        if additionalItems is False :
+          self.fail(indent+1, pathParts,
+            "Additional items are not allowed (%r was unexpected)", itemVar)
+        else :
+          self.compileSchema(additionalItems, itemVar, pathParts + [ [ indexVar ] ], indent+1)
+    elif someItems is not True and someItems != {} :
+      indexVar = self.newName('i')
+      itemVar  = self.newName('x')
+      self.emit(indent, "for {}, {} in enumerate({}):".format(indexVar, itemVar, aVar))
+      self.compileSchema(someItems, itemVar, pathParts + [ [ indexVar ] ], indent+1)
+      if self.lines[-1].endswith(':') :
+        self.emit(indent+1, "pass")
+
+    if 'contains' in aSchema :
+      aCheck = self.subschemaFunction(aSchema['contains'])
+      self.emit(indent, "if not any({}(x) is None for x in {}):".format(aCheck, aVar))
+      self.fail(indent+1, pathParts,
+        "None of %r are valid under the given schema", aVar)
+
+  def compileCombinators(self, aSchema, aVar, pathParts, indent) :
+    for aSubschema in aSchema.get('allOf', []) :
+      self.compileSchema(aSubschema, aVar, pathParts, indent)
+
+    if 'anyOf' in aSchema :
+      someChecks = [ self.subschemaFunction(aSubschema) for aSubschema in aSchema['anyOf'] ]
+      self.emit(indent, "if {}:".format(" and ".join(
+        "{}({}) is not None".format(aCheck, aVar) for aCheck in someChecks
+      )))
+      self.fail(indent+1, pathParts,
+        "%r is not valid under any of the given schemas", aVar)
+
+    if 'oneOf' in aSchema :
+      someChecks = [ self.subschemaFunction(aSubschema) for aSubschema in aSchema['oneOf'] ]
+      countVar = self.newName('n')
+      self.emit(indent, "{} = {}".format(countVar, " + ".join(
+        "({}({}) is None)".format(aCheck, aVar) for aCheck in someChecks
+      )))
+      self.emit(indent, "if {} == 0:".format(countVar))
+      self.fail(indent+1, pathParts,
+        "%r is not valid under any of the given schemas", aVar)
+      self.emit(indent, "if {} > 1:".format(countVar))
+      self.fail(indent+1, pathParts,
+        "%r is valid under more than one of the given schemas", aVar)
+
+    if 'not' in aSchema :
+      aCheck = self.subschemaFunction(aSchema['not'])
+      self.emit(indent, "if {}({}) is None:".format(aCheck, aVar))
+      self.fail(indent+1, pathParts,
+        "%r should not be valid under the given schema", aVar)
+
+    if 'if' in aSchema and ('then' in aSchema or 'else' in aSchema) :
+      aCheck = self.subschemaFunction(aSchema['if'])
+      self.emit(indent, "if {}({}) is None:".format(aCheck, aVar))
+      self.compileSchema(aSchema.get('then', True), aVar, pathParts, indent+1)
+      if self.lines[-1].endswith(':') :
+        self.emit(indent+1, "pass")
+      self.emit(indent, "else:")
+      self.compileSchema(aSchema.get('else', True), aVar, pathParts, indent+1)
+      if self.lines[-1].endswith(':') :
+        self.emit(indent+1, "pass")
+
+  def compileFunction(self, aName, aSchema) :
+    self.emit(0, "")
+    self.emit(0, "def {}(x0):".format(aName))
+    self.compileSchema(aSchema, 'x0', [], 1)
+    self.emit(1, "return None")
+
+  def compile(self) :
+    # Returns the Python code of the validators of the root type
+    #
+    rootFunction = self.functionFor('#')
+    while self.toCompile :
+      aTask = self.toCompile.pop(0)
+      if type(aTask) is list :
+        self.compileFunction(*aTask)
+      else :
+        self.compileFunction(self.functionNames[aTask], self.resolveRef(aTask))
+
+    rootType = safeName(self.rootType)
+    theCode = [ runtimeCode.strip(), "" ]
+    theCode.extend(self.constants)
+    theCode.extend(self.lines)
+    theCode.append('''
+
+class ValidationError(ValueError):
+    pass
+
+def {0}_errors(instance):
+    """Return None if instance is a valid {0}, otherwise the error"""
+    error = {1}(instance)
+    if error is None:
+        return None
+    path, _, message = error.partition(': ')
+    return "{{}} (at {{}})".format(message, path or '/')
+
+def {0}_is_valid(instance):
+    return {1}(instance) is None
+
+def {0}_validate(instance):
+    """Raise a ValidationError unless instance is a valid {0}"""
+    error = {0}_errors(instance)
+    if error is not None:
+        raise ValidationError(error)
+'''.format(rootType, rootFunction))
+    return "\n".join(theCode)
+
+def compileValidators(aJsonSchema, aRootType) :
+  # The (jinja2 filter) which compiles a root type's JSON schema into
+  # Python validators
+  #
+  return ValidatorCompiler(aJsonSchema, aRootType).compile()
@@ -0,0 +1,204 @@
+# Watch an interface (and all of the files it includes) and regenerate
+# only the outputs which depend upon what has changed.
+#
+# The interface is kept loaded (and the parsed YAML of each unchanged
+# interface file is reused) between changes, so that a change only costs
+# the re-parsing of the changed files and the regeneration of the
+# affected outputs.
+
+import cpig.buildCache
+import cpig.generateCode
+import cpig.loadInterface
+import cpig.outputWriter
+import cpig.validateExamples
+import hashlib
+import json
+import time
+
+interfaceSections = [
+  'jsonSchemaPreambles',
+  'jsonSchemaDefs',
+  'httpRoutes',
+  'natsSubjects',
+  'jsonExamples',
+]
+
+def describeInterface(interfaceDefinition) :
+  # A dictionary of section -> item name -> hash of the item's (canonical)
+  # JSON, used to find what has changed between two loads
+  #
+  theDescription = {}
+  for aSection in interfaceSections :
+    theDescription[aSection] = {}
+    if aSection not in interfaceDefinition :
+      continue
+    for anItemName, anItem in interfaceDefinition[aSection].items() :
+      theDescription[aSection][anItemName] = hashlib.sha256(
+        json.dumps(anItem, sort_keys=True, default=str).encode('utf-8')
+      ).hexdigest()
+  return theDescription
+
+def findChanges(oldDescription, newDescription) :
+  # Returns a dictionary of section -> set of the names of the items
+  # which have been added, removed or changed
+  #
+  theChanges = {}
+  for aSection in interfaceSections :
+    oldItems = oldDescription[aSection]
+    newItems = newDescription[aSection]
+    changedItems = set()
+    for anItemName in set(oldItems) | set(newItems) :
+      if oldItems.get(anItemName) != newItems.get(anItemName) :
+        changedItems.add(anItemName)
+    if changedItems :
+      theChanges[aSection] = changedItems
+  return theChanges
+
+def findAffectedGenerators(theChanges, oldRootTypes, newRootTypes, theModel) :
+  # Work out which generation stages (and which root types) depend upon
+  # the changes.
+  #
+  # Returns [ someStages, someRootTypes ]
+  #
+  someStages    = set()
+  someRootTypes = set()
+
+  changedDefs = set()
+  if 'jsonSchemaDefs' in theChanges :
+    changedDefs = theChanges['jsonSchemaDefs']
+
+  # the root types whose (pruned) schemas include a changed definition
+  # or whose preamble has changed
+  #
+  for aRootType in theModel.rootTypes :
+    if aRootType.name in changedDefs or aRootType.reachableDefs & changedDefs :
+      someRootTypes.add(aRootType.name)
+  if 'jsonSchemaPreambles' in theChanges :
+    someRootTypes |= theChanges['jsonSchemaPreambles'] & newRootTypes
+  someRootTypes |= newRootTypes - oldRootTypes
+
+  if someRootTypes :
+    someStages.add('pydantic')
+    someStages.add('schemaTemplates')
+    someStages.add('payloads')
+
+  # the other stages use the names of the root type output files
+  #
+  rootTypesChanged = oldRootTypes != newRootTypes
+
+  if changedDefs or rootTypesChanged or 'httpRoutes' in theChanges :
+    someStages.add('httpRouteTemplates')
+  if changedDefs or rootTypesChanged or 'natsSubjects' in theChanges :
+    someStages.add('natsSubjectsTemplates')
+  if rootTypesChanged or 'httpRoutes' in theChanges or 'jsonExamples' in theChanges :
+    someStages.add('exampleTemplates')
+
+  return [ someStages, someRootTypes ]
+
+def statInterfaceFiles() :
+  fileStats = {}
+  for aFileName in cpig.loadInterface.loadedInterfaceFiles :
+    fileStats[aFileName] = cpig.loadInterface.interfaceFileStat(aFileName)
+  return fileStats
+
+def loadInterface(config, interfaceName) :
+  # (Re)load the interface and recompute its output file names
+  #
+  # Returns [ theGeneratorConfig, theModel ] (or [ None, None ] if the
+  # interface could not be loaded)
+  #
+  cpig.loadInterface.resetInterfaceDescription()
+  cpig.generateCode.resetGenerationErrors()
+  cpig.outputWriter.resetOutputCounts()
+  try :
+    theModel = cpig.loadInterface.loadInterfaceFile(interfaceName)
+    cpig.validateExamples.validateJsonExamples(config['options'], theModel)
+  except SystemExit :
+    print("Could not load the {} interface (waiting for the next change)".format(interfaceName))
+    return [ None, None ]
+
+  config = dict(config)
+  config['outputFiles'] = {}
+  config['outputDirs']  = {}
+  cpig.generateCode.computeOutputFileNames(config, theModel)
+  return [ config, theModel ]
+
+def watchInterface(config, interfaceName) :
+  # Watch the interface (which MUST be relative to the current working
+  # directory) until interrupted.
+  #
+  options = config['options']
+  watchInterval = 0.2
+  if 'watchInterval' in options :
+    watchInterval = float(options['watchInterval'])
+
+  cpig.loadInterface.keepParsedFiles = True
+
+  generatorConfig, theModel = loadInterface(config, interfaceName)
+  theDescription  = None
+  rootTypes       = set()
+  if generatorConfig is not None :
+    theDescription = describeInterface(theModel.description)
+    rootTypes      = set(theModel.rootTypeNames())
+    cpig.buildCache.loadBuildCache(options, theModel.name)
+    cpig.generateCode.runGenerators(generatorConfig, theModel)
+    cpig.generateCode.writeDistPackageInit(options)
+    cpig.buildCache.saveBuildCache()
+    cpig.outputWriter.reportOutputs()
+  fileStats = statInterfaceFiles()
+  if not fileStats :
+    fileStats = { cpig.loadInterface.includeKey(interfaceName) : None }
+
+  print("Watching {} (and {} included files) for changes...".format(
+    interfaceName, max(len(fileStats) - 1, 0)
+  ))
+  while True :
+    time.sleep(watchInterval)
+    newFileStats = {}
+    for aFileName in fileStats :
+      newFileStats[aFileName] = cpig.loadInterface.interfaceFileStat(aFileName)
+    if newFileStats == fileStats :
+      continue
+
+    startTime = time.perf_counter()
+    changedFiles = [
+      aFileName for aFileName in fileStats
+        if fileStats[aFileName] != newFileStats[aFileName]
+    ]
+    print("===============================================================")
+    print("Changed: {}".format(", ".join(changedFiles)))
+
+    generatorConfig, theModel = loadInterface(config, interfaceName)
+    fileStats = statInterfaceFiles() or newFileStats
+    if generatorConfig is None :
+      continue
+
+    newDescription = describeInterface(theModel.description)
+    newRootTypes   = set(theModel.rootTypeNames())
+    if theDescription is None :
+      someStages, someRootTypes = [ None, None ]
+    else :
+      theChanges = findChanges(theDescription, newDescription)
+      for aSection, someItems in theChanges.items() :
+        print("  changed {}: {}".format(aSection, ", ".join(sorted(someItems))))
+      someStages, someRootTypes = findAffectedGenerators(
+        theChanges, rootTypes, newRootTypes, theModel
+      )
+    theDescription = newDescription
+    rootTypes      = newRootTypes
+
+    cpig.buildCache.loadBuildCache(options, theModel.name)
+    cpig.generateCode.runGenerators(
+      generatorConfig, theModel, someStages, someRootTypes
+    )
+    # keep the cache entries of the outputs we did not need to look at
+    #
+    for anOutputPath, aBuildKey in cpig.buildCache.previousKeys.items() :
+      if anOutputPath not in cpig.buildCache.currentKeys :
+        cpig.buildCache.recordBuildKey(anOutputPath, aBuildKey)
+    cpig.buildCache.saveBuildCache()
+
+    cpig.outputWriter.reportOutputs()
+    print("Regenerated in {:.3f} seconds ({} errors)".format(
+      time.perf_counter() - startTime, cpig.generateCode.generationErrors
+    ))
@@ -0,0 +1,31 @@
+# Shared pytest fixtures for the cpig tests
+#
+# The tests load (small) synthesized interfaces, see
+# cpig.benchmark.synthesizeInterface, from a fresh temporary directory.
+
+import cpig.benchmark
+import cpig.buildCache
+import cpig.loadInterface
+import cpig.outputWriter
+import pytest
+
+# [ numDefs, numRoutes, numSubjects, numExamples, exampleSize ]
+#
+testInterfaceSizes = [ 4, 3, 2, 6, 3 ]
+
+@pytest.fixture
+def interfaceDir(tmp_path, monkeypatch) :
+  # A synthesized interface (bench.md) in the (current) directory tmp_path
+  #
+  monkeypatch.chdir(tmp_path)
+  monkeypatch.setattr(cpig.loadInterface, 'snapshotDir', None)
+  cpig.benchmark.synthesizeInterface(str(tmp_path), *testInterfaceSizes)
+  cpig.loadInterface.resetInterfaceDescription()
+  cpig.outputWriter.resetOutputCounts()
+  yield tmp_path
+  cpig.loadInterface.resetInterfaceDescription()
+  cpig.buildCache.cacheFilePath = None
+
+@pytest.fixture
+def theModel(interfaceDir) :
+  return cpig.benchmark.loadInterfaceQuietly('bench.md')
@@ -0,0 +1,27 @@
+# The (slow to import) backends MUST only be imported when they are used
+
+import cpig.backends
+import json
+import os
+import subprocess
+import sys
+
+packageDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_importingCpigImportsNoBackends() :
+  someModules = json.loads(subprocess.run([
+    sys.executable, '-c',
+    'import sys, json, cpig, cpig.cli; print(json.dumps(sorted(sys.modules)))'
+  ], cwd=packageDir, check=True, capture_output=True, text=True).stdout)
+  for aBackend in [
+    cpig.backends.templateBackend, cpig.backends.validationBackend
+  ] + list(cpig.backends.generatorBackends.values()) :
+    assert aBackend not in someModules
+
+def test_configuredBackends() :
+  assert cpig.backends.configuredBackends({}) == [ 'jsonschema' ]
+  assert cpig.backends.configuredBackends({
+    'genSchema'     : { 'ajv' : {}, 'pydantic' : {} },
+    'genExamples'   : None,
+    'genHttpRoutes' : { 'httpRouteUtils' : {} },
+  }) == [ 'jsonschema', 'jinja2', 'datamodel_code_generator' ]
@@ -0,0 +1,144 @@
+# The generated modules MUST import (or, for JavaScript, parse), and the
+# outputs MUST NOT depend upon the number of threads used to generate them
+
+import contextlib
+import cpig.benchmark
+import importlib.util
+import io
+import os
+import pytest
+import shutil
+import subprocess
+import sys
+
+# (the cpig.cli name is the click command re-exported by cpig/__init__.py)
+#
+from cpig.cli import generateInterface as cpigGenerateInterface
+
+def generateInterface(interfaceDir, distName, numThreads) :
+  config = cpig.benchmark.loadBenchmarkConfig(str(interfaceDir), False, 1, numThreads)
+  config['options']['distDir'] = str(interfaceDir / distName)
+  config['genSchema']['pythonValidators'] = {}
+  config['genSchema']['payloads'] = { 'targetSize' : '4KB' }
+  config['genExamples']['loadTest'] = {}
+  outputBuffer = io.StringIO()
+  with contextlib.redirect_stdout(outputBuffer) :
+    numErrors = cpigGenerateInterface(config, 'bench.md')
+  assert numErrors == 0, outputBuffer.getvalue()
+  return interfaceDir / distName
+
+def readOutputs(distDir) :
+  someOutputs = {}
+  for aDir, someDirs, someFiles in os.walk(distDir) :
+    someDirs[:] = [ aSubDir for aSubDir in someDirs if not aSubDir.startswith('.') ]
+    for aFile in someFiles :
+      aPath = os.path.join(aDir, aFile)
+      with open(aPath, 'rb') as outputFile :
+        someOutputs[os.path.relpath(aPath, distDir)] = outputFile.read()
+  return someOutputs
+
+def importModule(aPath) :
+  aName = 'generated_'+os.path.splitext(os.path.basename(aPath))[0]
+  aSpec = importlib.util.spec_from_file_location(aName, aPath)
+  aModule = importlib.util.module_from_spec(aSpec)
+  sys.modules[aName] = aModule
+  try :
+    aSpec.loader.exec_module(aModule)
+  finally :
+    del sys.modules[aName]
+  return aModule
+
+def test_threadsDoNotChangeTheOutputs(interfaceDir) :
+  oneThread   = readOutputs(generateInterface(interfaceDir, 'dist1', 1))
+  fourThreads = readOutputs(generateInterface(interfaceDir, 'dist4', 4))
+  assert sorted(oneThread) == sorted(fourThreads)
+  for anOutput in oneThread :
+    assert oneThread[anOutput] == fourThreads[anOutput], anOutput
+
+def test_generatedPythonModulesImport(interfaceDir) :
+  pythonDir = generateInterface(interfaceDir, 'dist', 1) / 'python'
+  numImported = 0
+  for aFile in sorted(os.listdir(pythonDir)) :
+    if not aFile.endswith('.py') :
+      continue
+    aPath = str(pythonDir / aFile)
+    if 'FastApi' in aFile and importlib.util.find_spec('fastapi') is None :
+      compile(open(aPath).read(), aPath, 'exec')
+      continue
+    importModule(aPath)
+    numImported += 1
+  assert 0 < numImported
+
+def test_generatedValidatorsAcceptTheExamples(theModel, interfaceDir) :
+  pythonDir = generateInterface(interfaceDir, 'dist', 1) / 'python'
+  numChecked = 0
+  for aJsonType, someExamples in theModel.examplesByType.items() :
+    aPath = pythonDir / (aJsonType+'Validators.py')
+    if not aPath.exists() :
+      continue
+    aModule = importModule(str(aPath))
+    for anExample in someExamples :
+      getattr(aModule, aJsonType+'_validate')(anExample['example'])
+      numChecked += 1
+  assert 0 < numChecked
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="no node")
+def test_generatedJavaScriptParses(interfaceDir) :
+  jsDir = generateInterface(interfaceDir, 'dist', 1) / 'js'
+  for aFile in sorted(os.listdir(jsDir)) :
+    if aFile.endswith('.mjs') :
+      subprocess.run([ 'node', '--check', str(jsDir / aFile) ], check=True)
+
+roundTripChecks = """
+import { buildUrl, parseUrl } from './benchHttpRouteUtils.mjs'
+const someParts = { mountPoint: '/route1', name: 'a%20b', id: '7' }
+const aUrl = buildUrl(someParts)
+if (aUrl != '/route1/a%20b/7') throw new Error(aUrl)
+if (JSON.stringify(parseUrl('http://host'+aUrl+'?q=1')) != JSON.stringify(someParts)) {
+  throw new Error(JSON.stringify(parseUrl(aUrl)))
+}
+if (buildUrl({ mountPoint: '/route1', name: 'a' }) !== null) throw new Error('partial')
+"""
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="no node")
+def test_javaScriptUrlsRoundTrip(interfaceDir) :
+  jsDir = generateInterface(interfaceDir, 'dist', 1) / 'js'
+  (jsDir / 'roundTrip.mjs').write_text(roundTripChecks)
+  subprocess.run([ 'node', str(jsDir / 'roundTrip.mjs') ], check=True)
+
+def test_pythonUrlsRoundTrip(interfaceDir) :
+  pytest.importorskip('fastapi')
+  pythonDir = generateInterface(interfaceDir, 'dist', 1) / 'python'
+  aModule = importModule(str(pythonDir / 'benchFastApiExamples.py'))
+  someParts = { 'mountPoint' : '/route1', 'name' : 'a%20b', 'id' : '7' }
+  aUrl = aModule.buildUrl(someParts)
+  assert aUrl == '/route1/a%20b/7'
+  assert aModule.parseUrl('http://host'+aUrl+'?q=1') == someParts
+
+def test_mockServerStringRoutes(interfaceDir) :
+  # (a route given as a string is used as it is, rather than passed to
+  # buildUrl, which only builds URLs from entityUrlParts)
+  #
+  jsDir = generateInterface(interfaceDir, 'dist', 1) / 'js'
+  mockServerCode = (jsDir / 'benchMockServerExamples.mjs').read_text()
+  assert 'app.get("/mapping",' in mockServerCode
+  assert 'buildUrl("' not in mockServerCode
+
+def test_customTemplatePathIsNotAnOption(interfaceDir) :
+  # (the path of a configured template is not passed on to the template
+  # as one of its options)
+  #
+  templatePath = str(interfaceDir / 'myAjv.j2')
+  shutil.copy(
+    os.path.join(os.path.dirname(cpig.benchmark.__file__), 'templates', 'ajv.j2'),
+    templatePath
+  )
+  config = cpig.benchmark.loadBenchmarkConfig(str(interfaceDir), True, 1, 1)
+  config['genSchema']['ajv']['jinja2'] = templatePath
+  with contextlib.redirect_stdout(io.StringIO()) :
+    assert cpigGenerateInterface(config, 'bench.md') == 0
+  jsDir = interfaceDir / 'dist' / 'js'
+  someAjvFiles = [ aFile for aFile in os.listdir(jsDir) if aFile.endswith('_ajv.mjs') ]
+  assert someAjvFiles
+  for aFile in someAjvFiles :
+    assert 'myAjv.j2' not in (jsDir / aFile).read_text()
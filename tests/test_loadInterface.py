@@ -0,0 +1,71 @@
+# An interface loaded from its snapshots MUST be the same as one parsed
+# from its files (with either YAML loader)
+
+import cpig.benchmark
+import cpig.loadInterface
+import json
+import os
+import pytest
+import yaml
+
+def loadDescription(monkeypatch, aLoader, aSnapshotDir) :
+  monkeypatch.setattr(cpig.loadInterface, 'yamlSafeLoader', aLoader)
+  monkeypatch.setattr(cpig.loadInterface, 'snapshotDir', aSnapshotDir)
+  cpig.benchmark.loadInterfaceQuietly('bench.md')
+  return json.dumps(cpig.loadInterface.interfaceDescription, sort_keys=True)
+
+def snapshotFiles(aSnapshotDir) :
+  return sorted(
+    aFile for aFile in os.listdir(aSnapshotDir) if aFile.endswith('.pickle')
+  )
+
+def test_snapshotsMatchParsedInterface(interfaceDir, monkeypatch) :
+  snapshotDir = str(interfaceDir / 'snapshots')
+  parsedDescription = loadDescription(monkeypatch, yaml.SafeLoader, None)
+  assert not os.path.exists(snapshotDir)
+
+  # (the first load writes one snapshot for each interface file)
+  assert loadDescription(monkeypatch, yaml.SafeLoader, snapshotDir) == parsedDescription
+  assert len(snapshotFiles(snapshotDir)) == 2
+
+  # (which the next load uses instead of parsing the YAML)
+  def parseYamlBlock(yamlLines) :
+    raise AssertionError("a YAML block was parsed")
+  monkeypatch.setattr(cpig.loadInterface, 'parseYamlBlock', parseYamlBlock)
+  assert loadDescription(monkeypatch, yaml.SafeLoader, snapshotDir) == parsedDescription
+
+@pytest.mark.skipif(not hasattr(yaml, 'CSafeLoader'), reason="no libyaml")
+def test_libyamlMatchesPythonYaml(interfaceDir, monkeypatch) :
+  assert loadDescription(monkeypatch, yaml.CSafeLoader, None) == \
+    loadDescription(monkeypatch, yaml.SafeLoader, None)
+
+def test_changedFileIsParsedAgain(interfaceDir, monkeypatch) :
+  snapshotDir = str(interfaceDir / 'snapshots')
+  loadDescription(monkeypatch, yaml.SafeLoader, snapshotDir)
+  oldSnapshots = dict(
+    (aFile, (interfaceDir / 'snapshots' / aFile).read_bytes())
+    for aFile in snapshotFiles(snapshotDir)
+  )
+
+  with open('bench.md', 'a') as interfaceFile :
+    interfaceFile.write("```yaml\njsonSchemaDefs:\n  extraType:\n    type: string\n```\n")
+  snapshotDescription = loadDescription(monkeypatch, yaml.SafeLoader, snapshotDir)
+  assert 'extraType' in cpig.loadInterface.interfaceDescription['jsonSchemaDefs']
+  assert snapshotDescription == loadDescription(monkeypatch, yaml.SafeLoader, None)
+
+  # (only the snapshot of the changed file is replaced)
+  newSnapshots = dict(
+    (aFile, (interfaceDir / 'snapshots' / aFile).read_bytes())
+    for aFile in snapshotFiles(snapshotDir)
+  )
+  assert sorted(newSnapshots) == sorted(oldSnapshots)
+  assert sum(
+    1 for aFile in newSnapshots if newSnapshots[aFile] != oldSnapshots[aFile]
+  ) == 1
+
+def test_corruptSnapshotIsIgnored(interfaceDir, monkeypatch) :
+  snapshotDir = str(interfaceDir / 'snapshots')
+  parsedDescription = loadDescription(monkeypatch, yaml.SafeLoader, snapshotDir)
+  for aFile in snapshotFiles(snapshotDir) :
+    (interfaceDir / 'snapshots' / aFile).write_bytes(b"not a pickle")
+  assert loadDescription(monkeypatch, yaml.SafeLoader, snapshotDir) == parsedDescription
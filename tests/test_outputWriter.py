@@ -0,0 +1,94 @@
+# Outputs are only (re)written, atomically, when they change, and an
+# output skipped by the build cache is counted as unchanged
+
+import cpig.buildCache
+import cpig.outputWriter
+import os
+import stat
+
+def outputCounts() :
+  return [
+    cpig.outputWriter.filesWritten,
+    cpig.outputWriter.filesUnchanged,
+    cpig.outputWriter.bytesWritten,
+  ]
+
+def test_writeIfChanged(tmp_path) :
+  cpig.outputWriter.resetOutputCounts()
+  outputPath = str(tmp_path / 'sub' / 'output.txt')
+
+  cpig.outputWriter.writeOutputFile(outputPath, "some content")
+  assert outputCounts() == [ 1, 0, 12 ]
+  firstStat = os.stat(outputPath)
+
+  cpig.outputWriter.writeOutputFile(outputPath, b"some content")
+  assert outputCounts() == [ 1, 1, 12 ]
+  assert os.stat(outputPath).st_mtime_ns == firstStat.st_mtime_ns
+  assert os.stat(outputPath).st_ino == firstStat.st_ino
+
+  cpig.outputWriter.writeOutputFile(outputPath, "new content")
+  assert outputCounts() == [ 2, 1, 23 ]
+  with open(outputPath) as outputFile :
+    assert outputFile.read() == "new content"
+
+  # (no temporary files are left behind)
+  assert os.listdir(tmp_path / 'sub') == [ 'output.txt' ]
+
+def test_fileModes(tmp_path) :
+  oldUmask = os.umask(0o027)
+  try :
+    newPath = str(tmp_path / 'new.txt')
+    cpig.outputWriter.replaceFileIfChanged(newPath, "new")
+    assert stat.S_IMODE(os.stat(newPath).st_mode) == 0o640
+  finally :
+    os.umask(oldUmask)
+
+  # (a replaced file keeps its mode)
+  os.chmod(newPath, 0o604)
+  cpig.outputWriter.replaceFileIfChanged(newPath, "changed")
+  assert stat.S_IMODE(os.stat(newPath).st_mode) == 0o604
+
+def test_streamedOutputs(tmp_path) :
+  outputPath = str(tmp_path / 'stream.ndjson')
+  someChunks = [ b"1\n", b"2\n", b"3\n" ]
+  assert cpig.outputWriter.replaceFileWithStream(outputPath, iter(someChunks)) == [ True, 6 ]
+  assert cpig.outputWriter.replaceFileWithStream(outputPath, iter(someChunks)) == [ False, 6 ]
+  assert cpig.outputWriter.replaceFileWithStream(outputPath, iter(someChunks[:2])) == [ True, 4 ]
+  assert os.listdir(tmp_path) == [ 'stream.ndjson' ]
+
+def test_buildCacheHitsAndMisses(tmp_path) :
+  options = { 'distDir' : str(tmp_path), 'force' : False }
+  outputPath = str(tmp_path / 'output.txt')
+  aKey = cpig.buildCache.computeBuildKey({ 'a' : 1, 'b' : 2 }, "template")
+  assert aKey == cpig.buildCache.computeBuildKey({ 'b' : 2, 'a' : 1 }, "template")
+  assert aKey != cpig.buildCache.computeBuildKey({ 'a' : 1, 'b' : 3 }, "template")
+
+  def buildOnce(aBuildKey, someOptions=options) :
+    cpig.buildCache.loadBuildCache(someOptions, 'interface')
+    cpig.outputWriter.resetOutputCounts()
+    if not cpig.buildCache.isUpToDate(outputPath, aBuildKey) :
+      cpig.outputWriter.writeOutputFile(outputPath, "built with "+aBuildKey)
+      cpig.buildCache.recordBuildKey(outputPath, aBuildKey)
+    cpig.buildCache.saveBuildCache()
+    return outputCounts()[:2]
+
+  try :
+    assert buildOnce(aKey) == [ 1, 0 ]
+    # (a cache hit is counted as an unchanged output)
+    assert buildOnce(aKey) == [ 0, 1 ]
+    assert buildOnce('otherKey') == [ 1, 0 ]
+    assert buildOnce('otherKey', dict(options, force=True)) == [ 0, 1 ]
+    os.unlink(outputPath)
+    assert buildOnce('otherKey') == [ 1, 0 ]
+  finally :
+    cpig.buildCache.cacheFilePath = None
+
+def test_buildKeysFollowCpigSources(monkeypatch) :
+  # (a change to cpig's own code changes every key, even when the package
+  # version does not change)
+  aKey = cpig.buildCache.computeBuildKey({ 'a' : 1 }, "template")
+  assert cpig.buildCache.cpigVersion().endswith(
+    '+'+cpig.buildCache.cpigSourcesDigest()[:16]
+  )
+  monkeypatch.setattr(cpig.buildCache, 'sourcesDigest', 'f'*64)
+  assert aKey != cpig.buildCache.computeBuildKey({ 'a' : 1 }, "template")
@@ -0,0 +1,99 @@
+# The synthesized payloads MUST be valid (for jsonschema's Draft7Validator)
+# and reproducible
+
+import cpig.generateCode
+import cpig.payloadSynthesizer
+import json
+import jsonschema
+import pytest
+
+def synthesize(aJsonSchema, numPayloads, seed=0) :
+  return [
+    json.loads(aLine) for aLine in cpig.payloadSynthesizer.streamPayloads(
+      aJsonSchema, seed=seed, maxPayloads=numPayloads
+    )
+  ]
+
+@pytest.mark.parametrize('aJsonSchema', [
+  { 'type' : 'integer', 'minimum' : -3, 'exclusiveMaximum' : 4, 'multipleOf' : 3 },
+  { 'type' : 'number', 'minimum' : 0.5, 'maximum' : 0.75 },
+  { 'type' : 'number', 'exclusiveMinimum' : 5000 },
+  { 'type' : 'number', 'exclusiveMaximum' : -5000 },
+  { 'type' : 'integer', 'exclusiveMinimum' : 5000 },
+  { 'type' : 'integer', 'exclusiveMaximum' : -5000 },
+  { 'type' : 'number', 'minimum' : 1, 'exclusiveMinimum' : 3, 'exclusiveMaximum' : 4 },
+  { 'type' : 'string', 'minLength' : 3, 'maxLength' : 5 },
+  { 'type' : 'string', 'pattern' : '^abc[0-9a-f]+$' },
+  { 'type' : 'string', 'format' : 'date-time' },
+  { 'enum' : [ 1, "a", None ] },
+  { 'const' : { 'a' : [ 1 ] } },
+  { 'type' : 'array', 'items' : { 'type' : 'boolean' }, 'minItems' : 2, 'maxItems' : 3 },
+  { 'type' : 'array', 'items' : [ { 'type' : 'string' }, { 'type' : 'null' } ],
+    'additionalItems' : False },
+  { 'type' : 'array', 'items' : { 'enum' : [ 1, 2, 3, 4 ] }, 'uniqueItems' : True },
+  { 'type' : 'object', 'required' : [ 'a' ], 'additionalProperties' : False,
+    'properties' : { 'a' : { 'type' : 'string' }, 'b' : { 'type' : 'integer' } } },
+  { 'type' : 'object', 'additionalProperties' : { 'type' : 'integer' } },
+  { 'oneOf' : [ { 'type' : 'string' }, { 'type' : 'integer' } ] },
+  { 'allOf' : [
+    { 'type' : 'object', 'properties' : { 'a' : { 'type' : 'string' } } },
+    { 'required' : [ 'a', 'b' ], 'properties' : { 'b' : { 'type' : 'null' } } },
+  ] },
+  { '$defs' : { 'node' : { 'type' : 'object', 'properties' : {
+      'next' : { '$ref' : '#/$defs/node' } } } },
+    '$ref' : '#/$defs/node' },
+])
+def test_payloadsAreValid(aJsonSchema) :
+  aValidator = jsonschema.Draft7Validator(aJsonSchema)
+  for aPayload in synthesize(aJsonSchema, 50) :
+    assert aValidator.is_valid(aPayload), aPayload
+
+def test_rootTypePayloadsAreValid(theModel) :
+  numRootTypes = 0
+  for aRootType, aJsonSchema in cpig.generateCode.jsonSchemaGenerator(
+    { 'verbose' : 0 }, theModel
+  ) :
+    numRootTypes += 1
+    aValidator = jsonschema.Draft7Validator(aJsonSchema)
+    for aPayload in synthesize(aJsonSchema, 20) :
+      assert aValidator.is_valid(aPayload), aPayload
+  assert 0 < numRootTypes
+
+def test_payloadsAreReproducible() :
+  aJsonSchema = {
+    'type' : 'object',
+    'properties' : { 'a' : { 'type' : 'string' }, 'b' : { 'type' : 'number' } },
+  }
+  assert synthesize(aJsonSchema, 10, seed=7) == synthesize(aJsonSchema, 10, seed=7)
+  assert synthesize(aJsonSchema, 10, seed=7) != synthesize(aJsonSchema, 10, seed=8)
+
+def test_targetSize() :
+  someLines = list(cpig.payloadSynthesizer.streamPayloads(
+    { 'type' : 'string', 'minLength' : 10, 'maxLength' : 10 }, targetSize=100
+  ))
+  assert 100 <= sum(len(aLine) for aLine in someLines)
+  assert sum(len(aLine) for aLine in someLines[:-1]) < 100
+
+  someChunks = list(cpig.payloadSynthesizer.streamPayloadChunks(
+    { 'type' : 'integer' }, chunkSize=64, maxPayloads=100
+  ))
+  assert sum(aChunk.count(b"\n") for aChunk in someChunks) == 100
+
+@pytest.mark.parametrize('aJsonSchema', [
+  { 'type' : 'integer', 'minimum' : 3, 'maximum' : 2 },
+  { 'type' : 'number', 'minimum' : 3, 'maximum' : 2 },
+  { 'type' : 'number', 'exclusiveMinimum' : 2, 'exclusiveMaximum' : 2 },
+  { 'type' : 'integer', 'exclusiveMinimum' : 2, 'exclusiveMaximum' : 3 },
+  { 'type' : 'integer', 'minimum' : 1, 'maximum' : 2, 'multipleOf' : 5 },
+  { '$ref' : 'http://example.com/schema' },
+])
+def test_unsatisfiableSchemas(aJsonSchema) :
+  with pytest.raises(cpig.payloadSynthesizer.PayloadError) :
+    synthesize(aJsonSchema, 1)
+
+def test_parseSize() :
+  assert cpig.payloadSynthesizer.parseSize(1000) == 1000
+  assert cpig.payloadSynthesizer.parseSize("64KB") == 64 * 1024
+  assert cpig.payloadSynthesizer.parseSize("1.5mb") == 3 * (1 << 19)
+  with pytest.raises(cpig.payloadSynthesizer.PayloadError) :
+    cpig.payloadSynthesizer.parseSize("lots")
@@ -0,0 +1,121 @@
+# The task graph MUST run each task after the tasks it depends upon, and
+# report the output (and errors) of its tasks in task order, however many
+# threads it uses
+
+import cpig.outputWriter
+import cpig.profiler
+import cpig.scheduler
+import os
+import pytest
+import threading
+import time
+
+def addTasks(theGraph, someNames, runOrder, runLock, delays={}) :
+  # A diamond of tasks for each name: name/a -> name/b, name/c -> name/d
+  #
+  def runTask(aName) :
+    time.sleep(delays.get(aName, 0))
+    with runLock :
+      runOrder.append(aName)
+    print("ran "+aName)
+    return aName.upper()
+
+  someTasks = {}
+  for aName in someNames :
+    aTask = theGraph.addTask(aName+'/a', runTask, [ aName+'/a' ])
+    bTask = theGraph.addTask(aName+'/b', runTask, [ aName+'/b' ], [ aTask ])
+    cTask = theGraph.addTask(aName+'/c', runTask, [ aName+'/c' ], [ aTask ])
+    someTasks[aName] = theGraph.addTask(
+      aName+'/d', runTask, [ aName+'/d' ], [ bTask, cTask ]
+    )
+  return someTasks
+
+@pytest.mark.parametrize('numThreads', [ 1, 4 ])
+def test_dependenciesAndOutputOrder(numThreads, capsys) :
+  theGraph = cpig.scheduler.TaskGraph(numThreads)
+  runOrder = []
+  addTasks(
+    theGraph, [ 'x', 'y' ], runOrder, threading.Lock(),
+    { 'x/b' : 0.05, 'x/c' : 0.02 }
+  )
+  theGraph.run()
+
+  for aName in [ 'x', 'y' ] :
+    assert runOrder.index(aName+'/a') < runOrder.index(aName+'/b')
+    assert runOrder.index(aName+'/a') < runOrder.index(aName+'/c')
+    assert runOrder.index(aName+'/b') < runOrder.index(aName+'/d')
+    assert runOrder.index(aName+'/c') < runOrder.index(aName+'/d')
+  assert all(aTask.result == aTask.name.upper() for aTask in theGraph.tasks)
+
+  # (the output is reported in task order, whatever order the tasks ran in)
+  assert capsys.readouterr().out == "".join(
+    "ran "+aTask.name+"\n" for aTask in theGraph.tasks
+  )
+
+def test_failedTaskSkipsItsDependents() :
+  theGraph = cpig.scheduler.TaskGraph(4)
+  runOrder = []
+  def failTask() :
+    raise ValueError("failed")
+  failedTask = theGraph.addTask('fail', failTask)
+  someTasks = addTasks(theGraph, [ 'x' ], runOrder, threading.Lock())
+  theGraph.addTask('dependent', runOrder.append, [ 'dependent' ], [ failedTask ])
+
+  with pytest.raises(ValueError, match="failed") :
+    theGraph.run()
+  assert 'dependent' not in runOrder
+  assert someTasks['x'].result == 'X/D'
+
+def test_addTaskChecks(capsys) :
+  theGraph = cpig.scheduler.TaskGraph()
+  aTask = theGraph.addTask('a', print)
+  with pytest.raises(SystemExit) :
+    theGraph.addTask('a', print)
+  otherTask = cpig.scheduler.TaskGraph().addTask('other', print)
+  with pytest.raises(SystemExit) :
+    theGraph.addTask('b', print, [], [ aTask, otherTask ])
+
+def runInProcesses(theGraph) :
+  if not theGraph.useProcesses() :
+    return os.getpid()
+  return theGraph.submitToProcesses(os.getpid).result()
+
+def test_processPool() :
+  theGraph = cpig.scheduler.TaskGraph(2, 2)
+  someTasks = [
+    theGraph.addTask('pid{}'.format(i), runInProcesses, [ theGraph ], usesProcesses=True)
+    for i in range(4)
+  ]
+  theGraph.run()
+  assert not theGraph.useProcesses()
+  assert all(aTask.result != os.getpid() for aTask in someTasks)
+
+def test_noProcessPoolWithoutProcessTasks() :
+  theGraph = cpig.scheduler.TaskGraph(1, 4)
+  aTask = theGraph.addTask('pid', runInProcesses, [ theGraph ])
+  theGraph.run()
+  assert aTask.result == os.getpid()
+
+def test_profiledTasksAreChargedForTheirOwnWork(tmp_path) :
+  cpig.profiler.enableProfiling()
+  cpig.profiler.resetProfile()
+  try :
+    theGraph = cpig.scheduler.TaskGraph(4)
+    def writeOutput(aName, numBytes, busyTime) :
+      with cpig.profiler.profileSection('generator', aName) :
+        cpig.outputWriter.writeOutputFile(str(tmp_path / aName), b"x" * numBytes)
+        startCpu = time.thread_time()
+        while time.thread_time() - startCpu < busyTime :
+          pass
+    theGraph.addTask('small', writeOutput, [ 'small', 10, 0.0 ])
+    theGraph.addTask('large', writeOutput, [ 'large', 1000, 0.1 ])
+    theGraph.run()
+    someSections = dict(
+      (aSection['name'], aSection) for aSection in cpig.profiler.getProfile()
+    )
+  finally :
+    cpig.profiler.disableProfiling()
+    cpig.profiler.resetProfile()
+  assert someSections['small']['bytesWritten'] == 10
+  assert someSections['large']['bytesWritten'] == 1000
+  assert someSections['small']['cpuTime'] < 0.05
@@ -0,0 +1,53 @@
+# The (generated) SseBroadcastHub of the fastApiRoutes MUST deliver every
+# event to its fast subscribers, drop the oldest events of its slow
+# subscribers, and forget its subscribers once their streams close
+
+import asyncio
+import cpig.benchmark
+
+def test_formatEvent() :
+  SseBroadcastHub = cpig.benchmark.loadSseBroadcastHub(4)
+  assert SseBroadcastHub.formatEvent({ 'a' : [ 1, True ] }) == \
+    b'data: {"a":[1,true]}\n\n'
+  assert SseBroadcastHub.formatEvent({}, 'changed', 7) == \
+    b'id: 7\nevent: changed\ndata: {}\n\n'
+
+def test_fastAndSlowSubscribers() :
+  # (the queues hold more than one burst of events)
+  SseBroadcastHub = cpig.benchmark.loadSseBroadcastHub(16)
+  theHub = SseBroadcastHub(keepAliveSeconds=0)
+  results = asyncio.run(cpig.benchmark.runSseHub(
+    theHub, numSubscribers=20, numSlow=5, slowDelay=0.01, numEvents=40,
+    eventSize=3, burstSize=10
+  ))
+  assert results['lostByFastConsumers'] == 0
+  assert 0 < results['eventsDropped']
+  assert results['subscribersLeft'] == 0
+  assert theHub.subscribers == {}
+
+def test_publishWithoutSubscribers() :
+  SseBroadcastHub = cpig.benchmark.loadSseBroadcastHub(4)
+  theHub = SseBroadcastHub(keepAliveSeconds=0)
+  assert theHub.publish('/nobody', { 'a' : 1 }) == 0
+  assert theHub.numSubscribers() == 0
+
+def test_queuedEventsAreSentTogether() :
+  SseBroadcastHub = cpig.benchmark.loadSseBroadcastHub(2)
+
+  async def receiveChunk() :
+    theHub  = SseBroadcastHub(keepAliveSeconds=0)
+    aStream = theHub.stream('/topic')
+    aChunk  = asyncio.ensure_future(aStream.__anext__())
+    while not theHub.numSubscribers('/topic') :
+      await asyncio.sleep(0)
+    for anEventId in range(3) :
+      assert theHub.publish('/topic', anEventId, eventId=anEventId) == 1
+    aChunk = await aChunk
+    await aStream.aclose()
+    return [ theHub, aChunk ]
+
+  theHub, aChunk = asyncio.run(receiveChunk())
+  # (the queue holds 2 events, so the oldest of the 3 is dropped)
+  assert aChunk == b'id: 1\ndata: 1\n\nid: 2\ndata: 2\n\n'
+  assert theHub.droppedEvents == 1
+  assert theHub.numSubscribers() == 0
@@ -0,0 +1,72 @@
+# The generated pythonValidators MUST agree with jsonschema's
+# Draft7Validator
+
+import cpig.benchmark
+import cpig.validateExamples
+import cpig.validatorCompiler
+import jsonschema
+import pytest
+
+def checkAgainstDraft7(aJsonSchema, aJsonType, someInstances) :
+  compiledIsValid, compiledErrors, compileTime = \
+    cpig.benchmark.loadCompiledValidator(aJsonSchema, aJsonType)
+  numValid, someMismatches = cpig.benchmark.findMismatches(
+    compiledIsValid, compiledErrors,
+    jsonschema.Draft7Validator(aJsonSchema).is_valid, someInstances
+  )
+  assert someMismatches == []
+  return numValid
+
+@pytest.mark.parametrize(
+  'aCaseName, aJsonSchema', cpig.benchmark.edgeCaseSchemas,
+  ids=[ aCase[0] for aCase in cpig.benchmark.edgeCaseSchemas ]
+)
+def test_edgeCaseSchemas(aCaseName, aJsonSchema) :
+  checkAgainstDraft7(aJsonSchema, aCaseName, cpig.benchmark.edgeCaseInstances)
+
+@pytest.mark.parametrize('aJsonSchema, someInstances', [
+  [ { 'type' : 'integer', 'multipleOf' : 0.5, 'maximum' : 3 },
+    [ 0, 1, 2.5, 3, 3.5, 4, True, "1" ] ],
+  [ { 'enum' : [ 1, "a", [ 1 ], { 'b' : None } ] },
+    [ 1, 1.0, True, "a", [ 1 ], [ True ], { 'b' : None }, { 'b' : 0 } ] ],
+  [ { 'const' : False }, [ False, 0, None, [] ] ],
+  [ { 'type' : 'array', 'uniqueItems' : True },
+    [ [], [ 1, 2 ], [ 1, 1.0 ], [ 1, True ], [ [ 1 ], [ 1 ] ], [ {}, {} ] ] ],
+  [ { 'type' : 'string', 'pattern' : '^a+$', 'minLength' : 2 },
+    [ "a", "aa", "aab", "", 7 ] ],
+  [ { 'oneOf' : [ { 'type' : 'integer' }, { 'minimum' : 2 } ] },
+    [ 1, 2, 2.5, "x" ] ],
+  [ { 'not' : { 'type' : [ 'null', 'boolean' ] } },
+    [ None, True, 0, "" ] ],
+  [ { 'type' : 'object', 'required' : [ 'a' ],
+      'dependencies' : { 'a' : [ 'b' ] }, 'additionalProperties' : False,
+      'properties' : { 'a' : {}, 'b' : {} } },
+    [ {}, { 'a' : 1 }, { 'a' : 1, 'b' : 2 }, { 'a' : 1, 'b' : 2, 'c' : 3 } ] ],
+])
+def test_keywords(aJsonSchema, someInstances) :
+  checkAgainstDraft7(aJsonSchema, 'keywords', someInstances)
+
+def test_interfaceExamples(theModel) :
+  # (the examples of the interface, together with mutated variants of
+  # each of them)
+  #
+  for aJsonType, someExamples in theModel.examplesByType.items() :
+    if aJsonType not in theModel.jsonSchemaDefs :
+      continue
+    aJsonSchema = cpig.validateExamples.buildDefinitionSchema(theModel, aJsonType)
+    someInstances = []
+    for anExample in someExamples :
+      someInstances.extend(cpig.benchmark.mutateExample(anExample['example']))
+    assert 0 < checkAgainstDraft7(aJsonSchema, aJsonType, someInstances)
+
+def test_validationError() :
+  validatorCode = cpig.validatorCompiler.compileValidators(
+    { 'type' : 'object', 'properties' : { 'a' : { 'type' : 'string' } } }, 'a-b'
+  )
+  validatorNamespace = {}
+  exec(compile(validatorCode, 'a-bValidators.py', 'exec'), validatorNamespace)
+  aName = cpig.validatorCompiler.safeName('a-b')
+  validatorNamespace[aName+'_validate']({ 'a' : 'x' })
+  assert validatorNamespace[aName+'_errors']({ 'a' : 'x' }) is None
+  with pytest.raises(validatorNamespace['ValidationError']) :
+    validatorNamespace[aName+'_validate']({ 'a' : 1 })
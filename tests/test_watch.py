@@ -0,0 +1,75 @@
+# Watch mode only regenerates the stages (and root types) which depend
+# upon what has changed
+
+import copy
+import cpig.benchmark
+import cpig.watch
+import pytest
+
+def affectedBy(theModel, changeDescription) :
+  oldDescription = cpig.watch.describeInterface(theModel.description)
+  newDefinition  = copy.deepcopy(theModel.description)
+  changeDescription(newDefinition)
+  theChanges = cpig.watch.findChanges(
+    oldDescription, cpig.watch.describeInterface(newDefinition)
+  )
+  rootTypes = set(theModel.rootTypeNames())
+  return [ theChanges ] + cpig.watch.findAffectedGenerators(
+    theChanges, rootTypes, rootTypes, theModel
+  )
+
+def test_noChanges(theModel) :
+  assert affectedBy(theModel, lambda aDefinition : None) == [ {}, set(), set() ]
+
+def test_changedDefinition(theModel) :
+  def changeType1(aDefinition) :
+    aDefinition['jsonSchemaDefs']['type1']['properties']['extra'] = { 'type' : 'string' }
+  theChanges, someStages, someRootTypes = affectedBy(theModel, changeType1)
+  assert theChanges == { 'jsonSchemaDefs' : { 'type1' } }
+  assert someStages == {
+    'pydantic', 'schemaTemplates', 'payloads',
+    'httpRouteTemplates', 'natsSubjectsTemplates',
+  }
+  # (type1, and the types whose parent is type1, but not type0)
+  assert 'type1' in someRootTypes and 'type2' in someRootTypes
+  assert 'type0' not in someRootTypes
+  for aRootType in theModel.rootTypes :
+    if 'type1' in aRootType.reachableDefs :
+      assert aRootType.name in someRootTypes
+
+def test_changedExample(theModel) :
+  def changeExample(aDefinition) :
+    aDefinition['jsonExamples']['type0'][0]['example']['count'] = 42
+  theChanges, someStages, someRootTypes = affectedBy(theModel, changeExample)
+  assert theChanges == { 'jsonExamples' : { 'type0' } }
+  assert someStages == { 'exampleTemplates' }
+  assert someRootTypes == set()
+
+@pytest.mark.parametrize('aSection, aStage', [
+  [ 'httpRoutes',   'httpRouteTemplates' ],
+  [ 'natsSubjects', 'natsSubjectsTemplates' ],
+])
+def test_changedRoutesAndSubjects(theModel, aSection, aStage) :
+  def addItem(aDefinition) :
+    anItem = copy.deepcopy(next(iter(aDefinition[aSection].values())))
+    aDefinition[aSection]['added'] = anItem
+  theChanges, someStages, someRootTypes = affectedBy(theModel, addItem)
+  assert theChanges == { aSection : { 'added' } }
+  assert aStage in someStages
+  assert 'pydantic' not in someStages
+  assert someRootTypes == set()
+
+def test_newRootType(theModel) :
+  rootTypes = set(theModel.rootTypeNames())
+  someStages, someRootTypes = cpig.watch.findAffectedGenerators(
+    {}, rootTypes - { 'type0' }, rootTypes, theModel
+  )
+  assert someRootTypes == { 'type0' }
+  assert { 'pydantic', 'httpRouteTemplates', 'exampleTemplates' } <= someStages
+
+def test_loadInterface(interfaceDir) :
+  config = cpig.benchmark.loadBenchmarkConfig(str(interfaceDir), True, 1, 1)
+  generatorConfig, theModel = cpig.watch.loadInterface(config, 'bench.md')
+  assert theModel.name == 'bench'
+  assert generatorConfig['outputFiles']
+  assert not config['outputFiles']